@@ -0,0 +1,407 @@
+"""
+An in-memory stand-in for the cloco API.
+
+Serves the endpoints used by the cloco commands over HTTP: /oauth/token,
+/me, user credentials, subscriptions, subscription clients and their
+credentials, applications, configuration, configuration versions and the
+permissions of every level.  Lists support the limit and page parameters
+with a Link rel="next" header, and configuration carries an ETag.  Every
+request can be delayed and a fraction of them answered with a 503 to
+measure the CLI under a slow or failing API.
+
+    $ python benchmarks/fakeapi.py [--port 8080] [--latency 0.02] [--error-rate 0.01]
+
+Point a profile at it with cloco init --url http://127.0.0.1:8080 --key bench-key --secret bench-secret.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+DEFAULT_CREDENTIALS = {'bench-key': 'bench-secret'}
+
+TOKEN_LIFETIME = 3600
+
+# (method, path pattern, handler name), the first match wins
+ROUTES = [(method, re.compile('^{0}$'.format(pattern)), name) for method, pattern, name in [
+    ('POST', r'/oauth/token', 'token'),
+    ('GET', r'/me', 'me'),
+    ('GET', r'/user/credentials', 'list_user_credentials'),
+    ('POST', r'/user/credentials', 'create_user_credentials'),
+    ('DELETE', r'/user/credentials/([^/]+)', 'delete_user_credentials'),
+    ('GET', r'/?', 'list_subscriptions'),
+    ('POST', r'/subscription', 'create_subscription'),
+    ('GET', r'/([^/]+)', 'get_subscription'),
+    ('DELETE', r'/([^/]+)', 'delete_subscription'),
+    ('GET', r'/([^/]+)/permissions', 'list_permissions'),
+    ('POST', r'/([^/]+)/permissions', 'create_permission'),
+    ('DELETE', r'/([^/]+)/permissions/([^/]+)', 'delete_permission'),
+    ('GET', r'/([^/]+)/clients', 'list_clients'),
+    ('PUT', r'/([^/]+)/clients/([^/]+)', 'create_client'),
+    ('DELETE', r'/([^/]+)/clients/([^/]+)', 'delete_client'),
+    ('GET', r'/([^/]+)/clients/([^/]+)/credentials', 'list_client_credentials'),
+    ('POST', r'/([^/]+)/clients/([^/]+)/credentials', 'create_client_credentials'),
+    ('DELETE', r'/([^/]+)/clients/([^/]+)/credentials/([^/]+)', 'delete_client_credentials'),
+    ('GET', r'/([^/]+)/applications', 'list_applications'),
+    ('GET', r'/([^/]+)/applications/([^/]+)', 'get_application'),
+    ('PUT', r'/([^/]+)/applications/([^/]+)', 'put_application'),
+    ('DELETE', r'/([^/]+)/applications/([^/]+)', 'delete_application'),
+    ('GET', r'/([^/]+)/applications/([^/]+)/permissions', 'list_permissions'),
+    ('POST', r'/([^/]+)/applications/([^/]+)/permissions', 'create_permission'),
+    ('DELETE', r'/([^/]+)/applications/([^/]+)/permissions/([^/]+)', 'delete_permission'),
+    ('GET', r'/([^/]+)/configuration/versions/([^/]+)/([^/]+)/([^/]+)', 'list_versions'),
+    ('GET', r'/([^/]+)/configuration/versions/([^/]+)/([^/]+)/([^/]+)/(\d+)', 'get_version'),
+    ('PUT', r'/([^/]+)/configuration/versions/([^/]+)/([^/]+)/([^/]+)/(\d+)', 'restore_version'),
+    ('GET', r'/([^/]+)/configuration/([^/]+)', 'list_configuration'),
+    ('GET', r'/([^/]+)/configuration/([^/]+)/([^/]+)/([^/]+)', 'get_configuration'),
+    ('PUT', r'/([^/]+)/configuration/([^/]+)/([^/]+)/([^/]+)', 'put_configuration'),
+    ('GET', r'/([^/]+)/configuration/([^/]+)/([^/]+)/([^/]+)/permissions', 'list_permissions'),
+    ('POST', r'/([^/]+)/configuration/([^/]+)/([^/]+)/([^/]+)/permissions', 'create_permission'),
+    ('DELETE', r'/([^/]+)/configuration/([^/]+)/([^/]+)/([^/]+)/permissions/([^/]+)', 'delete_permission'),
+]]
+
+
+class FakeApi(object):
+    """The state and request handling of the fake API, independent of HTTP.
+
+    credentials maps the client keys accepted by /oauth/token to their
+    secrets; credentials created through the API are accepted too.
+    latency delays every request by that many seconds plus up to jitter
+    more, and error_rate is the fraction of requests answered with a 503."""
+
+    def __init__(self, credentials=None, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.credentials = dict(DEFAULT_CREDENTIALS if credentials is None else credentials)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = set()
+        self.subscriptions = {}
+        self.requests = 0
+
+    def populate(self, sub, apps=1, cobs=1, envs=('dev',), size=100, versions=1):
+        """Creates a subscription holding apps applications of cobs configuration objects each.
+
+        Every object has a JSON payload of about size bytes in each
+        environment, saved versions times."""
+        subscription = self.subscriptions.setdefault(sub, new_subscription(sub))
+        for a in range(apps):
+            app = 'app{0}'.format(a)
+            subscription['applications'][app] = {'applicationId': app, 'environments': list(envs),
+                                                 'configurationObjects': ['cob{0}'.format(c) for c in range(cobs)]}
+            for c in range(cobs):
+                for env in envs:
+                    for v in range(versions):
+                        payload = json.dumps({'app': app, 'cob': c, 'env': env, 'version': v,
+                                              'filler': 'x' * max(0, size - 60)})
+                        self.save(subscription, (app, 'cob{0}'.format(c), env), payload)
+        return subscription
+
+    def handle(self, method, path, query, headers, body):
+        """Returns the (status, document, headers) answering a request"""
+        delay = self.latency + (self.random.random() * self.jitter if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        with self.lock:
+            self.requests += 1
+            if self.error_rate and self.random.random() < self.error_rate:
+                return 503, {'message': 'Injected failure'}, {}
+            for route_method, pattern, name in ROUTES:
+                match = pattern.match(path)
+                if match and route_method == method:
+                    break
+            else:
+                return 404, {'message': 'Not found'}, {}
+            if name != 'token' and headers.get('Authorization', '')[len('Bearer '):] not in self.tokens:
+                return 401, {'message': 'Invalid token'}, {}
+            request = {'query': query, 'headers': headers, 'body': body, 'path': path}
+            try:
+                result = getattr(self, name)(request, *[unquote(group) for group in match.groups()])
+            except KeyError:
+                return 404, {'message': 'Not found'}, {}
+        if len(result) == 2:
+            result += ({},)
+        return result
+
+    # authentication
+
+    def token(self, request):
+        try:
+            key, secret = base64.b64decode(request['headers'].get('Authorization', '')[len('Basic '):]) \
+                .decode('utf-8').split(':', 1)
+        except ValueError:
+            return 401, {'message': 'Missing credentials'}
+        if self.credentials.get(key) != secret:
+            return 401, {'message': 'Invalid credentials'}
+        token = make_token({'sub': key, 'exp': int(time.time()) + TOKEN_LIFETIME, 'jti': uuid.uuid4().hex})
+        self.tokens.add(token)
+        return 200, {'access_token': token, 'token_type': 'bearer', 'expires_in': TOKEN_LIFETIME}
+
+    def me(self, request):
+        return 200, {'username': 'bench', 'subscriptions': sorted(self.subscriptions)}
+
+    def list_user_credentials(self, request):
+        return 200, [{'clientKey': key} for key in sorted(self.credentials)]
+
+    def create_user_credentials(self, request):
+        return 200, self.issue(self.credentials)
+
+    def delete_user_credentials(self, request, key):
+        del self.credentials[key]
+        return 200, ''
+
+    def issue(self, owner):
+        key, secret = uuid.uuid4().hex, uuid.uuid4().hex
+        owner[key] = secret
+        self.credentials[key] = secret
+        return {'clientKey': key, 'clientSecret': secret}
+
+    # subscriptions
+
+    def list_subscriptions(self, request):
+        return page(request, [{'subscriptionId': sub} for sub in sorted(self.subscriptions)])
+
+    def create_subscription(self, request):
+        sub = json.loads(request['body'])['subscriptionId']
+        if sub in self.subscriptions:
+            return 409, {'message': 'The subscription exists'}
+        self.subscriptions[sub] = new_subscription(sub)
+        return 200, {'subscriptionId': sub}
+
+    def get_subscription(self, request, sub):
+        return 200, {'subscriptionId': self.subscriptions[sub]['id']}
+
+    def delete_subscription(self, request, sub):
+        del self.subscriptions[sub]
+        return 200, ''
+
+    def list_permissions(self, request, sub, *level):
+        permissions = self.subscriptions[sub]['permissions'].get(level_of(self.subscriptions[sub], level), {})
+        return page(request, [{'identity': identity, 'permissionLevel': role}
+                              for identity, role in sorted(permissions.items())])
+
+    def create_permission(self, request, sub, *level):
+        document = json.loads(request['body'])
+        permissions = self.subscriptions[sub]['permissions']
+        permissions.setdefault(level_of(self.subscriptions[sub], level), {})[document['identity']] = \
+            document['permissionLevel']
+        return 200, ''
+
+    def delete_permission(self, request, sub, *level_and_identity):
+        level, identity = level_and_identity[:-1], level_and_identity[-1]
+        del self.subscriptions[sub]['permissions'][level_of(self.subscriptions[sub], level)][identity]
+        return 200, ''
+
+    def list_clients(self, request, sub):
+        return page(request, [{'name': name} for name in sorted(self.subscriptions[sub]['clients'])])
+
+    def create_client(self, request, sub, name):
+        self.subscriptions[sub]['clients'].setdefault(name, {})
+        return 200, ''
+
+    def delete_client(self, request, sub, name):
+        for key in self.subscriptions[sub]['clients'].pop(name):
+            self.credentials.pop(key, None)
+        return 200, ''
+
+    def list_client_credentials(self, request, sub, name):
+        return page(request, [{'clientKey': key} for key in sorted(self.subscriptions[sub]['clients'][name])])
+
+    def create_client_credentials(self, request, sub, name):
+        return 200, self.issue(self.subscriptions[sub]['clients'][name])
+
+    def delete_client_credentials(self, request, sub, name, key):
+        del self.subscriptions[sub]['clients'][name][key]
+        self.credentials.pop(key, None)
+        return 200, ''
+
+    # applications
+
+    def list_applications(self, request, sub):
+        applications = self.subscriptions[sub]['applications']
+        return page(request, [applications[app] for app in sorted(applications)])
+
+    def get_application(self, request, sub, app):
+        return 200, self.subscriptions[sub]['applications'][app]
+
+    def put_application(self, request, sub, app):
+        document = json.loads(request['body'] or '{}')
+        document['applicationId'] = app
+        self.subscriptions[sub]['applications'][app] = document
+        return 200, ''
+
+    def delete_application(self, request, sub, app):
+        del self.subscriptions[sub]['applications'][app]
+        return 200, ''
+
+    # configuration
+
+    def list_configuration(self, request, sub, app):
+        configuration = self.subscriptions[sub]['configuration']
+        return page(request, [{'configObjectId': key[1], 'environmentId': key[2], 'revision': len(configuration[key])}
+                              for key in sorted(configuration) if key[0] == app])
+
+    def get_configuration(self, request, sub, app, cob, env):
+        versions = self.subscriptions[sub]['configuration'][(app, cob, env)]
+        etag = '"{0}"'.format(hashlib.sha1(versions[-1].encode('utf-8')).hexdigest())
+        if request['headers'].get('If-None-Match') == etag:
+            return 304, '', {'ETag': etag}
+        return 200, configuration_document(app, cob, env, len(versions), versions[-1]), {'ETag': etag}
+
+    def put_configuration(self, request, sub, app, cob, env):
+        self.save(self.subscriptions[sub], (app, cob, env), request['body'])
+        return 200, ''
+
+    def list_versions(self, request, sub, app, cob, env):
+        versions = self.subscriptions[sub]['configuration'][(app, cob, env)]
+        return page(request, [{'revision': i + 1} for i in range(len(versions))])
+
+    def get_version(self, request, sub, app, cob, env, version):
+        versions = self.subscriptions[sub]['configuration'][(app, cob, env)]
+        if not 0 < int(version) <= len(versions):
+            raise KeyError(version)
+        return 200, configuration_document(app, cob, env, int(version), versions[int(version) - 1])
+
+    def restore_version(self, request, sub, app, cob, env, version):
+        data = self.get_version(request, sub, app, cob, env, version)[1]['configurationData']
+        self.save(self.subscriptions[sub], (app, cob, env), data)
+        revision = len(self.subscriptions[sub]['configuration'][(app, cob, env)])
+        return 200, configuration_document(app, cob, env, revision, data)
+
+    def save(self, subscription, key, data):
+        subscription['configuration'].setdefault(key, []).append(data)
+        return
+
+
+def new_subscription(sub):
+    return {'id': sub, 'applications': {}, 'clients': {}, 'configuration': {}, 'permissions': {}}
+
+
+def level_of(subscription, level):
+    """Checks the application or configuration object of a permission level exists"""
+    level = tuple(level)
+    if len(level) == 1 and level[0] not in subscription['applications']:
+        raise KeyError(level)
+    if len(level) == 3 and level not in subscription['configuration']:
+        raise KeyError(level)
+    return level
+
+
+def configuration_document(app, cob, env, revision, data):
+    return {'applicationId': app, 'configObjectId': cob, 'environmentId': env, 'revision': revision,
+            'configurationData': data}
+
+
+def page(request, items):
+    """Returns a list, or the page of it selected by the limit and page parameters with a link to the next"""
+    query = request['query']
+    if 'limit' not in query:
+        return 200, items
+    limit, number = int(query['limit'][0]), int(query.get('page', ['1'])[0])
+    headers = {}
+    if number * limit < len(items):
+        headers['Link'] = '<{0}?limit={1}&page={2}>; rel="next"'.format(request['path'], limit, number + 1)
+    return 200, items[(number - 1) * limit:number * limit], headers
+
+
+def make_token(claims):
+    def encode(document):
+        raw = json.dumps(document).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    return '{0}.{1}.fake'.format(encode({'alg': 'none'}), encode(claims))
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # send the headers and body together without waiting for acknowledgements,
+    # otherwise keep-alive requests stall on delayed ACKs
+    wbufsize = 65536
+    disable_nagle_algorithm = True
+
+    def do(self):
+        parts = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        status, document, headers = self.server.api.handle(self.command, parts.path, parse_qs(parts.query),
+                                                           self.headers, body)
+        text = document if isinstance(document, str) else json.dumps(document)
+        content = text.encode('utf-8') if status != 304 else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+        return
+
+    do_GET = do_POST = do_PUT = do_DELETE = do
+
+    def log_message(self, format, *args):
+        return
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    """Serves a FakeApi over HTTP on a background thread, use port 0 for a free port"""
+
+    daemon_threads = True
+
+    def __init__(self, api=None, host='127.0.0.1', port=0):
+        ThreadingHTTPServer.__init__(self, (host, port), Handler)
+        self.api = api if api is not None else FakeApi()
+        self.thread = None
+
+    @property
+    def url(self):
+        return 'http://{0}:{1}'.format(*self.server_address[:2])
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, kwargs={'poll_interval': 0.05})
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        return
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serves an in-memory stand-in for the cloco API.')
+    parser.add_argument('--port', type=int, default=8080, help='the port to listen on')
+    parser.add_argument('--latency', type=float, default=0.0, help='the seconds to delay each request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many more seconds of random delay')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='the fraction of requests answered with a 503')
+    parser.add_argument('--populate', type=int, default=0, metavar='COBS',
+                        help='creates subscription bench with one application of COBS configuration objects')
+    options = parser.parse_args()
+    api = FakeApi(latency=options.latency, jitter=options.jitter, error_rate=options.error_rate)
+    if options.populate:
+        api.populate('bench', cobs=options.populate)
+    server = FakeApiServer(api, port=options.port)
+    print('Serving the fake cloco API on {0}'.format(server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Measures the startup cost of common cloco commands.
+
+For each command the script reports the median wall time of the process and
+the import time recorded by python -X importtime, along with whether the
+HTTP stack (requests) was imported.  No network calls are made.
+
+    $ python benchmarks/startup.py [--runs 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+COMMANDS = [
+    ['--help'],
+    ['init', '--help'],
+    ['configuration', '--help'],
+    ['configuration', 'get', '--help'],
+]
+
+SCRIPT = 'import sys; from cloco_cli.cli import main; sys.argv = ["cloco"] + sys.argv[1:]; main()'
+
+
+def run(args):
+    """Runs a command once, returning the wall time, import time and imported modules"""
+    start = time.time()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', SCRIPT] + args,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                             universal_newlines=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    elapsed = time.time() - start
+    total = 0
+    modules = set()
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            # only top level imports, nested imports are included in their cumulative time
+            total += int(cumulative)
+        modules.add(name.strip())
+    return elapsed, total / 1000000.0, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures cloco startup time.')
+    parser.add_argument('--runs', type=int, default=10, help='the number of runs per command')
+    options = parser.parse_args()
+    print('{0:<35} {1:>10} {2:>10} {3:>9}'.format('command', 'wall (ms)', 'import (ms)', 'requests'))
+    for args in COMMANDS:
+        results = [run(args) for _ in range(options.runs)]
+        wall = statistics.median(r[0] for r in results) * 1000
+        imported = statistics.median(r[1] for r in results) * 1000
+        loaded = 'requests' in results[0][2]
+        print('{0:<35} {1:>10.1f} {2:>10.1f} {3:>9}'.format(
+            'cloco ' + ' '.join(args), wall, imported, 'yes' if loaded else 'no'))
+
+
+if __name__ == '__main__':
+    main()
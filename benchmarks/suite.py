@@ -0,0 +1,221 @@
+"""
+Benchmarks the cloco commands and clients against the fake API.
+
+Starts benchmarks/fakeapi.py in process, populated with one application of
+--objects configuration objects, and runs each scenario in its own python
+process with HOME pointed at a profile for the fake API.  For each scenario
+the script reports the calls per second, the p50 and p99 latency and the
+peak RSS of the process.  Bulk and process scenarios time each whole
+operation, so their latency is per operation rather than per call.
+
+    $ python benchmarks/suite.py [--requests 500] [--latency 0.005] [--error-rate 0.0] [--json results.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakeapi import FakeApi, FakeApiServer, DEFAULT_CREDENTIALS  # noqa: E402
+
+SUBSCRIPTION = 'bench'
+APPLICATION = 'app0'
+ENVIRONMENT = 'dev'
+LARGE_COB = 'large'
+
+SCRIPT = 'import sys; from cloco_cli.cli import main; sys.argv = ["cloco"] + sys.argv[1:]; main()'
+
+SCENARIOS = ['get', 'get-parallel', 'get-async', 'pull', 'large-put', 'large-get', 'startup', 'cli-get']
+
+
+def timed(call, count, workers=1):
+    """Calls call(i) count times on workers threads, returning the latency of each call and the failures"""
+    from cloco_cli.api import RequestFailed
+    from cloco_cli.bulk import run_parallel
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            call(i)
+            failed = False
+        except (RequestFailed, SystemExit):
+            failed = True
+        return time.perf_counter() - start, failed
+
+    start = time.perf_counter()
+    if workers > 1:
+        results = [result for _, result, _ in run_parallel(one, range(count), workers)]
+    else:
+        results = [one(i) for i in range(count)]
+    return {'calls': count, 'seconds': time.perf_counter() - start,
+            'latencies': [latency for latency, _ in results], 'errors': sum(failed for _, failed in results)}
+
+
+def cob(i, options):
+    return 'cob{0}'.format(i % options.objects)
+
+
+def run_scenario(name, options):
+    """Runs an in process scenario, called in the child process"""
+    from cloco_cli.client import Client
+    client = Client()
+    if name == 'get':
+        return timed(lambda i: client.get_configuration(cob(i, options), ENVIRONMENT, APPLICATION, SUBSCRIPTION),
+                     options.requests)
+    if name == 'get-parallel':
+        return timed(lambda i: client.get_configuration(cob(i, options), ENVIRONMENT, APPLICATION, SUBSCRIPTION),
+                     options.requests, options.concurrency)
+    if name == 'get-async':
+        return run_async(options)
+    if name == 'pull':
+        from cloco_cli.cli import main
+        target = tempfile.mkdtemp()
+        args = ['configuration', 'pull', '--target', target, '--env', ENVIRONMENT,
+                '--workers', str(options.concurrency)]
+        result = timed(lambda i: main(args, standalone_mode=False), options.runs)
+        result['calls'] = options.runs * options.objects
+        return result
+    if name == 'large-put':
+        data = json.dumps({'filler': 'x' * options.large_size})
+        return timed(lambda i: client.put_configuration(LARGE_COB, data, ENVIRONMENT, APPLICATION, SUBSCRIPTION,
+                                                        'application/json'), options.runs)
+    if name == 'large-get':
+        return timed(lambda i: client.get_configuration(LARGE_COB, ENVIRONMENT, APPLICATION, SUBSCRIPTION),
+                     options.runs)
+    raise ValueError(name)
+
+
+def run_async(options):
+    from cloco_cli.aio import AsyncClient
+
+    async def fetch_all():
+        async with AsyncClient(concurrency=options.concurrency) as client:
+            async def one(i):
+                start = time.perf_counter()
+                await client.get_configuration(cob(i, options), ENVIRONMENT, APPLICATION, SUBSCRIPTION)
+                return time.perf_counter() - start
+            return await asyncio.gather(*[one(i) for i in range(options.requests)])
+
+    start = time.perf_counter()
+    latencies = asyncio.run(fetch_all())
+    return {'calls': options.requests, 'seconds': time.perf_counter() - start, 'latencies': list(latencies),
+            'errors': 0}
+
+
+def process_scenario(name, options):
+    """Returns the command line of a scenario that times whole cloco processes"""
+    if name == 'startup':
+        return [sys.executable, '-c', SCRIPT, '--help']
+    return [sys.executable, '-c', SCRIPT, 'configuration', 'get', '--cob', 'cob0', '--no-cache']
+
+
+def run_process(command):
+    """Runs a process, returning its wall time, peak RSS in bytes and output"""
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, cwd=ROOT)
+    output = process.stdout.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = status
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    return elapsed, rss, status, output
+
+
+def measure(name, options):
+    """Runs a scenario in fresh processes, returning its results with the peak RSS"""
+    if name in ('startup', 'cli-get'):
+        runs = [run_process(process_scenario(name, options)) for _ in range(options.runs)]
+        return {'calls': len(runs), 'seconds': sum(run[0] for run in runs), 'latencies': [run[0] for run in runs],
+                'errors': sum(run[2] != 0 for run in runs), 'rss': max(run[1] for run in runs)}
+    command = [sys.executable, os.path.abspath(__file__), '--child', name] + child_arguments(options)
+    elapsed, rss, status, output = run_process(command)
+    if status != 0:
+        raise RuntimeError('The {0} scenario failed.'.format(name))
+    result = json.loads(output.decode('utf-8'))
+    result['rss'] = rss
+    return result
+
+
+def child_arguments(options):
+    return ['--requests', str(options.requests), '--runs', str(options.runs), '--objects', str(options.objects),
+            '--concurrency', str(options.concurrency), '--large-size', str(options.large_size)]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def summarise(name, result):
+    return {'scenario': name, 'calls': result['calls'], 'errors': result['errors'],
+            'calls_per_second': result['calls'] / result['seconds'] if result['seconds'] else 0,
+            'p50_ms': percentile(result['latencies'], 50) * 1000, 'p99_ms': percentile(result['latencies'], 99) * 1000,
+            'peak_rss_mb': result['rss'] / 1048576.0}
+
+
+def write_profile(home, url):
+    """Creates the default profile for the fake API under home"""
+    os.environ['HOME'] = home
+    os.makedirs(os.path.join(home, '.cloco'))
+    from cloco_cli.config import create_config, save_config
+    config = create_config()
+    key = sorted(DEFAULT_CREDENTIALS)[0]
+    config['credentials']['cloco_client_key'] = key
+    config['credentials']['cloco_client_secret'] = DEFAULT_CREDENTIALS[key]
+    config['settings']['url'] = url
+    config['preferences']['subscription'] = SUBSCRIPTION
+    config['preferences']['application'] = APPLICATION
+    config['preferences']['environment'] = ENVIRONMENT
+    save_config(config, True)
+    return
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks cloco against the fake API.')
+    parser.add_argument('--requests', type=int, default=500, help='the number of calls of the get scenarios')
+    parser.add_argument('--runs', type=int, default=10, help='the number of runs of the bulk and process scenarios')
+    parser.add_argument('--objects', type=int, default=100, help='the number of configuration objects')
+    parser.add_argument('--size', type=int, default=1024, help='the payload size of each object in bytes')
+    parser.add_argument('--large-size', type=int, default=5 * 1048576, help='the payload size of the large scenarios')
+    parser.add_argument('--concurrency', type=int, default=16, help='the concurrency of the parallel scenarios')
+    parser.add_argument('--latency', type=float, default=0.0, help='the seconds the fake API delays each request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='the fraction of requests failed with a 503')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='the scenarios to run, default to all')
+    parser.add_argument('--json', help='also writes the results to this file')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.child:
+        # the commands print their results, only the measurements go to stdout
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            result = run_scenario(options.child, options)
+        json.dump(result, sys.stdout)
+        return
+
+    api = FakeApi(latency=options.latency, error_rate=options.error_rate)
+    api.populate(SUBSCRIPTION, cobs=options.objects, envs=(ENVIRONMENT,), size=options.size)
+    api.save(api.subscriptions[SUBSCRIPTION], (APPLICATION, LARGE_COB, ENVIRONMENT), 'x' * options.large_size)
+    with FakeApiServer(api) as server:
+        write_profile(tempfile.mkdtemp(), server.url)
+        results = [summarise(name, measure(name, options)) for name in options.scenario or SCENARIOS]
+
+    print('{0:<14} {1:>7} {2:>7} {3:>10} {4:>9} {5:>9} {6:>9}'.format(
+        'scenario', 'calls', 'errors', 'calls/s', 'p50 (ms)', 'p99 (ms)', 'RSS (MB)'))
+    for result in results:
+        print('{scenario:<14} {calls:>7} {errors:>7} {calls_per_second:>10.1f} {p50_ms:>9.2f} {p99_ms:>9.2f} '
+              '{peak_rss_mb:>9.1f}'.format(**result))
+    if options.json:
+        with open(options.json, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
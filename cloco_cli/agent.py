@@ -0,0 +1,134 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+DEFAULT_TTL = 0
+CLIENT_TIMEOUT = 5
+
+
+class AgentResponse(object):
+    """A response relayed by the agent standing in for a requests.Response"""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+        self.headers = {}
+
+
+class MemoryCache(object):
+    """Keeps responses and their ETags in memory, standing in for the response cache on disk.
+
+    Responses are revalidated with If-None-Match on every request, unless
+    they were fetched or revalidated less than ttl seconds ago."""
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (etag, text) for the key, or None if it is not cached"""
+        with self.lock:
+            entry = self.entries.get(key)
+        return None if entry is None else (entry[1], entry[2])
+
+    def put(self, key, etag, text):
+        with self.lock:
+            self.entries[key] = [time.time(), etag, text]
+        return
+
+    def fresh(self, key):
+        """Returns the text for the key if it was fetched or revalidated less than ttl seconds ago, else None"""
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            return entry[2]
+        return None
+
+    def revalidated(self, key):
+        """Records that the API confirmed the entry for the key is current"""
+        with self.lock:
+            if key in self.entries:
+                self.entries[key][0] = time.time()
+        return
+
+
+class AgentRequestHandler(socketserver.StreamRequestHandler):
+    """Answers one JSON request line with one JSON response line"""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            r = self.server.fetch(request)
+            response = {'status': r.status_code, 'text': r.text}
+        except Exception as e:
+            response = {'status': 500, 'text': 'Agent error: {0}'.format(e)}
+        self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+        return
+
+
+class AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, fetch):
+        self.fetch = fetch
+        socketserver.UnixStreamServer.__init__(self, path, AgentRequestHandler)
+
+
+def create_agent_server(path, fetch):
+    """Binds the agent to a Unix domain socket readable only by the current user.
+
+    fetch is called with each decoded request and returns a response.  A
+    socket file left behind by an agent that is no longer running is
+    replaced; a running agent raises an error."""
+    if agent_running(path):
+        raise RuntimeError('An agent is already listening on {0}'.format(path))
+    if os.path.exists(path):
+        os.remove(path)
+    umask = os.umask(0o177)
+    try:
+        return AgentServer(path, fetch)
+    finally:
+        os.umask(umask)
+
+
+def agent_running(path):
+    """Returns a Boolean value indicating whether an agent accepts connections on the path"""
+    client = connect(path)
+    if client is None:
+        return False
+    client.close()
+    return True
+
+
+def agent_get(path, request, timeout=CLIENT_TIMEOUT):
+    """Sends a request to the agent, returning None if no agent is available"""
+    client = connect(path, timeout)
+    if client is None:
+        return None
+    try:
+        client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with client.makefile('rb') as reader:
+            response = json.loads(reader.readline().decode('utf-8'))
+        return AgentResponse(response['status'], response['text'])
+    except (socket.error, ValueError, KeyError):
+        return None
+    finally:
+        client.close()
+
+
+def connect(path, timeout=CLIENT_TIMEOUT):
+    """Connects to the agent socket, returning None if it is not listening"""
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(path):
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        client.connect(path)
+    except socket.error:
+        client.close()
+        return None
+    return client
@@ -0,0 +1,137 @@
+import asyncio
+import functools
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from cloco_cli.api import cache_key, get_cache, get_headers_with_mime, is_token_valid
+from cloco_cli.cache import finish_cached_get, start_cached_get
+from cloco_cli.client import Client, decode, keep_last_known_good, next_link, page_items, page_params
+from cloco_cli.session import get_session, get_session_settings, get_timeouts
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+DEFAULT_CONCURRENCY = 100
+
+
+class AsyncClient(Client):
+    """An asyncio client for the cloco API.
+
+    Offers the same calls as Client, each returning a coroutine.  Requests
+    are sent with httpx when it is installed, so thousands can share one
+    event loop; otherwise they run on a thread pool sized by the pool_size
+    setting through the shared requests session.  At most concurrency
+    requests are in flight at once."""
+
+    def __init__(self, config=None, profile=None, concurrency=DEFAULT_CONCURRENCY):
+        super(AsyncClient, self).__init__(config, profile)
+        self.concurrency = concurrency
+        self.http = None
+        self.executor = None
+        self.semaphore = None
+        self.token_lock = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+        return False
+
+    def start(self):
+        """Creates the transport and locks on the running event loop"""
+        if self.semaphore is not None:
+            return
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.token_lock = asyncio.Lock()
+        pool_size, retries = get_session_settings(self.config)[:2]
+        if httpx is not None:
+            limits = httpx.Limits(max_connections=self.concurrency)
+            connect, read = get_timeouts(self.config)
+            self.http = httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(limits=limits, retries=retries),
+                                          timeout=httpx.Timeout(read, connect=connect))
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=max(1, min(pool_size, self.concurrency)))
+        return
+
+    async def aclose(self):
+        """Closes the transport, the client may be used again afterwards"""
+        if self.http is not None:
+            await self.http.aclose()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.http = self.executor = self.semaphore = self.token_lock = None
+        return
+
+    async def token(self):
+        """Returns a valid access token, refreshing it at most once for concurrent callers"""
+        token = self.config['credentials']['cloco_access_token']
+        if is_token_valid(token):
+            return token
+        async with self.token_lock:
+            return await asyncio.get_event_loop().run_in_executor(self.executor, self.authenticate)
+
+    async def request(self, method, u, mime_type='application/json', headers=None, **kwargs):
+        """Sends an authenticated request and returns the response"""
+        self.start()
+        await self.token()
+        all_headers = get_headers_with_mime(self.config, mime_type)
+        all_headers.update(headers or {})
+        async with self.semaphore:
+            if self.http is not None:
+                data = kwargs.pop('data', None)
+                if hasattr(data, 'read'):
+                    data = data.read()
+                return await self.http.request(method, u, headers=all_headers, content=data, **kwargs)
+            send = functools.partial(get_session(self.config).request, method, u, headers=all_headers, **kwargs)
+            return await asyncio.get_event_loop().run_in_executor(self.executor, send)
+
+    async def call(self, method, u, body=None, data=None, mime_type='application/json', headers=None, result='json'):
+        """Sends a request and decodes the response, body is encoded as JSON and data is sent as is"""
+        if body is not None:
+            data = json.dumps(body)
+        return decode(await self.request(method, u, mime_type, headers, data=data), result)
+
+    async def cached_get(self, u, cache, key, immutable=False):
+        """Sends a GET through the response cache, as cache.cached_get does for the sync client"""
+        cached, r, headers = start_cached_get(cache, key, {}, immutable)
+        if r is not None:
+            return r
+        return finish_cached_get(await self.get(u, headers=headers), cache, key, cached, immutable)
+
+    async def fetch_configuration(self, cob, env='', app='', sub='', no_cache=False, cache=None):
+        """Returns the response for a configuration object, revalidating a copy in the response cache"""
+        u = self.configuration_url(cob, env, app, sub)
+        key = self.configuration_key(cob, env, app, sub)
+        if no_cache:
+            r = await self.get(u)
+        else:
+            r = await self.cached_get(u, cache if cache is not None else get_cache(self.config), key)
+        keep_last_known_good(key, r)
+        return r
+
+    async def fetch_configuration_version(self, cob, version, env='', app='', sub='', no_cache=False):
+        """Returns the response for a configuration version through the response cache"""
+        u = '{0}/{1}'.format(self.version_url(cob, env, app, sub), version)
+        if no_cache:
+            return await self.get(u)
+        key = cache_key(self.config, self.subscription(sub), self.application(app), cob, self.environment(env),
+                        version)
+        return await self.cached_get(u, get_cache(self.config), key, immutable=True)
+
+    async def pages(self, u, limit=0, page=0, follow=False):
+        """Yields the decoded pages of a list, following the Link rel="next" header when follow is set"""
+        params = page_params(limit, page)
+        while u:
+            r = await self.request('GET', u, params=params)
+            yield decode(r)
+            u = next_link(u, r.headers.get('link', '')) if follow else None
+            params = None
+
+    async def items(self, u, limit=0, page=0, follow=False):
+        """Yields the items of a list page by page"""
+        async for document in self.pages(u, limit, page, follow):
+            for item in page_items(document):
+                yield item
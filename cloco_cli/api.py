@@ -0,0 +1,215 @@
+import base64
+import click
+import contextlib
+import json
+import sys
+import threading
+import time
+
+from cloco_cli.cache import DEFAULT_MAX_SIZE, ResponseCache
+from cloco_cli.config import config_profile, get_cache_path, get_last_known_good_path, save_config
+from cloco_cli.fallback import LastKnownGood
+from cloco_cli.output import echo_text, fail, format_document, get_output_mode
+from cloco_cli.trace import span
+
+# seconds before the token expiry at which it is treated as expired
+TOKEN_EXPIRY_MARGIN = 60
+
+
+def cache_key(config, *parts):
+    """Returns the key of a response in the caches, scoped to the profile and API url it is fetched from"""
+    return '/'.join([config_profile(config), get_url(config)] + [str(part) for part in parts])
+
+
+def get_last_known_good():
+    """Returns the store of the last successfully retrieved configuration"""
+    return LastKnownGood(get_last_known_good_path())
+
+
+def get_cache(config):
+    """Returns the response cache, bounded by the cache_size setting in MB"""
+    size = config.getint('settings', 'cache_size', fallback=DEFAULT_MAX_SIZE // (1024 * 1024))
+    return ResponseCache(get_cache_path(), size * 1024 * 1024)
+
+
+def print_response(r):
+    """Prints the HTTP response with formatting"""
+    if r.status_code == 200:
+        print_text(r.text)
+    else:
+        fail(r)
+    return
+
+
+def print_json_response(r):
+    """Prints the HTTP response with JSON formatting, passing the body through unchanged in json and raw modes"""
+    if r.status_code != 200:
+        fail(r)
+    if get_output_mode() in ('json', 'raw'):
+        click.echo(r.text)
+    else:
+        with span('decode'):
+            document = json.loads(r.text)
+        print_json(document)
+    return
+
+
+def print_text(text):
+    """Prints the text of a successful call"""
+    echo_text(text)
+    return
+
+
+def print_json(document):
+    """Prints the decoded JSON of a successful call formatted for the output mode"""
+    mode = get_output_mode()
+    with span('output', mode=mode):
+        text = format_document(document, mode)
+        click.echo(click.style(text, fg='green') if mode == 'pretty' else text)
+    return
+
+
+@contextlib.contextmanager
+def request_errors():
+    """Reports a client call that raised RequestFailed and exits with the code for its status"""
+    try:
+        yield
+    except AuthenticationFailed as e:
+        fail(e.response, 'Authentication failed.')
+    except RequestFailed as e:
+        fail(e.response)
+
+
+def print_bulk_summary(results, message):
+    """Prints a status line for each (item, result, error) of a bulk operation"""
+    failed = 0
+    for item, result, error in results:
+        name = '/'.join(item)
+        if error is None:
+            click.echo(click.style('{0}: {1}'.format(
+                name, message.format(result)), fg='green'))
+        else:
+            failed += 1
+            click.echo(click.style('{0}: {1}'.format(name, error), fg='red'))
+    click.echo(click.style('{0} succeeded, {1} failed'.format(
+        len(results) - failed, failed), fg='yellow' if failed else 'green'))
+    if failed:
+        sys.exit('Request failed.')
+    return
+
+
+class RequestFailed(Exception):
+    """Raised when an API call is unsuccessful, carrying the response"""
+
+    def __init__(self, response):
+        super(RequestFailed, self).__init__('{0} {1}'.format(
+            response.status_code, response.text))
+        self.response = response
+
+
+class AuthenticationFailed(RequestFailed):
+    """Raised when the stored client credentials are rejected"""
+
+
+def get_url(config):
+    """Retrieves the url from configuration, else uses the default cloco url"""
+    url = config['settings']['url']
+    if not url:
+        url = 'https://api.cloco.io'
+    return url
+
+
+def get_headers(config):
+    """Gets the common HTTP headers"""
+    return get_headers_with_mime(config, 'application/json')
+
+
+def get_headers_with_mime(config, mime_type):
+    """Gets the common HTTP headers"""
+    token = config['credentials']['cloco_access_token']
+    headers = {'content-type': mime_type, 'authorization': 'Bearer ' + token}
+    return headers
+
+
+def authenticate(config):
+    """Authenticates using the stored credentials, exiting if they are rejected"""
+    try:
+        get_token(config)
+    except AuthenticationFailed as e:
+        fail(e.response, 'Authentication failed.')
+    return
+
+
+def get_token(config):
+    """Returns a valid access token, requesting one with the stored credentials if needed.
+
+    Tokens are shared between threads through the token pool, keyed by
+    profile and url, so each profile is refreshed at most once at a time."""
+    key = (config_profile(config), get_url(config))
+    with token_pool.lock(key), span('authenticate'):
+        token = token_pool.tokens.get(key)
+        if not is_token_valid(token):
+            token = config['credentials']['cloco_access_token']
+        if not is_token_valid(token):
+            r = request_token(config, config['credentials']['cloco_client_key'],
+                              config['credentials']['cloco_client_secret'])
+            if r.status_code != 200:
+                raise AuthenticationFailed(r)
+            payload = json.loads(r.text)
+            token = payload['access_token']
+            config['credentials']['cloco_access_token'] = token
+            save_config(config, True)
+        token_pool.tokens[key] = token
+        config['credentials']['cloco_access_token'] = token
+    return token
+
+
+def request_token(config, key, secret):
+    """Requests an access token for client credentials, returning the response"""
+    body = {'grant_type': 'client_credentials'}
+    headers = {'content-type': 'application/json'}
+    # imported here so that commands only load the HTTP stack when they call the API
+    from cloco_cli.session import get_session
+    return get_session(config).post(get_url(config) + '/oauth/token', data=json.dumps(body),
+                                    auth=(key, secret), headers=headers)
+
+
+class TokenPool(object):
+    """Access tokens shared by all threads in the process, keyed by (profile, url)"""
+
+    def __init__(self):
+        self.tokens = {}
+        self.locks = {}
+        self.guard = threading.Lock()
+
+    def lock(self, key):
+        """Returns the lock serialising token refreshes for the key"""
+        with self.guard:
+            return self.locks.setdefault(key, threading.Lock())
+
+
+token_pool = TokenPool()
+
+# JWT functions
+
+
+def is_token_valid(token):
+    """Checks the access token to see if it has expired"""
+    if not token:
+        return False
+    expiry = get_token_expiry(token)
+    if expiry is None:
+        return False
+    return time.time() < expiry - TOKEN_EXPIRY_MARGIN
+
+
+def get_token_expiry(token):
+    """Returns the exp claim of the JWT, or None if the token cannot be decoded"""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(
+            payload.encode('ascii')).decode('utf-8'))
+        return float(claims['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,168 @@
+import collections
+import contextlib
+import contextvars
+import io
+import json
+import shlex
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+
+from cloco_cli.config import ConfigurationMissing
+
+# commands that never return or would nest a batch
+EXCLUDED_COMMANDS = ('agent', 'batch', 'exec')
+
+
+def parse_line(line):
+    """Parses a batch line into (id, args), or None for blank lines and comments.
+
+    A line holding a JSON array is taken as the arguments, a JSON object
+    as {"id": ..., "args": [...]}, anything else is split like a shell
+    command line.  A leading cloco is dropped."""
+    text = line.strip()
+    if not text or text.startswith('#'):
+        return None
+    line_id = None
+    if text[0] in '[{':
+        document = json.loads(text)
+        if isinstance(document, dict):
+            line_id = document.get('id')
+            document = document.get('args')
+        if not isinstance(document, list):
+            raise ValueError('A JSON line must be an array of arguments or an object with an args array.')
+        args = [str(arg) for arg in document]
+    else:
+        args = shlex.split(text)
+    if args and args[0] == 'cloco':
+        args = args[1:]
+    return line_id, args
+
+
+class Capture(io.TextIOWrapper):
+    """A text stream over a bytes buffer, so a command may write text or bytes"""
+
+    def __init__(self):
+        super(Capture, self).__init__(io.BytesIO(), encoding='utf-8', errors='strict', write_through=True)
+
+    def getvalue(self):
+        self.flush()
+        return self.buffer.getvalue().decode('utf-8', 'replace')
+
+
+class CapturingStream(object):
+    """A text stream that writes to the capture of the current context while there is one, else to the wrapped stream.
+
+    The capture is held in a context variable, so the threads started by
+    run_parallel for a command write to the capture of that command."""
+
+    encoding = 'utf-8'
+    errors = 'strict'
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.current = contextvars.ContextVar('capture', default=None)
+
+    def target(self):
+        capture = self.current.get()
+        return self.stream if capture is None else capture
+
+    def write(self, text):
+        return self.target().write(text)
+
+    def flush(self):
+        self.target().flush()
+        return
+
+    def isatty(self):
+        return self.current.get() is None and self.stream.isatty()
+
+    def __getattr__(self, name):
+        return getattr(self.target(), name)
+
+    @contextlib.contextmanager
+    def capture(self):
+        """Captures what the current context writes, the capture is returned by the context manager"""
+        token = self.current.set(Capture())
+        try:
+            yield self.current.get()
+        finally:
+            self.current.reset(token)
+
+
+@contextlib.contextmanager
+def capturing_streams():
+    """Replaces stdout and stderr with capturing streams for the duration of the batch"""
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = CapturingStream(stdout), CapturingStream(stderr)
+    try:
+        yield sys.stdout, sys.stderr
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+
+
+def invoke(group, parent, args):
+    """Runs a subcommand of the group with the arguments, returning its exit code.
+
+    Errors are reported on stderr the way click reports them for a
+    standalone command, so one failing line never ends the batch."""
+    try:
+        if not args:
+            raise click.UsageError('Missing command.')
+        if args[0] in EXCLUDED_COMMANDS:
+            raise click.UsageError('The {0} command cannot run in a batch.'.format(args[0]))
+        command = group.get_command(parent, args[0])
+        if command is None:
+            raise click.UsageError('No such command "{0}".'.format(args[0]))
+        with command.make_context(args[0], args[1:], parent=parent) as ctx:
+            command.invoke(ctx)
+    except click.exceptions.Exit as e:
+        return e.exit_code
+    except click.ClickException as e:
+        e.show()
+        return e.exit_code
+    except click.Abort:
+        click.echo('Aborted!', err=True)
+        return 1
+    except ConfigurationMissing as e:
+        click.echo(click.style(str(e), fg='red'))
+        click.echo('Configuration error.', err=True)
+        return 1
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        click.echo(e.code, err=True)
+        return 1
+    except Exception as e:
+        click.echo('{0}: {1}'.format(type(e).__name__, e), err=True)
+        return 1
+    return 0
+
+
+def run_ordered(func, items, workers, emit):
+    """Calls func for every item on a thread pool, passing each result to emit in the order of items.
+
+    A result is emitted as soon as it and those before it are ready, and
+    at most two items per worker are taken ahead of the results, so a
+    long or endless input is processed as it is read."""
+    window = threading.Semaphore(2 * workers)
+    lock = threading.Lock()
+    pending = collections.deque()
+
+    def flush(_):
+        with lock:
+            while pending and pending[0].done():
+                future = pending.popleft()
+                window.release()
+                emit(future.result())
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for item in items:
+            window.acquire()
+            future = pool.submit(func, item)
+            with lock:
+                pending.append(future)
+            future.add_done_callback(flush)
+    return
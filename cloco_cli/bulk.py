@@ -0,0 +1,159 @@
+import contextvars
+import hashlib
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 8
+
+# keys used by the API to identify applications, configuration objects,
+# environments, configuration revisions and permissions
+APP_KEYS = ('applicationId', 'id', 'app')
+COB_KEYS = ('configObjectId', 'objectId', 'cob')
+ENV_KEYS = ('environmentId', 'env')
+REVISION_KEYS = ('revision', 'version')
+IDENTITY_KEYS = ('identity', 'username')
+ROLE_KEYS = ('permissionLevel', 'role')
+CLIENT_KEYS = ('name', 'clientId', 'username')
+KEY_KEYS = ('clientKey', 'client_key', 'key')
+SECRET_KEYS = ('clientSecret', 'client_secret', 'secret')
+
+
+def run_parallel(func, items, workers=DEFAULT_WORKERS):
+    """Calls func for every item on a bounded thread pool.
+
+    Returns a list of (item, result, error) tuples in the order of items,
+    where error is the exception raised by func or None.  Each call runs
+    in a copy of the caller's context, so the workers write to the same
+    batch capture as the caller."""
+    def call(item):
+        try:
+            return item, func(item), None
+        except Exception as e:
+            return item, None, e
+
+    items = list(items)
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(items)))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, call, item) for item in items]
+        return [future.result() for future in futures]
+
+
+def read_manifest(filename, default_env):
+    """Reads a manifest of configuration objects, one "cob [env]" per line"""
+    objects = []
+    with open(filename, 'r') as manifest:
+        for line in manifest:
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            env = fields[1] if len(fields) > 1 else default_env
+            objects.append((fields[0], env))
+    return objects
+
+
+def list_configuration_objects(document, env=''):
+    """Extracts the (cob, env) pairs from a configuration list response"""
+    objects = []
+    for item in document:
+        cob = first_value(item, COB_KEYS)
+        item_env = first_value(item, ENV_KEYS)
+        if cob and item_env and (not env or env == item_env):
+            objects.append((cob, item_env))
+    return objects
+
+
+def list_configuration_revisions(document):
+    """Maps each (cob, env) pair in a configuration list response to its revision, if given"""
+    revisions = {}
+    for item in document:
+        cob = first_value(item, COB_KEYS)
+        env = first_value(item, ENV_KEYS)
+        if cob and env:
+            revisions[(cob, env)] = first_value(item, REVISION_KEYS)
+    return revisions
+
+
+def list_applications(document):
+    """Extracts the application identifiers from an application list response"""
+    apps = []
+    for item in document:
+        app = item if not isinstance(item, dict) else first_value(item, APP_KEYS)
+        if app:
+            apps.append(app)
+    return apps
+
+
+def list_permissions(document):
+    """Extracts the (identity, role) pairs from a permission list response"""
+    permissions = []
+    for item in document:
+        identity = first_value(item, IDENTITY_KEYS)
+        if identity:
+            permissions.append((identity, first_value(item, ROLE_KEYS)))
+    return permissions
+
+
+def list_clients(document):
+    """Extracts the client names from a subscription client list response"""
+    names = []
+    for item in document:
+        name = item if not isinstance(item, dict) else first_value(item, CLIENT_KEYS)
+        if name:
+            names.append(name)
+    return names
+
+
+def list_credential_keys(document):
+    """Extracts the client keys from a credential list response"""
+    keys = []
+    for item in document:
+        key = item if not isinstance(item, dict) else first_value(item, KEY_KEYS)
+        if key:
+            keys.append(key)
+    return keys
+
+
+def first_value(item, keys):
+    """Returns the value of the first key present in the item"""
+    for key in keys:
+        if item.get(key):
+            return item[key]
+    return None
+
+
+def walk_configuration_tree(source, app='', env=''):
+    """Finds the configuration files in a directory laid out as app/cob/env.
+
+    The environment is the file name without its extension.  Returns a list
+    of ((app, cob, env), path) pairs, optionally filtered by app and env."""
+    files = []
+    for app_dir in sorted(os.listdir(source)):
+        if app and app != app_dir:
+            continue
+        app_path = os.path.join(source, app_dir)
+        if not os.path.isdir(app_path):
+            continue
+        for cob in sorted(os.listdir(app_path)):
+            cob_path = os.path.join(app_path, cob)
+            if not os.path.isdir(cob_path):
+                continue
+            for filename in sorted(os.listdir(cob_path)):
+                path = os.path.join(cob_path, filename)
+                file_env = os.path.splitext(filename)[0]
+                if os.path.isfile(path) and (not env or env == file_env):
+                    files.append(((app_dir, cob, file_env), path))
+    return files
+
+
+def guess_mime_type(path, default):
+    """Infers the MIME type of a configuration file from its extension"""
+    return mimetypes.guess_type(path)[0] or default
+
+
+def content_hash(data):
+    """Returns the SHA-256 digest of text or bytes, text being UTF-8 encoded"""
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
@@ -0,0 +1,152 @@
+import collections
+import hashlib
+import json
+import os
+
+from cloco_cli.files import write_atomic
+
+DEFAULT_MAX_SIZE = 50 * 1024 * 1024
+
+
+class CachedResponse(object):
+    """A stored response body standing in for a requests.Response"""
+
+    def __init__(self, text):
+        self.status_code = 200
+        self.text = text
+        self.headers = {}
+        self.from_cache = True
+
+
+class ResponseCache(object):
+    """A size-bounded, content-addressed cache of API responses on disk.
+
+    Each key maps to an entry holding the ETag and the digest of the body.
+    Bodies are stored once per digest, so identical payloads in different
+    environments share storage.  Entries are evicted least recently used
+    first once the stored bodies exceed max_size bytes."""
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.entries = os.path.join(directory, 'entries')
+        self.blobs = os.path.join(directory, 'blobs')
+
+    def get(self, key):
+        """Returns (etag, text) for the key, or None if it is not cached"""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r') as entryfile:
+                entry = json.load(entryfile)
+            with open(os.path.join(self.blobs, entry['digest']), 'rb') as blobfile:
+                text = blobfile.read().decode('utf-8')
+            os.utime(path, None)
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+        return entry.get('etag'), text
+
+    def put(self, key, etag, text):
+        """Stores the response text for the key and evicts old entries"""
+        body = text.encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()
+        blob = os.path.join(self.blobs, digest)
+        stored = os.path.isfile(blob)
+        if not stored:
+            write_atomic(blob, body, 0o600)
+        entry = {'key': key, 'etag': etag, 'digest': digest}
+        write_atomic(self._entry_path(key), json.dumps(entry).encode('utf-8'), 0o600)
+        # only a new body can take the cache over max_size
+        if not stored:
+            self.evict()
+        return
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits max_size.
+
+        The body sizes are summed from a directory listing, the entries are
+        only read once the cache is over max_size."""
+        sizes = self._blob_sizes()
+        total = sum(sizes.values())
+        if total <= self.max_size:
+            return
+        entries = []
+        for name in os.listdir(self.entries):
+            path = os.path.join(self.entries, name)
+            try:
+                with open(path, 'r') as entryfile:
+                    entries.append((os.path.getmtime(path), path, json.load(entryfile)['digest']))
+            except (IOError, OSError, ValueError, KeyError):
+                continue
+        entries.sort()
+        references = collections.Counter(digest for _, _, digest in entries)
+        # bodies no entry refers to any more are removed first
+        for digest in set(sizes) - set(references):
+            self._remove(os.path.join(self.blobs, digest))
+            total -= sizes[digest]
+        while entries and total > self.max_size:
+            _, path, digest = entries.pop(0)
+            self._remove(path)
+            references[digest] -= 1
+            if not references[digest]:
+                self._remove(os.path.join(self.blobs, digest))
+                total -= sizes.get(digest, 0)
+        return
+
+    def _entry_path(self, key):
+        return os.path.join(self.entries, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    def _blob_sizes(self):
+        """Maps the digest of every stored body to its size, skipping partially written files"""
+        sizes = {}
+        try:
+            for blob in os.scandir(self.blobs):
+                if not blob.name.startswith('.'):
+                    try:
+                        sizes[blob.name] = blob.stat().st_size
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return sizes
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return
+
+
+def cached_get(session, url, headers, cache, key, immutable=False):
+    """Performs a GET through a session or a Client, serving the response from the cache where possible.
+
+    Immutable responses are served from the cache without a request, other
+    cached responses are revalidated with If-None-Match and served from the
+    cache on a 304."""
+    cached, r, headers = start_cached_get(cache, key, headers, immutable)
+    if r is not None:
+        return r
+    return finish_cached_get(session.get(url, headers=headers), cache, key, cached, immutable)
+
+
+def start_cached_get(cache, key, headers, immutable=False):
+    """Returns the cached (etag, text), a response to serve without a request and the request headers"""
+    cached = cache.get(key)
+    if cached is not None:
+        etag, text = cached
+        if immutable:
+            return cached, CachedResponse(text), headers
+        if etag:
+            headers = dict(headers, **{'If-None-Match': etag})
+    return cached, None, headers
+
+
+def finish_cached_get(r, cache, key, cached, immutable=False):
+    """Returns the response to serve for r, keeping a successful one in the cache"""
+    if r.status_code == 304 and cached is not None:
+        return CachedResponse(cached[1])
+    if r.status_code == 200:
+        etag = r.headers.get('ETag')
+        if etag or immutable:
+            cache.put(key, etag, r.text)
+    return r
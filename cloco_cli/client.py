@@ -0,0 +1,295 @@
+import json
+import re
+from urllib.parse import urljoin
+
+from cloco_cli.api import (RequestFailed, cache_key, get_cache, get_headers_with_mime, get_last_known_good, get_token,
+                           get_url)
+from cloco_cli.cache import cached_get
+from cloco_cli.config import read_profile_config
+from cloco_cli.trace import span
+
+DEFAULT_MIME_TYPE = 'application/x-www-form-urlencoded'
+
+NEXT_LINK = re.compile(r'<([^>]*)>[^,]*;\s*rel="?next"?')
+
+
+class Client(object):
+    """A client for the cloco API.
+
+    Subscription, application and environment identifiers that are left
+    empty default to the preferences of the configuration profile.  Calls
+    return the decoded JSON, or the text for calls that do not return JSON,
+    and raise RequestFailed when unsuccessful.  Creating a client for a
+    profile that is not initialized raises ConfigurationMissing."""
+
+    def __init__(self, config=None, profile=None):
+        self.config = config if config is not None else read_profile_config(profile)
+
+    @property
+    def url(self):
+        return get_url(self.config)
+
+    def subscription(self, sub=''):
+        return sub or self.config['preferences']['subscription']
+
+    def application(self, app=''):
+        return app or self.config['preferences']['application']
+
+    def environment(self, env=''):
+        return env or self.config['preferences']['environment']
+
+    def subscription_url(self, sub=''):
+        return '{0}/{1}'.format(self.url, self.subscription(sub))
+
+    def application_url(self, app='', sub=''):
+        return '{0}/applications/{1}'.format(self.subscription_url(sub), self.application(app))
+
+    def configuration_url(self, cob, env='', app='', sub=''):
+        return '{0}/configuration/{1}/{2}/{3}'.format(
+            self.subscription_url(sub), self.application(app), cob, self.environment(env))
+
+    def version_url(self, cob, env='', app='', sub=''):
+        return '{0}/configuration/versions/{1}/{2}/{3}'.format(
+            self.subscription_url(sub), self.application(app), cob, self.environment(env))
+
+    def client_url(self, name, sub=''):
+        return '{0}/clients/{1}'.format(self.subscription_url(sub), name)
+
+    def applications_url(self, sub=''):
+        return '{0}/applications'.format(self.subscription_url(sub))
+
+    def configuration_list_url(self, app='', sub=''):
+        return '{0}/configuration/{1}'.format(self.subscription_url(sub), self.application(app))
+
+    def authenticate(self):
+        """Returns a valid access token, raising AuthenticationFailed if the credentials are rejected"""
+        return get_token(self.config)
+
+    def request(self, method, u, mime_type='application/json', headers=None, **kwargs):
+        """Sends an authenticated request and returns the response"""
+        self.authenticate()
+        all_headers = get_headers_with_mime(self.config, mime_type)
+        all_headers.update(headers or {})
+        # imported here so that commands only load the HTTP stack when they call the API
+        from cloco_cli.session import get_session
+        return get_session(self.config).request(method, u, headers=all_headers, **kwargs)
+
+    def get(self, u, headers=None, **kwargs):
+        """Sends an authenticated GET, so the client can stand in for a session"""
+        return self.request('GET', u, headers=headers, **kwargs)
+
+    def call(self, method, u, body=None, data=None, mime_type='application/json', headers=None, result='json'):
+        """Sends a request and decodes the response, body is encoded as JSON and data is sent as is"""
+        if body is not None:
+            data = json.dumps(body)
+        return decode(self.request(method, u, mime_type, headers, data=data), result)
+
+    def pages(self, u, limit=0, page=0, follow=False):
+        """Yields the decoded pages of a list, following the Link rel="next" header when follow is set"""
+        params = page_params(limit, page)
+        while u:
+            r = self.request('GET', u, params=params)
+            yield decode(r)
+            u = next_link(u, r.headers.get('link', '')) if follow else None
+            # the next link carries its own query string
+            params = None
+        return
+
+    def items(self, u, limit=0, page=0, follow=False):
+        """Yields the items of a list page by page, so each page is released once consumed"""
+        for document in self.pages(u, limit, page, follow):
+            for item in page_items(document):
+                yield item
+        return
+
+    # user
+
+    def me(self):
+        return self.call('GET', '{0}/me'.format(self.url))
+
+    def list_credentials(self):
+        return self.call('GET', '{0}/user/credentials'.format(self.url))
+
+    def create_credentials(self):
+        return self.call('POST', '{0}/user/credentials'.format(self.url), {'grant_type': 'client_credentials'})
+
+    def delete_credentials(self, key):
+        return self.call('DELETE', '{0}/user/credentials/{1}'.format(self.url, key), result='text')
+
+    # subscriptions
+
+    def list_subscriptions(self):
+        return self.call('GET', self.url)
+
+    def create_subscription(self, sub):
+        return self.call('POST', '{0}/subscription'.format(self.url), {'subscriptionId': sub})
+
+    def get_subscription(self, sub=''):
+        return self.call('GET', self.subscription_url(sub))
+
+    def delete_subscription(self, sub):
+        # never defaulted from the preferences
+        return self.call('DELETE', '{0}/{1}'.format(self.url, sub), result='text')
+
+    def list_subscription_permissions(self, sub=''):
+        return self.call('GET', '{0}/permissions'.format(self.subscription_url(sub)))
+
+    def create_subscription_permission(self, username, role='user', sub=''):
+        return self.call('POST', '{0}/permissions'.format(self.subscription_url(sub)),
+                         {'permissionLevel': role, 'identity': username}, result='text')
+
+    def delete_subscription_permission(self, username, sub=''):
+        return self.call('DELETE', '{0}/permissions/{1}'.format(self.subscription_url(sub), username),
+                         result='text')
+
+    def list_clients(self, sub=''):
+        return self.call('GET', '{0}/clients'.format(self.subscription_url(sub)))
+
+    def create_client(self, name, sub=''):
+        return self.call('PUT', self.client_url(name, sub), {}, result='text')
+
+    def delete_client(self, name, sub=''):
+        return self.call('DELETE', self.client_url(name, sub), result='text')
+
+    def list_client_credentials(self, name, sub=''):
+        return self.call('GET', '{0}/credentials'.format(self.client_url(name, sub)))
+
+    def create_client_credentials(self, name, sub=''):
+        return self.call('POST', '{0}/credentials'.format(self.client_url(name, sub)),
+                         {'grant_type': 'client_credentials'})
+
+    def delete_client_credentials(self, name, key, sub=''):
+        return self.call('DELETE', '{0}/credentials/{1}'.format(self.client_url(name, sub), key), result='text')
+
+    # applications
+
+    def list_applications(self, sub=''):
+        return self.call('GET', self.applications_url(sub))
+
+    def get_application(self, app='', sub=''):
+        return self.call('GET', self.application_url(app, sub))
+
+    def put_application(self, data, app='', sub='', headers=None):
+        """Saves the application metadata, data may be a string, bytes or a file object"""
+        return self.call('PUT', self.application_url(app, sub), data=data, headers=headers, result='text')
+
+    def delete_application(self, app, sub=''):
+        # never defaulted from the preferences
+        return self.call('DELETE', '{0}/applications/{1}'.format(self.subscription_url(sub), app), result='text')
+
+    def list_application_permissions(self, app='', sub=''):
+        return self.call('GET', '{0}/permissions'.format(self.application_url(app, sub)))
+
+    def create_application_permission(self, username, role='read', app='', sub=''):
+        return self.call('POST', '{0}/permissions'.format(self.application_url(app, sub)),
+                         {'permissionLevel': role, 'identity': username}, result='text')
+
+    def delete_application_permission(self, username, app='', sub=''):
+        return self.call('DELETE', '{0}/permissions/{1}'.format(self.application_url(app, sub), username),
+                         result='text')
+
+    # configuration
+
+    def list_configuration(self, app='', sub=''):
+        return self.call('GET', self.configuration_list_url(app, sub))
+
+    def get_configuration(self, cob, env='', app='', sub=''):
+        return self.call('GET', self.configuration_url(cob, env, app, sub))
+
+    def configuration_key(self, cob, env='', app='', sub=''):
+        """Returns the key of a configuration object in the caches"""
+        return cache_key(self.config, self.subscription(sub), self.application(app), cob, self.environment(env))
+
+    def fetch_configuration(self, cob, env='', app='', sub='', no_cache=False, cache=None):
+        """Returns the response for a configuration object, revalidating a copy in the response cache.
+
+        cache defaults to the response cache on disk.  A response from the
+        API is kept as the last known good copy."""
+        u = self.configuration_url(cob, env, app, sub)
+        key = self.configuration_key(cob, env, app, sub)
+        if no_cache:
+            r = self.get(u)
+        else:
+            r = cached_get(self, u, {}, cache if cache is not None else get_cache(self.config), key)
+        keep_last_known_good(key, r)
+        return r
+
+    def put_configuration(self, cob, data, env='', app='', sub='', mime_type=DEFAULT_MIME_TYPE, headers=None):
+        """Saves configuration data, which may be a string, bytes or a file object"""
+        return self.call('PUT', self.configuration_url(cob, env, app, sub), data=data, mime_type=mime_type,
+                         headers=headers, result='text')
+
+    def list_configuration_versions(self, cob, env='', app='', sub=''):
+        return self.call('GET', self.version_url(cob, env, app, sub))
+
+    def get_configuration_version(self, cob, version, env='', app='', sub=''):
+        return self.call('GET', '{0}/{1}'.format(self.version_url(cob, env, app, sub), version))
+
+    def fetch_configuration_version(self, cob, version, env='', app='', sub='', no_cache=False):
+        """Returns the response for a configuration version through the response cache"""
+        u = '{0}/{1}'.format(self.version_url(cob, env, app, sub), version)
+        if no_cache:
+            return self.get(u)
+        key = cache_key(self.config, self.subscription(sub), self.application(app), cob, self.environment(env),
+                        version)
+        # versions are immutable so a cached copy never needs revalidating
+        return cached_get(self, u, {}, get_cache(self.config), key, immutable=True)
+
+    def restore_configuration_version(self, cob, version, env='', app='', sub=''):
+        return self.call('PUT', '{0}/{1}'.format(self.version_url(cob, env, app, sub), version))
+
+    def list_configuration_permissions(self, cob, env='', app='', sub=''):
+        return self.call('GET', '{0}/permissions'.format(self.configuration_url(cob, env, app, sub)))
+
+    def create_configuration_permission(self, cob, username, role='read', env='', app='', sub=''):
+        return self.call('POST', '{0}/permissions'.format(self.configuration_url(cob, env, app, sub)),
+                         {'permissionLevel': role, 'identity': username}, result='text')
+
+    def delete_configuration_permission(self, cob, username, env='', app='', sub=''):
+        return self.call('DELETE', '{0}/permissions/{1}'.format(self.configuration_url(cob, env, app, sub), username),
+                         result='text')
+
+
+def keep_last_known_good(key, r):
+    """Stores a successful response as the last known good copy.
+
+    A response served from a cache was stored when it was first fetched,
+    so it is skipped rather than read back and compared."""
+    if r.status_code == 200 and not getattr(r, 'from_cache', False):
+        get_last_known_good().put(key, r.text)
+    return
+
+
+def decode(r, result='json'):
+    """Returns the decoded JSON or the text of a successful response, raising RequestFailed otherwise"""
+    if r.status_code != 200:
+        raise RequestFailed(r)
+    if result == 'json':
+        with span('decode'):
+            return json.loads(r.text)
+    return r.text
+
+
+def page_params(limit=0, page=0):
+    """Returns the query parameters selecting a page of a list, or None for the whole list"""
+    params = {}
+    if limit:
+        params['limit'] = limit
+    if page:
+        params['page'] = page
+    return params or None
+
+
+def page_items(document):
+    """Returns the items of a list page, either a JSON array or an object holding an items array"""
+    if isinstance(document, dict):
+        return document['items'] if isinstance(document.get('items'), list) else [document]
+    return document
+
+
+def next_link(u, header):
+    """Returns the absolute url of the rel="next" entry of a Link header, or None"""
+    match = NEXT_LINK.search(header or '')
+    if match is None:
+        return None
+    return urljoin(u, match.group(1))
@@ -0,0 +1,61 @@
+import click
+import os
+import socket
+import sys
+
+from cloco_cli.agent import DEFAULT_TTL, AgentResponse, MemoryCache, create_agent_server
+from cloco_cli.api import AuthenticationFailed, authenticate
+from cloco_cli.client import Client
+from cloco_cli.config import check_profile, config_exists, get_agent_path, get_profile, load_config
+
+
+@click.command()
+@click.option('--socket', 'path', help='The socket path, default to $CLOCO_AGENT_SOCKET or ~/.cloco/agent.sock', default='')
+@click.option('--ttl', help='Seconds to serve configuration from memory before revalidating, default to revalidating every request', default=DEFAULT_TTL, type=int)
+def agent(path, ttl):
+    """Serves configuration to local cloco commands over a Unix domain socket."""
+    authenticate(load_config())
+    fetch = configuration_fetcher(MemoryCache(ttl))
+    path = path or get_agent_path()
+    try:
+        server = create_agent_server(path, fetch)
+    except (RuntimeError, socket.error) as e:
+        click.echo(click.style(str(e), fg='red'))
+        sys.exit('Agent failed.')
+    click.echo(click.style('Agent listening on {0}'.format(path), fg='yellow'))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(path)
+    return
+
+
+def configuration_fetcher(memory):
+    """Returns the function answering agent requests, serving configuration through the memory cache"""
+
+    def fetch(request):
+        try:
+            profile = check_profile(request.get('profile')) or get_profile()
+        except ValueError as e:
+            return AgentResponse(400, str(e))
+        if not config_exists(profile):
+            return AgentResponse(400, 'Profile "{0}" is not initialized.'.format(profile))
+        client = Client(load_config(profile))
+        sub, app, cob, env = (request.get(k, '') for k in ('sub', 'app', 'cob', 'env'))
+        key = client.configuration_key(cob, env, app, sub)
+        text = memory.fresh(key)
+        if text is not None:
+            return AgentResponse(200, text)
+        try:
+            # the memory stands in for the response cache, so each request is revalidated with its ETag
+            r = client.fetch_configuration(cob, env, app, sub, cache=memory)
+        except AuthenticationFailed as e:
+            return e.response
+        if r.status_code == 200:
+            memory.revalidated(key)
+        return r
+
+    return fetch
@@ -0,0 +1,105 @@
+import click
+import os
+import sys
+
+from cloco_cli.api import print_json, print_text, request_errors
+from cloco_cli.client import Client
+from cloco_cli.listing import list_options, print_items
+from cloco_cli.stream import open_upload
+
+
+@click.group()
+def application():
+    """A subgroup of commands for applications"""
+
+
+@application.command('list')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@list_options
+def list_applications(sub, limit, page, follow, ndjson, fields):
+    """Returns a list of the applications in the subscription"""
+    client = Client()
+    u = client.applications_url(sub)
+    with request_errors():
+        print_items(client.items(u, limit, page, follow), ndjson, fields)
+    return
+
+
+@application.command('get')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+def get_application(sub, app):
+    """Retrieves the application metadata"""
+    with request_errors():
+        print_json(Client().get_application(app, sub))
+    return
+
+
+@application.command('put')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--filename', help='The file containing the application JSON data, or - to read stdin')
+@click.option('--gzip', 'compress', help='Compress the request body, the server must accept gzip content encoding', default=False, is_flag=True)
+def put_application(sub, app, filename, compress):
+    """Saves the application metadata"""
+    if filename != '-' and not os.path.isfile(filename):
+        click.echo(click.style(
+            'File "{0}" not found'.format(filename), fg='red'))
+        sys.exit('Invalid input.')
+    headers = {'content-encoding': 'gzip'} if compress else None
+    with request_errors(), open_upload(filename, compress) as body:
+        print_text(Client().put_application(body, app, sub, headers))
+    return
+
+
+@application.command('delete')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier')
+def delete_application(sub, app):
+    """Deletes the application"""
+    with request_errors():
+        print_text(Client().delete_application(app, sub))
+    return
+
+
+@application.group('permissions')
+def application_permissions():
+    """A subgroup of commands for application permissions"""
+    return
+
+
+@application_permissions.command('list')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@list_options
+def list_application_permissions(sub, app, limit, page, follow, ndjson, fields):
+    """Returns a list of the application permissions"""
+    client = Client()
+    u = '{0}/permissions'.format(client.application_url(app, sub))
+    with request_errors():
+        print_items(client.items(u, limit, page, follow), ndjson, fields)
+    return
+
+
+@application_permissions.command('create')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--username', help='The username to be added to the subscription')
+@click.option('--admin', 'role', flag_value='admin', help='The user role (admin | read)')
+@click.option('--read', 'role', flag_value='read', help='The user role (admin | read)', default=True)
+def create_application_permission(sub, app, username, role):
+    """Creates or modifies permissions in an application."""
+    with request_errors():
+        print_text(Client().create_application_permission(username, role, app, sub))
+    return
+
+
+@application_permissions.command('delete')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--username', help='The username to be added to the subscription')
+def delete_application_permission(sub, app, username):
+    """Deletes the user from the application"""
+    with request_errors():
+        print_text(Client().delete_application_permission(username, app, sub))
+    return
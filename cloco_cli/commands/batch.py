@@ -0,0 +1,49 @@
+import click
+import json
+import sys
+
+from cloco_cli.batch import capturing_streams, invoke, parse_line, run_ordered
+
+
+@click.command('batch')
+@click.option('--parallel', help='The number of lines to run at once, only for lines that do not depend on each other',
+              default=1, type=click.IntRange(1))
+@click.argument('script', type=click.File('r'), default='-')
+@click.pass_context
+def batch(ctx, parallel, script):
+    """Runs cloco commands read from a file or stdin in one process."""
+    group, parent = ctx.parent.command, ctx.parent
+    lines = enumerate(script, 1)
+
+    with capturing_streams() as (stdout, stderr):
+        def run(numbered):
+            number, line = numbered
+            try:
+                parsed = parse_line(line)
+            except ValueError as e:
+                return {'line': number, 'exit': 2, 'stdout': '', 'stderr': 'Cannot parse the line: {0}\n'.format(e)}
+            if parsed is None:
+                return None
+            line_id, args = parsed
+            with stdout.capture() as out, stderr.capture() as err:
+                code = invoke(group, parent, args)
+            result = {'line': number, 'args': args, 'exit': code, 'stdout': out.getvalue(), 'stderr': err.getvalue()}
+            if line_id is not None:
+                result['id'] = line_id
+            return result
+
+        failed = []
+
+        def emit(result):
+            if result is None:
+                return
+            if result['exit'] != 0:
+                failed.append(result['line'])
+            click.echo(json.dumps(result, separators=(',', ':')))
+            return
+
+        run_ordered(run, lines, parallel, emit)
+    if failed:
+        click.echo('{0} line(s) failed.'.format(len(failed)), err=True)
+        sys.exit(1)
+    return
@@ -0,0 +1,501 @@
+import click
+import gzip
+import json
+import os
+import subprocess
+import sys
+import time
+
+from cloco_cli.agent import agent_get
+from cloco_cli.api import (RequestFailed, cache_key, get_last_known_good, print_bulk_summary, print_json,
+                           print_json_response, print_text, request_errors)
+from cloco_cli.bulk import (DEFAULT_WORKERS, content_hash, guess_mime_type, list_configuration_objects,
+                            read_manifest, run_parallel, walk_configuration_tree)
+from cloco_cli.cache import CachedResponse
+from cloco_cli.client import Client
+from cloco_cli.listing import list_options, print_items
+from cloco_cli.config import get_agent_path, get_profile
+from cloco_cli.diff import diff_payloads
+from cloco_cli.fallback import format_age
+from cloco_cli.files import atomic_writer, write_atomic
+from cloco_cli.output import fail
+from cloco_cli.stream import CHUNK_SIZE, iter_configuration_data, open_upload
+from cloco_cli.watch import DEFAULT_MAX_INTERVAL, DEFAULT_MIN_INTERVAL, watch
+
+
+@click.group()
+def configuration():
+    """A subgroup of commands for configuration"""
+
+
+@configuration.command('list')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@list_options
+def list_configuration(sub, app, limit, page, follow, ndjson, fields):
+    """Lists the configuration objects for an application"""
+    client = Client()
+    u = client.configuration_list_url(app, sub)
+    with request_errors():
+        print_items(client.items(u, limit, page, follow), ndjson, fields)
+    return
+
+
+@configuration.command('get')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--cob', help='The configuration object identifier')
+@click.option('--env', help='The environment identifier, if not supplied will use the environment stored in preferences', default='')
+@click.option('--raw', 'output', flag_value='raw', help='Return the raw configuration data with no decoding', default=True)
+@click.option('--json', 'output', flag_value='json', help='Return the configuration metadata and data JSON')
+@click.option('--no-cache', help='Bypass the local response cache', default=False, is_flag=True)
+@click.option('--output', 'output_file', help='Stream the configuration to this file, or to stdout for -, without styling', default='')
+@click.option('--fallback', help='stale serves the last known good copy at once, on-error serves it when the API fails',
+              type=click.Choice(['none', 'stale', 'on-error']), default='none', envvar='CLOCO_FALLBACK')
+@click.option('--refresh/--no-refresh', help='Refresh a stale copy in the background, default to refreshing', default=True)
+def get_configuration(sub, app, cob, env, output, no_cache, output_file, fallback, refresh):
+    """Retrieves the configuration objects for an application"""
+    from requests.exceptions import RequestException
+    if output_file:
+        client = Client()
+        with request_errors():
+            r = client.get(client.configuration_url(cob, env, app, sub), stream=True)
+        save_response(r, output, output_file)
+        return
+    r = client = None
+    if fallback != 'none':
+        client = Client()
+        sub, app, env = client.subscription(sub), client.application(app), client.environment(env)
+        key = cache_key(client.config, sub, app, cob, env)
+    if fallback == 'stale':
+        r = serve_last_known_good(key, 'Serving configuration')
+        if r is not None and refresh:
+            refresh_in_background(sub, app, cob, env)
+    try:
+        if r is None and not no_cache:
+            r = agent_get(get_agent_path(), {'profile': get_profile(), 'sub': sub, 'app': app, 'cob': cob, 'env': env})
+        if r is None:
+            client = client or Client()
+            with request_errors():
+                r = client.fetch_configuration(cob, env, app, sub, no_cache)
+    except RequestException as e:
+        if fallback != 'none':
+            r = serve_last_known_good(key, 'The API is unavailable, serving configuration')
+        if r is None:
+            click.echo(click.style(str(e), fg='red'))
+            sys.exit('Request failed.')
+    if fallback != 'none' and r.status_code >= 500:
+        r = serve_last_known_good(key, 'The API failed, serving configuration') or r
+    if output == 'raw':
+        if r.status_code != 200:
+            fail(r)
+        print_text(json.loads(r.text)['configurationData'])
+    else:
+        print_json_response(r)
+    return
+
+
+def serve_last_known_good(key, message):
+    """Returns the last known good copy as a response after reporting its age, or None if there is none"""
+    stored = get_last_known_good().get(key)
+    if stored is None:
+        return None
+    fetched, text = stored
+    click.echo(click.style('{0} stored {1} ago'.format(message, format_age(time.time() - fetched)), fg='yellow'),
+               err=True)
+    return CachedResponse(text)
+
+
+def refresh_in_background(sub, app, cob, env):
+    """Starts a detached cloco process that fetches the configuration, updating the last known good copy"""
+    # the child must reach the API, a stale fallback would serve the copy again and spawn another child
+    args = [sys.executable, '-c', 'from cloco_cli.cli import main; main()', '--profile', get_profile(),
+            'configuration', 'get', '--sub', sub, '--app', app, '--cob', cob, '--env', env, '--json',
+            '--fallback', 'none', '--no-refresh']
+    environ = dict((name, value) for name, value in os.environ.items() if name != 'CLOCO_FALLBACK')
+    with open(os.devnull, 'wb') as devnull:
+        subprocess.Popen(args, stdin=devnull, stdout=devnull, stderr=devnull, close_fds=True,
+                         start_new_session=True, env=environ)
+    return
+
+
+@configuration.command('put')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--cob', help='The configuration object identifier')
+@click.option('--env', help='The environment identifier')
+@click.option('--filename', help='The file containing the configuration data, or - to read stdin', default='')
+@click.option('--data', help='A raw string of configuration data', default='')
+@click.option('--mime-type', help='The MIME type for the data, default to application/x-www-form-urlencoded', default='application/x-www-form-urlencoded')
+@click.option('--gzip', 'compress', help='Compress the request body, the server must accept gzip content encoding', default=False, is_flag=True)
+def put_configuration(sub, app, cob, env, filename, data, mime_type, compress):
+    """Retrieves the application"""
+    if filename:
+        if filename != '-' and not os.path.isfile(filename):
+            click.echo(click.style(
+                'File "{0}" not found'.format(filename), fg='red'))
+            sys.exit('Invalid input.')
+        body = open_upload(filename, compress)
+    else:
+        if not data:
+            click.echo(click.style('No filename or data found', fg='red'))
+            sys.exit('Invalid input.')
+        body = gzip.compress(data.encode('utf-8')) if compress else data
+    headers = {'content-encoding': 'gzip'} if compress else None
+    try:
+        with request_errors():
+            print_text(Client().put_configuration(cob, body, env, app, sub, mime_type, headers))
+    finally:
+        if filename:
+            body.close()
+    return
+
+
+@configuration.command('pull')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--env', help='The environment identifier, used for manifest entries without one and to filter the full list', default='')
+@click.option('--manifest', help='A file listing the configuration objects to pull, one "cob [env]" per line', default='')
+@click.option('--target', help='The directory to write the configuration to, default to the current directory', default='.')
+@click.option('--workers', help='The number of concurrent requests', default=DEFAULT_WORKERS, type=int)
+def pull_configuration(sub, app, env, manifest, target, workers):
+    """Retrieves many configuration objects concurrently into a directory"""
+    client = Client()
+    if manifest:
+        if not os.path.isfile(manifest):
+            click.echo(click.style(
+                'File "{0}" not found'.format(manifest), fg='red'))
+            sys.exit('Invalid input.')
+        objects = read_manifest(manifest, client.environment(env))
+    else:
+        with request_errors():
+            items = client.items(client.configuration_list_url(app, sub), follow=True)
+            objects = list_configuration_objects(items, env)
+    app = client.application(app)
+
+    def pull(item):
+        cob, cob_env = item
+        data = client.get_configuration(cob, cob_env, app, sub)['configurationData']
+        write_atomic(os.path.join(target, app, cob, cob_env), data.encode('utf-8'))
+        return len(data)
+
+    results = run_parallel(pull, objects, workers)
+    print_bulk_summary(results, '{0} characters written')
+    return
+
+
+@configuration.command('push')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='Only push this application, default to every application in the source directory', default='')
+@click.option('--env', help='Only push this environment, default to every environment in the source directory', default='')
+@click.option('--source', help='The directory laid out as app/cob/env to upload, default to the current directory', default='.')
+@click.option('--mime-type', help='The MIME type for files with an unknown extension, default to application/x-www-form-urlencoded', default='application/x-www-form-urlencoded')
+@click.option('--workers', help='The number of concurrent requests', default=DEFAULT_WORKERS, type=int)
+def push_configuration(sub, app, env, source, mime_type, workers):
+    """Uploads the changed configuration files in a directory concurrently"""
+    client = Client()
+    if not os.path.isdir(source):
+        click.echo(click.style(
+            'Directory "{0}" not found'.format(source), fg='red'))
+        sys.exit('Invalid input.')
+    paths = {}
+    for item, path in walk_configuration_tree(source, app, env):
+        if item in paths:
+            click.echo(click.style('"{0}" and "{1}" are both configuration {2}'.format(
+                paths[item], path, '/'.join(item)), fg='red'))
+            sys.exit('Invalid input.')
+        paths[item] = path
+
+    def push(item):
+        item_app, cob, item_env = item
+        with open(paths[item], 'rb') as datafile:
+            body = datafile.read()
+        # revalidated through the response cache, so an unchanged object is not downloaded again
+        r = client.fetch_configuration(cob, item_env, item_app, sub)
+        if r.status_code == 200 and content_hash(json.loads(r.text)['configurationData']) == content_hash(body):
+            return 'unchanged'
+        client.put_configuration(cob, body, item_env, item_app, sub, guess_mime_type(paths[item], mime_type))
+        return 'uploaded'
+
+    results = run_parallel(push, sorted(paths), workers)
+    print_bulk_summary(results, '{0}')
+    return
+
+
+@configuration.command('watch')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--cob', help='A configuration object identifier to watch, may be repeated', multiple=True)
+@click.option('--env', help='The environment identifier, if not supplied will use the environment stored in preferences', default='')
+@click.option('--manifest', help='A file listing the configuration objects to watch, one "cob [env]" per line', default='')
+@click.option('--target', help='The directory to write changed configuration to as app/cob/env', default='')
+@click.option('--exec', 'hook', help='A shell command to run when configuration changes', default='')
+@click.option('--min-interval', help='The poll interval in seconds after a change', default=DEFAULT_MIN_INTERVAL, type=float)
+@click.option('--max-interval', help='The longest poll interval in seconds while nothing changes', default=DEFAULT_MAX_INTERVAL, type=float)
+@click.option('--count', help='Stop after this many polls, default to watching until interrupted', default=0, type=int)
+def watch_configuration(sub, app, cob, env, manifest, target, hook, min_interval, max_interval, count):
+    """Watches configuration objects and acts when they change"""
+    from requests.exceptions import RequestException
+    client = Client()
+    with request_errors():
+        client.authenticate()
+    sub, app, env = client.subscription(sub), client.application(app), client.environment(env)
+    objects = [(c, env) for c in cob]
+    if manifest:
+        if not os.path.isfile(manifest):
+            click.echo(click.style(
+                'File "{0}" not found'.format(manifest), fg='red'))
+            sys.exit('Invalid input.')
+        objects.extend(read_manifest(manifest, env))
+    if not objects:
+        click.echo(click.style('No configuration objects to watch', fg='red'))
+        sys.exit('Invalid input.')
+    state = dict((item, {}) for item in objects)
+
+    def check(item):
+        cob, cob_env = item
+        entry = state[item]
+        path = os.path.join(target, app, cob, cob_env) if target else ''
+        if 'digest' not in entry and path and os.path.isfile(path):
+            with open(path, 'rb') as datafile:
+                entry['digest'] = content_hash(datafile.read())
+        headers = {'If-None-Match': entry['etag']} if entry.get('etag') else None
+        try:
+            r = client.get(client.version_url(cob, cob_env, app, sub), headers=headers)
+            if r.status_code == 304:
+                return False
+            if r.status_code != 200:
+                raise RequestFailed(r)
+            entry['etag'] = r.headers.get('ETag')
+            versions = content_hash(r.text)
+            if versions == entry.get('versions'):
+                return False
+            entry['versions'] = versions
+            r = client.fetch_configuration(cob, cob_env, app, sub)
+            if r.status_code != 200:
+                raise RequestFailed(r)
+            data = json.loads(r.text)['configurationData'].encode('utf-8')
+        except (RequestFailed, RequestException) as e:
+            click.echo(click.style('{0}/{1}: {2}'.format(cob, cob_env, e), fg='red'), err=True)
+            return False
+        if content_hash(data) == entry.get('digest'):
+            return False
+        entry['digest'] = content_hash(data)
+        if path:
+            write_atomic(path, data)
+        click.echo(click.style('{0}/{1}: changed'.format(cob, cob_env), fg='green'))
+        if hook:
+            subprocess.call(hook, shell=True, env=dict(
+                os.environ, CLOCO_SUB=sub, CLOCO_APP=app, CLOCO_COB=cob, CLOCO_ENV=cob_env, CLOCO_FILE=path))
+        return True
+
+    try:
+        watch(objects, check, min_interval, max_interval, count)
+    except KeyboardInterrupt:
+        pass
+    return
+
+
+@configuration.command('diff')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--cob', help='The configuration object identifier, required unless --all is given', default='')
+@click.option('--all', 'all_objects', help='Compare every configuration object in the application', default=False, is_flag=True)
+@click.option('--env', help='The environment to compare from, if not supplied will use the environment stored in preferences', default='')
+@click.option('--to-env', help='The environment to compare to, default to the same environment', default='')
+@click.option('--version', help='The version to compare from, default to the current configuration', default='')
+@click.option('--to-version', help='The version to compare to, default to the current configuration', default='')
+@click.option('--no-cache', help='Bypass the local response cache', default=False, is_flag=True)
+@click.option('--workers', help='The number of concurrent requests', default=DEFAULT_WORKERS, type=int)
+def diff_configuration(sub, app, cob, all_objects, env, to_env, version, to_version, no_cache, workers):
+    """Compares configuration between environments or versions"""
+    client = Client()
+    sub, app, env = client.subscription(sub), client.application(app), client.environment(env)
+    to_env = to_env or env
+    if (env, version) == (to_env, to_version):
+        click.echo(click.style('Supply --to-env, --version or --to-version to compare', fg='red'))
+        sys.exit('Invalid input.')
+    if all_objects:
+        with request_errors():
+            objects = list_configuration_objects(client.items(client.configuration_list_url(app, sub), follow=True))
+        cobs = sorted(set(item[0] for item in objects))
+    elif cob:
+        cobs = [cob]
+    else:
+        click.echo(click.style('Supply --cob or --all', fg='red'))
+        sys.exit('Invalid input.')
+    sides = (env, version), (to_env, to_version)
+
+    def fetch(item):
+        item_cob, (item_env, item_version) = item
+        if item_version:
+            r = client.fetch_configuration_version(item_cob, item_version, item_env, app, sub, no_cache)
+        else:
+            r = client.fetch_configuration(item_cob, item_env, app, sub, no_cache)
+        if r.status_code == 404:
+            return None
+        if r.status_code != 200:
+            raise RequestFailed(r)
+        return json.loads(r.text)['configurationData']
+
+    # both sides of every object are fetched concurrently
+    results = run_parallel(fetch, [(item_cob, side) for item_cob in cobs for side in sides], workers)
+    names = ['{0}@{1}'.format(*side) if side[1] else side[0] for side in sides]
+    differing = failed = 0
+    for i, item_cob in enumerate(cobs):
+        (_, left, left_error), (_, right, right_error) = results[2 * i:2 * i + 2]
+        if left_error is not None or right_error is not None:
+            failed += 1
+            click.echo(click.style('{0}: {1}'.format(item_cob, left_error or right_error), fg='red'))
+            continue
+        lines = diff_payloads(left, right, names[0], names[1])
+        if lines:
+            differing += 1
+            click.echo(click.style('{0}: {1} -> {2}'.format(item_cob, *names), fg='yellow'))
+            for line in lines:
+                click.echo(click.style('  ' + line, fg={'+': 'green', '-': 'red'}.get(line[:1])))
+        elif not all_objects:
+            click.echo(click.style('{0}: no differences'.format(item_cob), fg='green'))
+    if all_objects:
+        click.echo(click.style('{0} of {1} configuration objects differ, {2} failed'.format(
+            differing, len(cobs), failed), fg='yellow' if differing or failed else 'green'))
+    if failed:
+        sys.exit('Request failed.')
+    return
+
+
+@configuration.group('version')
+def configuration_versions():
+    """A subgroup of commands for configuration version history"""
+
+
+@configuration_versions.command('list')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--cob', help='The configuration object identifier')
+@click.option('--env', help='The environment identifier, if not supplied will use the environment stored in preferences', default='')
+@list_options
+def get_configuration_version_history(sub, app, cob, env, limit, page, follow, ndjson, fields):
+    """Retrieves the configuration objects for an application"""
+    client = Client()
+    u = client.version_url(cob, env, app, sub)
+    with request_errors():
+        print_items(client.items(u, limit, page, follow), ndjson, fields)
+    return
+
+
+@configuration_versions.command('get')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--cob', help='The configuration object identifier')
+@click.option('--env', help='The environment identifier, if not supplied will use the environment stored in preferences', default='')
+@click.option('--version', help='The version or revision number')
+@click.option('--raw', 'output', flag_value='raw', help='Return the raw configuration data with no decoding', default=True)
+@click.option('--json', 'output', flag_value='json', help='Return the configuration metadata and data JSON')
+@click.option('--no-cache', help='Bypass the local response cache', default=False, is_flag=True)
+@click.option('--output', 'output_file', help='Stream the configuration to this file, or to stdout for -, without styling', default='')
+def get_configuration_version(sub, app, cob, env, version, output, no_cache, output_file):
+    """Retrieves the configuration objects for an application"""
+    client = Client()
+    if output_file:
+        with request_errors():
+            r = client.get('{0}/{1}'.format(client.version_url(cob, env, app, sub), version), stream=True)
+        save_response(r, output, output_file)
+        return
+    with request_errors():
+        r = client.fetch_configuration_version(cob, version, env, app, sub, no_cache)
+    if output == 'raw':
+        if r.status_code != 200:
+            fail(r)
+        print_text(json.loads(r.text)['configurationData'])
+    else:
+        print_json_response(r)
+    return
+
+
+@configuration_versions.command('restore')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--cob', help='The configuration object identifier')
+@click.option('--env', help='The environment identifier, if not supplied will use the environment stored in preferences', default='')
+@click.option('--version', help='The version or revision number')
+def get_configuration_version(sub, app, cob, env, version):
+    """Retrieves the configuration objects for an application"""
+    with request_errors():
+        print_json(Client().restore_configuration_version(cob, version, env, app, sub))
+    return
+
+
+@configuration.group('permissions')
+def configuration_permissions():
+    """A subgroup of commands for configuration permissions"""
+
+
+@configuration_permissions.command('list')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--cob', help='The configuration object identifier')
+@click.option('--env', help='The environment identifier, if not supplied will use the environment stored in preferences', default='')
+@list_options
+def list_configuration_permissions(sub, app, cob, env, limit, page, follow, ndjson, fields):
+    """Returns a list of the application permissions"""
+    client = Client()
+    u = '{0}/permissions'.format(client.configuration_url(cob, env, app, sub))
+    with request_errors():
+        print_items(client.items(u, limit, page, follow), ndjson, fields)
+    return
+
+
+@configuration_permissions.command('create')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--cob', help='The configuration object identifier')
+@click.option('--env', help='The environment identifier, if not supplied will use the environment stored in preferences', default='')
+@click.option('--username', help='The username to be added to the subscription')
+@click.option('--read', 'role', flag_value='read', help='The user role (read | write)', default=True)
+@click.option('--write', 'role', flag_value='write', help='The user role (read | write)')
+def create_configuration_permission(sub, app, cob, env, username, role):
+    """Creates or modifies permissions on a configuration object."""
+    with request_errors():
+        print_text(Client().create_configuration_permission(cob, username, role, env, app, sub))
+    return
+
+
+@configuration_permissions.command('delete')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--cob', help='The configuration object identifier')
+@click.option('--env', help='The environment identifier, if not supplied will use the environment stored in preferences', default='')
+@click.option('--username', help='The username to be added to the subscription')
+def delete_application_permission(sub, app, cob, env, username):
+    """Deletes the user from the configuration"""
+    with request_errors():
+        print_text(Client().delete_configuration_permission(cob, username, env, app, sub))
+    return
+
+
+def save_response(r, output, output_file):
+    """Streams the configuration data, or the whole response for --json, to a file or stdout.
+
+    Files are written through a temporary file and renamed into place when
+    the download completes."""
+    from requests.exceptions import RequestException
+    if r.status_code != 200:
+        fail(r)
+    chunks = r.iter_content(CHUNK_SIZE)
+    if output == 'raw':
+        chunks = (data.encode('utf-8') for data in iter_configuration_data(chunks))
+    try:
+        if output_file == '-':
+            stream = getattr(sys.stdout, 'buffer', sys.stdout)
+            for chunk in chunks:
+                stream.write(chunk)
+            stream.flush()
+        else:
+            with atomic_writer(output_file) as datafile:
+                for chunk in chunks:
+                    datafile.write(chunk)
+    except (ValueError, RequestException) as e:
+        click.echo(click.style(str(e), fg='red'))
+        sys.exit('Request failed.')
+    return
@@ -0,0 +1,35 @@
+import click
+
+from cloco_cli.api import print_json, print_text, request_errors
+from cloco_cli.client import Client
+
+
+@click.group()
+def credentials():
+    """A subgroup of commands for subscriptions"""
+    return
+
+
+@credentials.command('list')
+def list_credentials():
+    """Returns a list of the credentials the current user has access to"""
+    with request_errors():
+        print_json(Client().list_credentials())
+    return
+
+
+@credentials.command('create')
+def create_credentials():
+    """Creates client credentials."""
+    with request_errors():
+        print_json(Client().create_credentials())
+    return
+
+
+@credentials.command('delete')
+@click.option('--key', help='The client key of the credentials to be deleted')
+def delete_credentials(key):
+    """Deletes client credentials."""
+    with request_errors():
+        print_text(Client().delete_credentials(key))
+    return
@@ -0,0 +1,12 @@
+import click
+
+from cloco_cli.api import print_json, request_errors
+from cloco_cli.client import Client
+
+
+@click.command()
+def me():
+    """Returns the current user's information."""
+    with request_errors():
+        print_json(Client().me())
+    return
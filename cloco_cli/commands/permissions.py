@@ -0,0 +1,112 @@
+import click
+import sys
+
+from cloco_cli.api import print_json
+from cloco_cli.bulk import DEFAULT_WORKERS, list_configuration_objects, run_parallel
+from cloco_cli.client import Client
+from cloco_cli.output import get_output_mode
+from cloco_cli.permissions import (change_level, current_permissions, describe_change, describe_level,
+                                   desired_permissions, load_manifest, manifest_grants, plan_changes, wildcard_apps)
+
+CHANGE_COLOURS = {'add': 'green', 'update': 'yellow', 'remove': 'red'}
+
+
+@click.group()
+def permissions():
+    """A subgroup of commands for permissions"""
+    return
+
+
+@permissions.command('sync')
+@click.option('--sub', help='The subscription identifier, will use the subscription in the manifest or stored in the preferences if not supplied', default='')
+@click.option('--plan', help='Prints the changes without applying them', default=False, is_flag=True)
+@click.option('--prune/--no-prune', help='Revokes the permissions missing from the manifest on the levels it lists, default to revoking them', default=True)
+@click.option('--workers', help='The number of concurrent requests', default=DEFAULT_WORKERS, type=int)
+@click.argument('manifest', type=click.Path(exists=True, dir_okay=False))
+def sync_permissions(sub, plan, prune, workers, manifest):
+    """Makes the permissions match a manifest with the fewest calls."""
+    try:
+        document = load_manifest(manifest)
+        grants = manifest_grants(document)
+    except ValueError as e:
+        click.echo(click.style(str(e), fg='red'))
+        sys.exit('Invalid input.')
+    client = Client()
+    sub = client.subscription(sub or document.get('subscription', ''))
+
+    def list_objects(app):
+        return list_configuration_objects(client.items(client.configuration_list_url(app, sub), follow=True))
+
+    apps = wildcard_apps(grants)
+    objects = dict(zip(apps, collect(run_parallel(list_objects, apps, workers))))
+    try:
+        desired = desired_permissions(grants, objects)
+    except ValueError as e:
+        click.echo(click.style(str(e), fg='red'))
+        sys.exit('Invalid input.')
+
+    def list_level(level):
+        return current_permissions(client.items(permissions_url(client, level, sub), follow=True))
+
+    levels = sorted(desired)
+    current = dict(zip(levels, collect(run_parallel(list_level, levels, workers), describe_level)))
+    changes = plan_changes(desired, current, prune)
+    print_plan(changes)
+    if plan or not changes:
+        return
+
+    collect(run_parallel(lambda change: apply_change(client, change, sub), changes, workers), describe_change)
+    if get_output_mode() == 'pretty':
+        click.echo(click.style('Applied {0} change(s).'.format(len(changes)), fg='green'))
+    return
+
+
+def collect(results, describe=str):
+    """Returns the results of run_parallel, reporting every failure before exiting"""
+    failed = False
+    for item, result, error in results:
+        if error is not None:
+            failed = True
+            click.echo(click.style('{0}: {1}'.format(describe(item), error), fg='red'), err=True)
+    if failed:
+        sys.exit('Request failed.')
+    return [result for item, result, error in results]
+
+
+def permissions_url(client, level, sub):
+    """Returns the url of the permission list of a subscription, application or configuration object level"""
+    if not level:
+        return '{0}/permissions'.format(client.subscription_url(sub))
+    if len(level) == 1:
+        return '{0}/permissions'.format(client.application_url(level[0], sub))
+    app, cob, env = level
+    return '{0}/permissions'.format(client.configuration_url(cob, env, app, sub))
+
+
+def apply_change(client, change, sub):
+    """Grants, modifies or revokes one permission"""
+    level, identity = change_level(change), change['identity']
+    if change['action'] == 'remove':
+        if not level:
+            return client.delete_subscription_permission(identity, sub)
+        if len(level) == 1:
+            return client.delete_application_permission(identity, level[0], sub)
+        return client.delete_configuration_permission(level[1], identity, level[2], level[0], sub)
+    # creating a permission that exists modifies its role
+    if not level:
+        return client.create_subscription_permission(identity, change['role'], sub)
+    if len(level) == 1:
+        return client.create_application_permission(identity, change['role'], level[0], sub)
+    return client.create_configuration_permission(level[1], identity, change['role'], level[2], level[0], sub)
+
+
+def print_plan(changes):
+    """Prints the changes, one line each in pretty mode and as a JSON list otherwise"""
+    if get_output_mode() != 'pretty':
+        print_json(changes)
+        return
+    if not changes:
+        click.echo(click.style('The permissions already match the manifest.', fg='green'))
+    for change in changes:
+        click.echo(click.style(describe_change(change), fg=CHANGE_COLOURS[change['action']]))
+    return
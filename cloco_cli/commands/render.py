@@ -0,0 +1,110 @@
+import click
+import json
+import os
+import sys
+
+from cloco_cli.agent import agent_get
+from cloco_cli.api import RequestFailed
+from cloco_cli.bulk import DEFAULT_WORKERS, run_parallel
+from cloco_cli.client import Client
+from cloco_cli.config import get_agent_path, get_profile
+from cloco_cli.files import write_atomic
+from cloco_cli.render import flatten, parse_payload, render_jinja2, render_template
+
+JINJA2_EXTENSIONS = ('.j2', '.jinja', '.jinja2')
+
+
+def fetch_documents(sub, app, env, cobs, no_cache, workers):
+    """Fetches and decodes the configuration objects concurrently, through the agent when one is running"""
+    client = Client()
+    sub, app, env = client.subscription(sub), client.application(app), client.environment(env)
+
+    def fetch(cob):
+        r = None
+        if not no_cache:
+            r = agent_get(get_agent_path(), {'profile': get_profile(), 'sub': sub, 'app': app, 'cob': cob, 'env': env})
+        if r is None:
+            r = client.fetch_configuration(cob, env, app, sub, no_cache)
+        if r.status_code != 200:
+            raise RequestFailed(r)
+        return parse_payload(json.loads(r.text)['configurationData'])
+
+    documents = {}
+    failed = False
+    for cob, document, error in run_parallel(fetch, cobs, workers):
+        if error is not None:
+            failed = True
+            click.echo(click.style('{0}: {1}'.format(cob, error), fg='red'), err=True)
+        documents[cob] = document
+    if failed:
+        sys.exit('Request failed.')
+    return documents
+
+
+def flatten_documents(cobs, documents, prefix):
+    """Flattens the documents into one set of variables, later objects override earlier ones"""
+    variables = {}
+    for cob in cobs:
+        variables.update(flatten(documents[cob], prefix))
+    return variables
+
+
+@click.command('exec', context_settings={'allow_interspersed_args': False})
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--cob', 'cobs', help='A configuration object identifier, may be repeated', multiple=True, required=True)
+@click.option('--env', help='The environment identifier, if not supplied will use the environment stored in preferences', default='')
+@click.option('--prefix', help='A prefix for the environment variable names', default='')
+@click.option('--no-cache', help='Bypass the agent and the local response cache', default=False, is_flag=True)
+@click.option('--workers', help='The number of concurrent requests', default=DEFAULT_WORKERS, type=int)
+@click.argument('command', nargs=-1, required=True, type=click.UNPROCESSED)
+def exec_command(sub, app, cobs, env, prefix, no_cache, workers, command):
+    """Replaces cloco with a command that has configuration in its environment."""
+    documents = fetch_documents(sub, app, env, cobs, no_cache, workers)
+    os.environ.update(flatten_documents(cobs, documents, prefix))
+    try:
+        os.execvp(command[0], list(command))
+    except OSError as e:
+        click.echo(click.style('Cannot run "{0}": {1}'.format(command[0], e.strerror), fg='red'), err=True)
+        sys.exit(127)
+    return
+
+
+@click.command('render')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--app', help='The application identifier, will use the application stored in preferences if not supplied', default='')
+@click.option('--cob', 'cobs', help='A configuration object identifier, may be repeated', multiple=True, required=True)
+@click.option('--env', help='The environment identifier, if not supplied will use the environment stored in preferences', default='')
+@click.option('--prefix', help='A prefix for the variable names', default='')
+@click.option('--engine', help='The template engine, default to jinja2 for .j2 templates and $NAME substitution otherwise',
+              type=click.Choice(['template', 'jinja2']), default=None)
+@click.option('--output', 'output_file', help='The file to write, default to stdout', default='')
+@click.option('--no-cache', help='Bypass the agent and the local response cache', default=False, is_flag=True)
+@click.option('--workers', help='The number of concurrent requests', default=DEFAULT_WORKERS, type=int)
+@click.argument('template', type=click.Path(exists=True, dir_okay=False))
+def render_command(sub, app, cobs, env, prefix, engine, output_file, no_cache, workers, template):
+    """Renders a template with configuration values."""
+    if engine is None:
+        engine = 'jinja2' if template.endswith(JINJA2_EXTENSIONS) else 'template'
+    with open(template, 'r') as templatefile:
+        text = templatefile.read()
+    documents = fetch_documents(sub, app, env, cobs, no_cache, workers)
+    variables = flatten_documents(cobs, documents, prefix)
+    try:
+        if engine == 'jinja2':
+            rendered = render_jinja2(text, variables, documents)
+        else:
+            rendered = render_template(text, variables)
+    except ImportError:
+        click.echo(click.style('The jinja2 engine needs jinja2, install it with pip install jinja2', fg='red'),
+                   err=True)
+        sys.exit('Invalid input.')
+    except Exception as e:
+        # unknown variables and template syntax errors
+        click.echo(click.style('Cannot render {0}: {1}'.format(template, e), fg='red'), err=True)
+        sys.exit('Invalid input.')
+    if output_file:
+        write_atomic(output_file, rendered.encode('utf-8'))
+    else:
+        click.echo(rendered, nl=False)
+    return
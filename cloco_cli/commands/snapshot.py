@@ -0,0 +1,220 @@
+import click
+import json
+import os
+import sys
+
+from cloco_cli.api import RequestFailed, request_errors
+from cloco_cli.bulk import (DEFAULT_WORKERS, list_applications, list_configuration_revisions, list_permissions,
+                            run_parallel)
+from cloco_cli.client import Client
+from cloco_cli.files import atomic_writer
+from cloco_cli.snapshot import (SUBSCRIPTION, Checkpoint, SnapshotReader, SnapshotWriter, application_name,
+                                configuration_name, permissions_name)
+
+
+@click.command('export')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--output', 'output_file', help='The snapshot archive to write, a gzip compressed tar', required=True)
+@click.option('--since', help='A previous snapshot, configuration with an unchanged revision is copied from it', default='')
+@click.option('--permissions/--no-permissions', help='Include the permissions in the snapshot, default to including them', default=True)
+@click.option('--workers', help='The number of concurrent requests', default=DEFAULT_WORKERS, type=int)
+def export_snapshot(sub, output_file, since, permissions, workers):
+    """Exports a subscription to a compressed snapshot archive."""
+    client = Client()
+    with request_errors():
+        client.authenticate()
+    sub = client.subscription(sub)
+    previous = SnapshotReader(since) if since else None
+    try:
+        subscription = client.get_subscription(sub)
+        apps = list_applications(client.items(client.applications_url(sub), follow=True))
+    except RequestFailed as e:
+        click.echo(click.style(str(e), fg='red'))
+        sys.exit('Request failed.')
+
+    with atomic_writer(output_file) as archive:
+        snapshot = SnapshotWriter(archive, sub)
+
+        def fetch(task):
+            name, u, listing = task
+            # lists are read page by page and stored as one array
+            document = list(client.items(u, follow=True)) if listing else client.call('GET', u)
+            if name:
+                snapshot.add(name, document)
+            return document
+
+        snapshot.add(SUBSCRIPTION, subscription)
+        snapshot.index['applications'] = apps
+        tasks = [(application_name(app), client.application_url(app, sub), False) for app in apps]
+        tasks += [(None, client.configuration_list_url(app, sub), True) for app in apps]
+        if permissions:
+            tasks.append((permissions_name(), '{0}/permissions'.format(client.subscription_url(sub)), True))
+            tasks += [(permissions_name(app), '{0}/permissions'.format(client.application_url(app, sub)), True)
+                      for app in apps]
+        results = run_parallel(fetch, tasks, workers)
+
+        revisions = {}
+        for (name, u, listing), document, error in results:
+            if error is not None:
+                snapshot.add_error(name or u, error)
+            elif name is None:
+                app = u.rsplit('/', 1)[1]
+                for (cob, env), revision in list_configuration_revisions(document).items():
+                    revisions[(app, cob, env)] = revision
+
+        reused = set()
+        if previous is not None:
+            earlier = dict(((o['app'], o['cob'], o['env']), o['revision']) for o in previous.index['objects'])
+            reused = set(key for key, revision in revisions.items()
+                         if revision is not None and earlier.get(key) == revision)
+            names = dict((configuration_name(*key), key) for key in reused)
+            for name, data in previous.members(names):
+                key = names.pop(name)
+                snapshot.add(name, data)
+                snapshot.add_object(*(key + (revisions[key],)))
+            # objects missing from the previous snapshot are fetched after all
+            reused.difference_update(names.values())
+            previous.close()
+
+        tasks = []
+        for key in sorted(revisions):
+            app, cob, env = key
+            u = client.configuration_url(cob, env, app, sub)
+            if key not in reused:
+                tasks.append((configuration_name(*key), u, False))
+            if permissions:
+                tasks.append((permissions_name(*key), '{0}/permissions'.format(u), True))
+        failed = set()
+        for (name, u, listing), document, error in run_parallel(fetch, tasks, workers):
+            if error is not None:
+                snapshot.add_error(name, error)
+                failed.add(name)
+        for key in sorted(set(revisions) - reused):
+            if configuration_name(*key) not in failed:
+                snapshot.add_object(*(key + (revisions[key],)))
+        snapshot.close()
+
+    for error in snapshot.index['errors']:
+        click.echo(click.style('{0}: {1}'.format(error['name'], error['error']), fg='red'))
+    click.echo(click.style('{0} applications, {1} configuration objects ({2} fetched, {3} reused), {4} errors'.format(
+        len(apps), len(snapshot.index['objects']), len(snapshot.index['objects']) - len(reused), len(reused),
+        len(snapshot.index['errors'])), fg='yellow' if snapshot.index['errors'] else 'green'))
+    if snapshot.index['errors']:
+        sys.exit('Request failed.')
+    return
+
+
+@click.command('import')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--source', help='The snapshot archive, or the directory it was extracted to', required=True)
+@click.option('--checkpoint', help='The file recording restored items, default to the source path with .checkpoint appended', default='')
+@click.option('--create', help='Creates the subscription before restoring into it', default=False, is_flag=True)
+@click.option('--permissions/--no-permissions', help='Restore the permissions in the snapshot, default to restoring them', default=True)
+@click.option('--mime-type', help='The MIME type for configuration data, default to application/x-www-form-urlencoded', default='application/x-www-form-urlencoded')
+@click.option('--workers', help='The number of concurrent requests', default=DEFAULT_WORKERS, type=int)
+def import_snapshot(sub, source, checkpoint, create, permissions, mime_type, workers):
+    """Restores a snapshot archive into a subscription."""
+    client = Client()
+    with request_errors():
+        client.authenticate()
+    sub = client.subscription(sub)
+    if not os.path.exists(source):
+        click.echo(click.style('Snapshot "{0}" not found'.format(source), fg='red'))
+        sys.exit('Invalid input.')
+    reader = SnapshotReader(source)
+    checkpoint = Checkpoint(checkpoint or source.rstrip(os.sep) + '.checkpoint')
+    failed = set()
+    counts = {'restored': 0, 'resumed': 0, 'failed': 0}
+    complete = False
+
+    def step_key(step):
+        # the target subscription is part of every key, so a checkpoint left by an import into
+        # another subscription never marks an item as restored
+        return '/'.join((sub,) + step)
+
+    def restore_subscription(step, data):
+        client.create_subscription(sub)
+        return
+
+    def restore_application(step, data):
+        client.put_application(data, step[1], sub)
+        return
+
+    def restore_configuration(step, data):
+        document = json.loads(data.decode('utf-8'))
+        app, cob, env = step[1:]
+        client.put_configuration(cob, document['configurationData'].encode('utf-8'), env, app, sub, mime_type)
+        return
+
+    def restore_permissions(step, data):
+        if data is None:
+            # exported without permissions
+            return
+        for identity, role in list_permissions(json.loads(data.decode('utf-8'))):
+            if len(step) == 1:
+                client.create_subscription_permission(identity, role, sub)
+            elif len(step) == 2:
+                client.create_application_permission(identity, role, step[1], sub)
+            else:
+                client.create_configuration_permission(step[2], identity, role, step[3], step[1], sub)
+        return
+
+    def run_level(steps):
+        """Restores (step, member name, restore, dependencies) concurrently once their dependencies are restored"""
+        pending = []
+        for step, name, restore, dependencies in steps:
+            if step_key(step) in checkpoint:
+                counts['resumed'] += 1
+            elif failed.intersection(dependencies):
+                failed.add(step)
+                counts['failed'] += 1
+                click.echo(click.style('{0}: skipped, a dependency failed'.format('/'.join(step)), fg='red'))
+            else:
+                pending.append((step, name, restore))
+        documents = dict(reader.members(name for step, name, restore in pending if name))
+
+        def call(item):
+            step, name, restore = item
+            if name and name not in documents and restore is not restore_permissions:
+                raise ValueError('{0} is missing from the snapshot'.format(name))
+            restore(step, documents.get(name))
+            checkpoint.add(step_key(step))
+            return
+
+        for (step, name, restore), result, error in run_parallel(call, pending, workers):
+            if error is None:
+                counts['restored'] += 1
+            else:
+                failed.add(step)
+                counts['failed'] += 1
+                click.echo(click.style('{0}: {1}'.format('/'.join(step), error), fg='red'))
+        return
+
+    apps = reader.index['applications']
+    objects = [(o['app'], o['cob'], o['env']) for o in reader.index['objects']]
+    try:
+        if create:
+            run_level([(('subscription', sub), None, restore_subscription, ())])
+        top = (('subscription', sub),)
+        run_level([(('applications', app), application_name(app), restore_application, top) for app in apps])
+        steps = [(('configuration',) + key, configuration_name(*key), restore_configuration,
+                  top + (('applications', key[0]),)) for key in objects]
+        if permissions:
+            steps.append((('permissions',), permissions_name(), restore_permissions, top))
+            steps += [(('permissions', app), permissions_name(app), restore_permissions,
+                       top + (('applications', app),)) for app in apps]
+        run_level(steps)
+        if permissions:
+            run_level([(('permissions',) + key, permissions_name(*key), restore_permissions,
+                        (('configuration',) + key,)) for key in objects])
+        complete = True
+    finally:
+        reader.close()
+        # keep the checkpoint until every item has been restored
+        checkpoint.close(remove=complete and not counts['failed'])
+
+    click.echo(click.style('{0} restored, {1} already restored, {2} failed'.format(
+        counts['restored'], counts['resumed'], counts['failed']), fg='yellow' if counts['failed'] else 'green'))
+    if counts['failed']:
+        sys.exit('Request failed.')
+    return
@@ -0,0 +1,196 @@
+import click
+import fnmatch
+import sys
+
+from cloco_cli.api import print_json, print_text, request_errors
+from cloco_cli.bulk import DEFAULT_WORKERS, list_clients, run_parallel
+from cloco_cli.client import Client
+from cloco_cli.listing import list_options, print_items
+from cloco_cli.rotation import CredentialSink, rotate_client
+from cloco_cli.snapshot import Checkpoint
+
+
+@click.group()
+def subscription():
+    """A subgroup of commands for subscriptions"""
+    return
+
+
+@subscription.command('list')
+def list_subscriptions():
+    """Returns a list of the subscriptions the current user has access to"""
+    with request_errors():
+        print_json(Client().list_subscriptions())
+    return
+
+
+@subscription.command('create')
+@click.option('--sub', help='The subscription identifier')
+def create_subscription(sub):
+    """Creates a subscription."""
+    with request_errors():
+        print_json(Client().create_subscription(sub))
+    return
+
+
+@subscription.command('get')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+def get_subscription(sub):
+    """Retrieves the subscription"""
+    with request_errors():
+        print_json(Client().get_subscription(sub))
+    return
+
+
+@subscription.command('delete')
+@click.option('--sub', help='The subscription identifier')
+def delete_subscription(sub):
+    """Deletes the subscription"""
+    with request_errors():
+        print_text(Client().delete_subscription(sub))
+    return
+
+
+@subscription.group('permissions')
+def subscription_permissions():
+    """A subgroup of commands for subscription permissions"""
+    return
+
+
+@subscription_permissions.command('list')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@list_options
+def list_subscription_permissions(sub, limit, page, follow, ndjson, fields):
+    """Returns a list of the subscription permissions"""
+    client = Client()
+    u = '{0}/permissions'.format(client.subscription_url(sub))
+    with request_errors():
+        print_items(client.items(u, limit, page, follow), ndjson, fields)
+    return
+
+
+@subscription_permissions.command('create')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--username', help='The username to be added to the subscription')
+@click.option('--admin', 'role', flag_value='admin', help='The user role (admin | user)')
+@click.option('--user', 'role', flag_value='user', help='The user role (admin | user)', default=True)
+def create_subscription_permission(sub, username, role):
+    """Creates or modifies permissions in a subscription."""
+    with request_errors():
+        print_text(Client().create_subscription_permission(username, role, sub))
+    return
+
+
+@subscription_permissions.command('delete')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--username', help='The username to be added to the subscription')
+def delete_subscription_permission(sub, username):
+    """Deletes the user from the subscription"""
+    with request_errors():
+        print_text(Client().delete_subscription_permission(username, sub))
+    return
+
+
+@subscription.group('client')
+def subscription_clients():
+    """A subgroup of commands for managing subscription clients"""
+    return
+
+
+@subscription_clients.command('list')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+def list_subscription_client(sub):
+    """Returns a list of the subscription clients"""
+    with request_errors():
+        print_json(Client().list_clients(sub))
+    return
+
+
+@subscription_clients.command('create')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--name', help='The username of the client')
+def create_subscription_client(sub, name):
+    """Creates a client in the subscription."""
+    with request_errors():
+        print_text(Client().create_client(name, sub))
+    return
+
+
+@subscription_clients.command('delete')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--name', help='The username of the client')
+def delete_subscription_client(sub, name):
+    """Deletes the client from the subscription"""
+    with request_errors():
+        print_text(Client().delete_client(name, sub))
+    return
+
+
+@subscription_clients.group('credentials')
+def client_credentials():
+    """A subgroup of commands for managing subscription client credentials"""
+    return
+
+
+@client_credentials.command('list')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--name', help='The username of the client')
+def list_client_credentials(sub, name):
+    """Returns a list of the credentials the current user has access to"""
+    with request_errors():
+        print_json(Client().list_client_credentials(name, sub))
+    return
+
+
+@client_credentials.command('create')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--name', help='The username of the client')
+def create_client_credentials(sub, name):
+    """Creates client credentials."""
+    with request_errors():
+        print_json(Client().create_client_credentials(name, sub))
+    return
+
+
+@client_credentials.command('delete')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--name', help='The username of the client')
+@click.option('--key', help='The client key of the credentials to be deleted')
+def delete_client_credentials(sub, name, key):
+    """Deletes client credentials."""
+    with request_errors():
+        print_text(Client().delete_client_credentials(name, key, sub))
+    return
+
+
+@client_credentials.command('rotate')
+@click.option('--sub', help='The subscription identifier, will use the subscription stored in the preferences if not supplied', default='')
+@click.option('--name', 'names', help='The username of a client to rotate, may be repeated, default to every client', multiple=True)
+@click.option('--match', help='Only rotates the clients whose name matches this pattern, such as "ci-*"', default='')
+@click.option('--sink', help='The file new credentials are appended to as JSON lines, or - for stdout', required=True)
+@click.option('--state', help='The file recording the progress, default to the sink path with .state appended', default='')
+@click.option('--verify/--no-verify', help='Requests a token with the new credentials before deleting the old ones, default to verifying', default=True)
+@click.option('--delete/--keep-old', help='Deletes the previous credentials once the new ones are verified, default to deleting', default=True)
+@click.option('--workers', help='The number of clients rotated at once', default=DEFAULT_WORKERS, type=int)
+def rotate_client_credentials(sub, names, match, sink, state, verify, delete, workers):
+    """Replaces the credentials of many clients concurrently."""
+    client = Client()
+    sub = client.subscription(sub)
+    if not names:
+        with request_errors():
+            names = list_clients(client.items('{0}/clients'.format(client.subscription_url(sub)), follow=True))
+    names = [name for name in names if not match or fnmatch.fnmatchcase(name, match)]
+    sink = CredentialSink(sink)
+    checkpoint = Checkpoint(state or ('cloco-rotation.state' if sink.path == '-' else sink.path + '.state'))
+    results = run_parallel(lambda name: rotate_client(client, name, sub, sink, checkpoint, verify, delete),
+                           names, workers)
+    failed = [(name, error) for name, result, error in results if error is not None]
+    # keep the state until every client has been rotated
+    checkpoint.close(remove=not failed)
+    if sink.path != '-':
+        print_json([result for name, result, error in results if error is None])
+    for name, error in failed:
+        click.echo(click.style('{0}: {1}'.format(name, error), fg='red'), err=True)
+    if failed:
+        sys.exit('Request failed.')
+    return
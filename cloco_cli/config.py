@@ -0,0 +1,202 @@
+import click
+import configparser
+import contextlib
+import io
+import os
+import sys
+import threading
+
+from cloco_cli.files import atomic_writer
+from cloco_cli.trace import span
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DEFAULT_PROFILE = 'default'
+
+# the profile selected with --profile, falling back to $CLOCO_PROFILE
+_profile = None
+
+# parsed configuration keyed by path: path -> ((mtime, size, inode), values)
+_parsed = {}
+_parsed_lock = threading.Lock()
+_save_lock = threading.Lock()
+
+
+def create_config(profile=None):
+    """Creates an empty configuration file for the instances when none exists"""
+    config = configparser.ConfigParser()
+    config.profile = profile or get_profile()
+    config['credentials'] = {}
+    config['credentials']['cloco_client_key'] = ''
+    config['credentials']['cloco_client_secret'] = ''
+    config['credentials']['cloco_access_token'] = ''
+    config['settings'] = {}
+    config['settings']['url'] = ''
+    config['preferences'] = {}
+    config['preferences']['subscription'] = ''
+    config['preferences']['application'] = ''
+    config['preferences']['environment'] = ''
+    return config
+
+
+def print_config(config):
+    click.echo(click.style('Current configuration:', fg='white'))
+    click.echo(click.style(' ', fg='white'))
+    for section in config:
+        click.echo(click.style('[{0}]'.format(section), fg='white'))
+        for key in config[section]:
+            click.echo(click.style(key + ' = ' +
+                                   config[section][key], fg='cyan'))
+        click.echo(click.style(' ', fg='white'))
+
+
+class ConfigurationMissing(ValueError):
+    """Raised when the configuration file of a profile does not exist"""
+
+    def __init__(self, profile):
+        super(ConfigurationMissing, self).__init__(
+            'Configuration not available.  Run cloco init to initialize config.')
+        self.profile = profile
+
+
+def read_profile_config(profile=None):
+    """Loads the configuration from the ini file of the profile, raising ConfigurationMissing when there is none."""
+    profile = profile or get_profile()
+    if not config_exists(profile):
+        raise ConfigurationMissing(profile)
+    with span('load_config', profile=profile):
+        config = read_config(get_config_path(profile))
+    config.profile = profile
+    return config
+
+
+def load_config(profile=None):
+    """Loads the configuration from the ini file of the profile, default to the selected profile."""
+    try:
+        return read_profile_config(profile)
+    except ConfigurationMissing as e:
+        report_missing_config(e)
+
+
+def report_missing_config(e):
+    """Reports a ConfigurationMissing error and exits"""
+    click.echo(click.style(str(e), fg='red'))
+    sys.exit('Configuration error.')
+
+
+def save_config(config, silent):
+    """Saves the configuration object to disk if any value has changed.
+
+    The file is replaced atomically while holding the configuration lock, so
+    concurrent cloco processes never see a partially written file."""
+    if not silent:
+        click.echo(click.style('Saving config.....', fg='yellow'))
+    path = get_config_path(config_profile(config))
+    with config_lock(path):
+        if os.path.isfile(path) and config_values(read_config(path)) == config_values(config):
+            return
+        text = io.StringIO()
+        config.write(text)
+        with atomic_writer(path, 0o600) as configfile:
+            configfile.write(text.getvalue().encode('utf-8'))
+    return
+
+
+def read_config(path):
+    """Parses the ini file, reusing the previous result while the file is unchanged"""
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    with _parsed_lock:
+        cached = _parsed.get(path)
+    if cached is None or cached[0] != signature:
+        cached = (signature, config_values(parse_config(path)))
+        with _parsed_lock:
+            _parsed[path] = cached
+    config = configparser.ConfigParser()
+    config.read_dict(cached[1])
+    return config
+
+
+def parse_config(path):
+    """Reads and parses the ini file"""
+    config = configparser.ConfigParser()
+    config.read(path)
+    return config
+
+
+def config_values(config):
+    """Returns the sections and values of the configuration as nested dictionaries"""
+    return dict((section, dict(config.items(section, raw=True))) for section in config.sections())
+
+
+@contextlib.contextmanager
+def config_lock(path):
+    """Holds an exclusive lock on a configuration file across threads and processes.
+
+    The lock is an advisory lock on a file next to the configuration; on
+    platforms without fcntl only threads in this process are excluded."""
+    if not os.path.isdir(os.path.dirname(path)):
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError:
+            pass
+    with _save_lock:
+        with open(path + '.lock', 'a') as lockfile:
+            if fcntl is not None:
+                fcntl.flock(lockfile.fileno(), fcntl.LOCK_EX)
+            yield
+
+
+def get_cache_path():
+    """Retrieves the response cache folder for the current user."""
+    return '{0}/.cloco/cache'.format(os.environ["HOME"])
+
+
+def get_last_known_good_path():
+    """Retrieves the last known good configuration folder for the current user."""
+    return '{0}/.cloco/last-known-good'.format(os.environ["HOME"])
+
+
+def get_agent_path():
+    """Retrieves the agent socket path for the current user."""
+    return os.environ.get('CLOCO_AGENT_SOCKET') or '{0}/.cloco/agent.sock'.format(os.environ["HOME"])
+
+
+def config_exists(profile=None):
+    """Returns a Boolean value indicating whether the config file exists"""
+    return os.path.isfile(get_config_path(profile))
+
+
+def get_config_path(profile=None):
+    """Retrieves the config file of the profile for the current user."""
+    profile = check_profile(profile or get_profile())
+    if profile == DEFAULT_PROFILE:
+        return '{0}/.cloco/configuration'.format(os.environ["HOME"])
+    return '{0}/.cloco/profiles/{1}'.format(os.environ["HOME"], profile)
+
+
+def set_profile(profile):
+    """Selects the profile used when none is given explicitly"""
+    global _profile
+    _profile = check_profile(profile) or None
+    return
+
+
+def check_profile(profile):
+    """Returns the profile name, raising ValueError for a name that would leave the profiles folder"""
+    if profile and (os.sep in profile or (os.altsep and os.altsep in profile) or profile.startswith('.')):
+        raise ValueError('Invalid profile name "{0}"'.format(profile))
+    return profile
+
+
+def get_profile():
+    """Returns the selected profile, $CLOCO_PROFILE or the default profile"""
+    return _profile or os.environ.get('CLOCO_PROFILE') or DEFAULT_PROFILE
+
+
+def config_profile(config):
+    """Returns the profile a configuration object was loaded from"""
+    return getattr(config, 'profile', None) or get_profile()
@@ -0,0 +1,52 @@
+import difflib
+import json
+
+# marks a key present on only one side of a structural diff
+MISSING = object()
+
+
+def decode_payload(data):
+    """Returns the decoded JSON object or array in the configuration data, or None for other data"""
+    try:
+        document = json.loads(data)
+    except (TypeError, ValueError):
+        return None
+    return document if isinstance(document, (dict, list)) else None
+
+
+def diff_documents(left, right, path=''):
+    """Lists the (path, left value, right value) differences between two JSON documents.
+
+    Objects are compared key by key, other values as a whole.  A value
+    missing on one side is MISSING."""
+    if not isinstance(left, dict) or not isinstance(right, dict):
+        return [] if left == right else [(path or '.', left, right)]
+    differences = []
+    for key in sorted(set(left) | set(right), key=str):
+        differences += diff_documents(left.get(key, MISSING), right.get(key, MISSING), '{0}.{1}'.format(path, key))
+    return differences
+
+
+def diff_payloads(left, right, left_name, right_name):
+    """Describes the differences between two configuration payloads as lines of text.
+
+    Payloads that are both JSON are compared structurally, anything else as
+    a unified diff.  A payload of None is missing on that side."""
+    if left == right:
+        return []
+    if left is None or right is None:
+        return ['only in {0}'.format(right_name if left is None else left_name)]
+    documents = decode_payload(left), decode_payload(right)
+    if documents[0] is not None and documents[1] is not None:
+        lines = []
+        for path, a, b in diff_documents(*documents):
+            if a is MISSING:
+                lines.append('+ {0}: {1}'.format(path, json.dumps(b, sort_keys=True)))
+            elif b is MISSING:
+                lines.append('- {0}: {1}'.format(path, json.dumps(a, sort_keys=True)))
+            else:
+                lines.append('~ {0}: {1} -> {2}'.format(
+                    path, json.dumps(a, sort_keys=True), json.dumps(b, sort_keys=True)))
+        return lines
+    return [line.rstrip('\n') for line in difflib.unified_diff(
+        left.splitlines(True), right.splitlines(True), left_name, right_name)]
@@ -0,0 +1,55 @@
+import hashlib
+import json
+import os
+import time
+
+from cloco_cli.files import write_atomic
+
+
+class LastKnownGood(object):
+    """The last successfully retrieved copy of each configuration object, kept on disk.
+
+    Unlike the response cache nothing is ever evicted, so a copy is always
+    available to fall back on once an object has been read."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def get(self, key):
+        """Returns (fetched time, text) for the key, or None if nothing is stored"""
+        path = self._path(key)
+        try:
+            with open(path, 'r') as entryfile:
+                entry = json.load(entryfile)
+            # an unchanged copy is confirmed by touching the file rather than rewriting it
+            return max(entry['fetched'], os.path.getmtime(path)), entry['text']
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key, text, fetched=None):
+        """Stores the response text for the key, only touching the stored copy when the text is unchanged"""
+        stored = self.get(key)
+        if stored is not None and stored[1] == text:
+            try:
+                os.utime(self._path(key), None if fetched is None else (fetched, fetched))
+                return
+            except OSError:
+                pass
+        entry = {'key': key, 'fetched': fetched or time.time(), 'text': text}
+        write_atomic(self._path(key), json.dumps(entry).encode('utf-8'), 0o600)
+        return
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def format_age(seconds):
+    """Formats an age in seconds as a short human readable duration"""
+    seconds = max(0, int(seconds))
+    if seconds < 60:
+        return '{0}s'.format(seconds)
+    if seconds < 3600:
+        return '{0}m{1:02d}s'.format(seconds // 60, seconds % 60)
+    if seconds < 86400:
+        return '{0}h{1:02d}m'.format(seconds // 3600, seconds % 3600 // 60)
+    return '{0}d{1:02d}h'.format(seconds // 86400, seconds % 86400 // 3600)
@@ -0,0 +1,54 @@
+import contextlib
+import os
+import stat
+import tempfile
+import threading
+
+# os.umask can only be read by setting it, so reads are serialized
+_umask_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def atomic_writer(path, mode=None):
+    """Yields a binary file that replaces the path once the block completes.
+
+    Readers see either the previous file or the complete new file, never a
+    partial write.  If the block raises, the temporary file is removed and
+    the path is left untouched.  The file gets mode, else the mode of the
+    file it replaces, else the mode of a new file under the umask."""
+    directory = os.path.dirname(path) or '.'
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            pass
+    if mode is None:
+        mode = file_mode(path)
+    fd, temp = tempfile.mkstemp(dir=directory, prefix='.cloco-')
+    try:
+        # mkstemp creates the file readable only by its owner
+        os.chmod(temp, mode)
+        with os.fdopen(fd, 'wb') as datafile:
+            yield datafile
+        os.replace(temp, path)
+    except BaseException:
+        os.remove(temp)
+        raise
+
+
+def write_atomic(path, data, mode=None):
+    """Writes bytes through a temporary file and renames it over the path"""
+    with atomic_writer(path, mode) as datafile:
+        datafile.write(data)
+    return
+
+
+def file_mode(path):
+    """Returns the permission bits of the file at path, or those a new file gets under the umask"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        with _umask_lock:
+            umask = os.umask(0)
+            os.umask(umask)
+        return 0o666 & ~umask
@@ -0,0 +1,66 @@
+import click
+import json
+
+from cloco_cli.output import format_table, get_output_mode
+
+
+def list_options(command):
+    """Adds the paging and output options shared by the list commands"""
+    options = [
+        click.option('--limit', help='The number of items per page, default to the server default', default=0, type=int),
+        click.option('--page', help='The page to return, default to the first page', default=0, type=int),
+        click.option('--all', 'follow', help='Follow the next page links until the list is complete', default=False, is_flag=True),
+        click.option('--ndjson', help='Print each item as one line of JSON as soon as it arrives', default=False, is_flag=True),
+        click.option('--fields', help='A comma separated list of the item fields to print', default=''),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+def project(item, fields):
+    """Returns the item with only the named fields, dotted names select nested fields"""
+    if not fields or not isinstance(item, dict):
+        return item
+    projected = {}
+    for field in fields:
+        value = item
+        for key in field.split('.'):
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            projected[field] = value
+    return projected
+
+
+def print_items(items, ndjson=False, fields=''):
+    """Prints list items as they arrive, formatted for the output mode.
+
+    Each item is printed before the next is read so the whole list is
+    never held, except for tables which need every row to size the columns.
+    The pretty array matches the output of print_json."""
+    fields = [field.strip() for field in fields.split(',') if field.strip()]
+    items = (project(item, fields) for item in items)
+    mode = 'ndjson' if ndjson else get_output_mode()
+    if mode == 'table':
+        click.echo(format_table(list(items)))
+        return
+    if mode == 'ndjson':
+        for item in items:
+            click.echo(json.dumps(item))
+        return
+    first = True
+    for item in items:
+        if mode == 'pretty':
+            text = json.dumps(item, sort_keys=True, indent=4, separators=(',', ': '))
+            text = '\n'.join('    ' + line for line in text.splitlines())
+            click.echo(click.style(('[\n' if first else ',\n') + text, fg='green'), nl=False)
+        else:
+            click.echo(('[' if first else ',') + json.dumps(item, separators=(',', ':')), nl=False)
+        first = False
+    if mode == 'pretty':
+        click.echo(click.style('[]' if first else '\n]', fg='green'))
+    else:
+        click.echo('[]' if first else ']')
+    return
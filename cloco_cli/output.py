@@ -0,0 +1,96 @@
+import click
+import json
+import os
+import sys
+
+OUTPUT_MODES = ('pretty', 'json', 'ndjson', 'raw', 'table')
+
+# exit codes for unsuccessful responses, other statuses exit with 1
+EXIT_AUTHENTICATION = 3
+EXIT_NOT_FOUND = 4
+EXIT_CLIENT_ERROR = 5
+EXIT_SERVER_ERROR = 6
+
+_mode = None
+
+
+def set_output_mode(mode):
+    """Selects the output mode for the rest of the process, empty to detect it"""
+    global _mode
+    if mode and mode not in OUTPUT_MODES:
+        raise ValueError('Output mode must be one of {0}.'.format(', '.join(OUTPUT_MODES)))
+    _mode = mode or None
+    return
+
+
+def get_output_mode():
+    """Returns the selected output mode, else $CLOCO_OUTPUT, else pretty on a terminal and json otherwise"""
+    mode = _mode or os.environ.get('CLOCO_OUTPUT')
+    if mode in OUTPUT_MODES:
+        return mode
+    return 'pretty' if sys.stdout.isatty() else 'json'
+
+
+def exit_code(status_code):
+    """Maps an unsuccessful HTTP status to the process exit code"""
+    if status_code in (401, 403):
+        return EXIT_AUTHENTICATION
+    if status_code == 404:
+        return EXIT_NOT_FOUND
+    if 400 <= status_code < 500:
+        return EXIT_CLIENT_ERROR
+    if status_code >= 500:
+        return EXIT_SERVER_ERROR
+    return 1
+
+
+def fail(r, message='Request failed.'):
+    """Reports an unsuccessful response and exits with the code for its status.
+
+    Outside pretty mode the response is written to stderr so that stdout
+    only ever holds results."""
+    pretty = get_output_mode() == 'pretty'
+    click.echo(click.style(r.text, fg='red') if pretty else r.text, err=not pretty)
+    click.echo(message, err=True)
+    sys.exit(exit_code(r.status_code))
+
+
+def echo_text(text):
+    """Prints text, styled only in pretty mode"""
+    if get_output_mode() == 'pretty':
+        text = click.style(text, fg='green')
+    click.echo(text)
+    return
+
+
+def format_document(document, mode):
+    """Formats a decoded JSON document for the output mode"""
+    if mode == 'pretty':
+        return json.dumps(document, sort_keys=True, indent=4, separators=(',', ': '))
+    if mode == 'table':
+        return format_table(document if isinstance(document, list) else [document])
+    if mode == 'ndjson' and isinstance(document, list):
+        return '\n'.join(json.dumps(item, separators=(',', ':')) for item in document)
+    return json.dumps(document, separators=(',', ':'))
+
+
+def format_table(items):
+    """Formats a list of JSON objects as columns, one row per object"""
+    if not items:
+        return ''
+    if not all(isinstance(item, dict) for item in items):
+        return '\n'.join(format_cell(item) for item in items)
+    columns = []
+    for item in items:
+        columns += [key for key in item if key not in columns]
+    rows = [columns] + [[format_cell(item.get(column, '')) for column in columns] for item in items]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    return '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows)
+
+
+def format_cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(',', ':'))
+    if value is None:
+        return ''
+    return value if isinstance(value, str) else json.dumps(value)
@@ -0,0 +1,148 @@
+import json
+
+from cloco_cli.bulk import list_permissions
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# matches every configuration object or environment of an application
+WILDCARD = '*'
+
+
+def load_manifest(path):
+    """Reads a permission manifest written in JSON, or in YAML when PyYAML is installed"""
+    with open(path, 'r') as manifest:
+        text = manifest.read()
+    try:
+        return json.loads(text)
+    except ValueError:
+        if yaml is None:
+            raise ValueError('The manifest is not JSON, install PyYAML with pip install cloco-cli[yaml] to read YAML.')
+    try:
+        return yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise ValueError('The manifest is neither JSON nor YAML: {0}'.format(e))
+
+
+def as_list(value):
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def manifest_grants(document):
+    """Validates the permissions of a manifest, returning them as dicts with listed identities, cobs and envs.
+
+    Each grant holds an identity (or a list of them) and a role, and is
+    given at the subscription level, at an application level with app, or
+    on configuration objects with app, cob and env, where cob and env may
+    be lists or * for all of them."""
+    if not isinstance(document, dict) or not isinstance(document.get('permissions'), list):
+        raise ValueError('The manifest must be an object with a permissions list.')
+    grants = []
+    for i, grant in enumerate(document['permissions'], 1):
+        if not isinstance(grant, dict) or not grant.get('identity') or not grant.get('role'):
+            raise ValueError('Permission {0} must have an identity and a role.'.format(i))
+        if (grant.get('cob') or grant.get('env')) and not (grant.get('app') and grant.get('cob') and grant.get('env')):
+            raise ValueError(
+                'Permission {0} must have an app, a cob and an env to grant configuration access.'.format(i))
+        grants.append({'identities': [str(identity) for identity in as_list(grant['identity'])],
+                       'role': str(grant['role']),
+                       'app': grant.get('app'),
+                       'cobs': [str(cob) for cob in as_list(grant['cob'])] if grant.get('cob') else None,
+                       'envs': [str(env) for env in as_list(grant['env'])] if grant.get('env') else None})
+    return grants
+
+
+def wildcard_apps(grants):
+    """Returns the applications whose configuration objects must be listed to expand a wildcard"""
+    return sorted(set(grant['app'] for grant in grants
+                      if grant['cobs'] and (WILDCARD in grant['cobs'] or WILDCARD in grant['envs'])))
+
+
+def desired_permissions(grants, objects):
+    """Maps each level to the roles granted there, identity -> role.
+
+    A level is () for the subscription, (app,) for an application and
+    (app, cob, env) for a configuration object.  objects maps the
+    applications of wildcard grants to their (cob, env) pairs."""
+    desired = {}
+    for grant in grants:
+        if grant['app'] is None:
+            levels = [()]
+        elif grant['cobs'] is None:
+            levels = [(grant['app'],)]
+        else:
+            levels = [(grant['app'], cob, env) for cob, env in expand_objects(grant, objects.get(grant['app'], []))]
+        for level in levels:
+            roles = desired.setdefault(level, {})
+            for identity in grant['identities']:
+                if roles.get(identity, grant['role']) != grant['role']:
+                    raise ValueError('{0} is granted both {1} and {2} on {3}.'.format(
+                        identity, roles[identity], grant['role'], describe_level(level)))
+                roles[identity] = grant['role']
+    return desired
+
+
+def expand_objects(grant, objects):
+    """Returns the (cob, env) pairs of a configuration grant, expanding wildcards from the listed objects"""
+    pairs = []
+    for cob in grant['cobs']:
+        for env in grant['envs']:
+            if cob == WILDCARD or env == WILDCARD:
+                pairs += [pair for pair in objects if cob in (WILDCARD, pair[0]) and env in (WILDCARD, pair[1])]
+            else:
+                pairs.append((cob, env))
+    return sorted(set(pairs))
+
+
+def current_permissions(document):
+    """Maps the identities of a permission list response to their roles"""
+    return dict(list_permissions(document))
+
+
+def plan_changes(desired, current, prune=True):
+    """Returns the changes that turn the current permissions into the desired ones.
+
+    Both map levels to identity -> role.  Only the levels in desired are
+    compared, and identities missing from the manifest are removed from
+    those levels when prune is set."""
+    changes = []
+    for level in sorted(desired):
+        roles, existing = desired[level], current.get(level, {})
+        for identity in sorted(roles):
+            if identity not in existing:
+                changes.append(change('add', level, identity, roles[identity]))
+            elif existing[identity] != roles[identity]:
+                changes.append(change('update', level, identity, roles[identity], existing[identity]))
+        if prune:
+            changes += [change('remove', level, identity, None, existing[identity])
+                        for identity in sorted(existing) if identity not in roles]
+    return changes
+
+
+def change(action, level, identity, role, previous=None):
+    document = {'action': action, 'identity': identity, 'role': role, 'previous': previous}
+    document.update(zip(('app', 'cob', 'env'), level))
+    return document
+
+
+def change_level(document):
+    """Returns the level a change applies to"""
+    return tuple(document[key] for key in ('app', 'cob', 'env') if key in document)
+
+
+def describe_level(level):
+    if not level:
+        return 'the subscription'
+    return '/'.join(level)
+
+
+def describe_change(document):
+    """Describes a change in one line for the plan"""
+    level = describe_level(change_level(document))
+    if document['action'] == 'add':
+        return '+ {0} {1} on {2}'.format(document['identity'], document['role'], level)
+    if document['action'] == 'update':
+        return '~ {0} {1} -> {2} on {3}'.format(document['identity'], document['previous'], document['role'], level)
+    return '- {0} {1} on {2}'.format(document['identity'], document['previous'], level)
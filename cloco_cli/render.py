@@ -0,0 +1,73 @@
+import configparser
+import json
+import re
+import string
+
+# the section holding ini keys that appear before any section header
+ROOT_SECTION = 'cloco-root'
+
+
+def parse_payload(data):
+    """Decodes configuration data holding a JSON object or array, or ini/properties text"""
+    try:
+        document = json.loads(data)
+    except ValueError:
+        document = None
+    if isinstance(document, (dict, list)):
+        return document
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.optionxform = str
+    try:
+        parser.read_string(u'[{0}]\n{1}'.format(ROOT_SECTION, data))
+    except configparser.Error as e:
+        raise ValueError('Configuration is neither a JSON object nor ini: {0}'.format(e))
+    document = dict(parser.items(ROOT_SECTION, raw=True))
+    for section in parser.sections():
+        if section != ROOT_SECTION:
+            document[section] = dict((key, value) for key, value in parser.items(section, raw=True)
+                                     if key not in parser.defaults())
+    return document
+
+
+def variable_name(*parts):
+    """Joins the parts into an upper case environment variable name"""
+    return re.sub(r'[^A-Za-z0-9]+', '_', '_'.join(str(part) for part in parts)).strip('_').upper()
+
+
+def flatten(document, prefix=''):
+    """Flattens a decoded document into environment variables.
+
+    Nested keys and list indexes are joined with underscores, booleans
+    become true or false and null becomes an empty string."""
+    variables = {}
+
+    def visit(value, path):
+        if isinstance(value, dict):
+            for key in value:
+                visit(value[key], path + [key])
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                visit(item, path + [i])
+        else:
+            if isinstance(value, bool):
+                value = 'true' if value else 'false'
+            elif value is None:
+                value = ''
+            variables[prefix + variable_name(*path)] = value if isinstance(value, str) else json.dumps(value)
+
+    visit(document, [])
+    return variables
+
+
+def render_template(text, context):
+    """Substitutes $NAME and ${NAME} with the flattened variables, raising KeyError for unknown names"""
+    return string.Template(text).substitute(context)
+
+
+def render_jinja2(text, context, documents):
+    """Renders a jinja2 template with the flattened variables and each decoded document by its object name"""
+    import jinja2
+    environment = jinja2.Environment(undefined=jinja2.StrictUndefined, keep_trailing_newline=True)
+    values = dict(context)
+    values['cob'] = documents
+    return environment.from_string(text).render(values)
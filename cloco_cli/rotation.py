@@ -0,0 +1,91 @@
+import click
+import json
+import os
+import threading
+import time
+
+from cloco_cli.api import RequestFailed, request_token
+from cloco_cli.bulk import KEY_KEYS, SECRET_KEYS, first_value, list_credential_keys
+
+
+class CredentialSink(object):
+    """Appends new credentials as JSON lines to a file readable only by its owner, or to stdout for -.
+
+    Each line is flushed to disk before it is reported as written, so a
+    secret is never lost once the old credentials are deleted."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, sort_keys=True)
+        with self.lock:
+            if self.path == '-':
+                click.echo(line)
+                return
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, (line + '\n').encode('utf-8'))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        return
+
+    def find(self, key):
+        """Returns the secret written for a client key, or None"""
+        if self.path == '-' or not os.path.isfile(self.path):
+            return None
+        with self.lock, open(self.path, 'r') as records:
+            for line in records:
+                record = json.loads(line)
+                if record.get('clientKey') == key:
+                    return record.get('clientSecret')
+        return None
+
+
+def created_key(checkpoint, sub, name):
+    """Returns the key created for a client of the subscription by an earlier run, or None"""
+    prefix = 'created {0} {1} '.format(sub, name)
+    with checkpoint.lock:
+        steps = list(checkpoint.done)
+    for step in steps:
+        if step.startswith(prefix):
+            return step[len(prefix):]
+    return None
+
+
+def rotate_client(client, name, sub, sink, checkpoint, verify=True, delete=True):
+    """Replaces the credentials of a subscription client.
+
+    New credentials are created and written to the sink, then verified
+    against /oauth/token, and only then are the previous keys deleted.
+    Each step is recorded in the checkpoint so a failed or interrupted
+    rotation resumes without creating a second key.  The steps name the
+    subscription, so a state file kept from another subscription never
+    skips a client of the same name."""
+    if 'done {0} {1}'.format(sub, name) in checkpoint:
+        return {'client': name, 'status': 'resumed'}
+    key = created_key(checkpoint, sub, name)
+    old_keys = list_credential_keys(client.list_client_credentials(name, sub))
+    secret = None
+    if key is None:
+        credentials = client.create_client_credentials(name, sub)
+        key, secret = first_value(credentials, KEY_KEYS), first_value(credentials, SECRET_KEYS)
+        sink.write({'subscription': sub, 'client': name, 'clientKey': key, 'clientSecret': secret,
+                    'created': int(time.time())})
+        checkpoint.add('created {0} {1} {2}'.format(sub, name, key))
+    if verify and 'verified {0} {1}'.format(sub, name) not in checkpoint:
+        secret = secret or sink.find(key)
+        if secret is None:
+            raise ValueError('The secret of {0} is not in the sink, it cannot be verified'.format(key))
+        r = request_token(client.config, key, secret)
+        if r.status_code != 200:
+            raise RequestFailed(r)
+        checkpoint.add('verified {0} {1}'.format(sub, name))
+    old_keys = [old for old in old_keys if old != key]
+    if delete:
+        for old in old_keys:
+            client.delete_client_credentials(name, old, sub)
+    checkpoint.add('done {0} {1}'.format(sub, name))
+    return {'client': name, 'status': 'rotated', 'clientKey': key, 'deleted': old_keys if delete else []}
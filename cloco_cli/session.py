@@ -0,0 +1,99 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cloco_cli.trace import is_tracing, span
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 30
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session(config=None):
+    """Returns the shared HTTP session, creating it on first use.
+
+    The pool size and retry policy are read from the [settings] section of
+    the configuration the first time the session is created."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session(*get_session_settings(config), timeout=get_timeouts(config))
+    return _session
+
+
+def get_session_settings(config):
+    """Reads the pool size, retry count and backoff factor from configuration"""
+    if config is None or not config.has_section('settings'):
+        return DEFAULT_POOL_SIZE, DEFAULT_RETRIES, DEFAULT_BACKOFF_FACTOR
+    return (config.getint('settings', 'pool_size', fallback=DEFAULT_POOL_SIZE),
+            config.getint('settings', 'retries', fallback=DEFAULT_RETRIES),
+            config.getfloat('settings', 'backoff_factor', fallback=DEFAULT_BACKOFF_FACTOR))
+
+
+def get_timeouts(config):
+    """Reads the (connect, read) timeouts in seconds from configuration"""
+    if config is None or not config.has_section('settings'):
+        return DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+    return (config.getfloat('settings', 'connect_timeout', fallback=DEFAULT_CONNECT_TIMEOUT),
+            config.getfloat('settings', 'read_timeout', fallback=DEFAULT_READ_TIMEOUT))
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """An HTTP adapter applying default timeouts to requests that do not set their own"""
+
+    def __init__(self, *args, **kwargs):
+        self.timeout = kwargs.pop('timeout', None)
+        super(TimeoutHTTPAdapter, self).__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        if not is_tracing():
+            return super(TimeoutHTTPAdapter, self).send(request, **kwargs)
+        with span('http', method=request.method, url=request.url) as traced:
+            r = super(TimeoutHTTPAdapter, self).send(request, **kwargs)
+            traced.args['headers_ms'] = round((time.perf_counter() - traced.start) * 1000, 1)
+            if not kwargs.get('stream'):
+                # time the body as well, the session would read it next
+                traced.args['bytes'] = len(r.content)
+            traced.args['status'] = r.status_code
+            if r.headers.get('Server-Timing'):
+                traced.args['server_timing'] = r.headers['Server-Timing']
+        return r
+
+
+def create_session(pool_size, retries, backoff_factor, timeout=None):
+    """Creates a keep-alive session with a connection pool, retry policy and default timeouts.
+
+    Idempotent requests are retried on connection errors and 5xx responses,
+    POST requests only on connection errors.  timeout is a (connect, read)
+    pair in seconds, or None to wait indefinitely."""
+    retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                  backoff_factor=backoff_factor,
+                  status_forcelist=RETRY_STATUS_CODES, raise_on_status=False)
+    adapter = TimeoutHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                 max_retries=retry, timeout=timeout)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def close_session():
+    """Closes the shared session and its pooled connections"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+    return
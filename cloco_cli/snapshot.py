@@ -0,0 +1,148 @@
+import io
+import json
+import os
+import tarfile
+import threading
+import time
+
+INDEX = 'index.json'
+SUBSCRIPTION = 'subscription.json'
+SNAPSHOT_VERSION = 1
+
+
+def application_name(app):
+    return 'applications/{0}.json'.format(app)
+
+
+def configuration_name(app, cob, env):
+    return 'configuration/{0}/{1}/{2}.json'.format(app, cob, env)
+
+
+def permissions_name(*path):
+    """Names the permissions member of the subscription, an application or a configuration object"""
+    if not path:
+        return 'permissions/subscription.json'
+    if len(path) == 1:
+        return 'permissions/applications/{0}.json'.format(*path)
+    return 'permissions/configuration/{0}/{1}/{2}.json'.format(*path)
+
+
+class SnapshotWriter(object):
+    """Writes a gzip compressed tar snapshot of a subscription.
+
+    Members may be added from several worker threads.  The JSON index is
+    written as the last member when the snapshot is closed."""
+
+    def __init__(self, fileobj, sub):
+        self.tar = tarfile.open(fileobj=fileobj, mode='w:gz')
+        self.lock = threading.Lock()
+        self.index = {'version': SNAPSHOT_VERSION, 'subscription': sub, 'created': int(time.time()),
+                      'applications': [], 'objects': [], 'errors': []}
+
+    def add(self, name, data):
+        """Adds a member holding the bytes, or the JSON encoding of any other value"""
+        if not isinstance(data, bytes):
+            data = json.dumps(data, sort_keys=True).encode('utf-8')
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = self.index['created']
+        with self.lock:
+            self.tar.addfile(info, io.BytesIO(data))
+        return
+
+    def add_object(self, app, cob, env, revision):
+        """Records a configuration object in the index"""
+        with self.lock:
+            self.index['objects'].append({'app': app, 'cob': cob, 'env': env, 'revision': revision})
+        return
+
+    def add_error(self, name, error):
+        """Records a member that could not be fetched in the index"""
+        with self.lock:
+            self.index['errors'].append({'name': name, 'error': str(error)})
+        return
+
+    def close(self):
+        self.index['objects'].sort(key=lambda o: (o['app'], o['cob'], o['env']))
+        self.add(INDEX, self.index)
+        self.tar.close()
+        return
+
+
+class SnapshotReader(object):
+    """Reads a snapshot from a compressed archive or from a directory it was extracted to"""
+
+    def __init__(self, path):
+        self.path = path
+        self.tar = None
+        if not os.path.isdir(path):
+            self.tar = tarfile.open(path, mode='r:*')
+        self.index = json.loads(self.read(INDEX).decode('utf-8'))
+
+    def read(self, name):
+        """Returns the bytes of a member, or None if the snapshot does not contain it"""
+        if self.tar is None:
+            path = os.path.join(self.path, *name.split('/'))
+            if not os.path.isfile(path):
+                return None
+            with open(path, 'rb') as member:
+                return member.read()
+        try:
+            return self.tar.extractfile(name).read()
+        except KeyError:
+            return None
+
+    def read_json(self, name):
+        """Returns the decoded JSON of a member, or None if the snapshot does not contain it"""
+        data = self.read(name)
+        return None if data is None else json.loads(data.decode('utf-8'))
+
+    def members(self, names):
+        """Yields (name, bytes) for the members with the given names in one pass over the snapshot"""
+        names = set(names)
+        if self.tar is None:
+            for name in sorted(names):
+                data = self.read(name)
+                if data is not None:
+                    yield name, data
+            return
+        for info in self.tar:
+            if info.name in names and info.isfile():
+                yield info.name, self.tar.extractfile(info).read()
+        return
+
+    def close(self):
+        if self.tar is not None:
+            self.tar.close()
+        return
+
+
+class Checkpoint(object):
+    """Records the completed steps of an import so an interrupted import resumes where it stopped.
+
+    Each step is appended as a line and flushed as soon as it completes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done = set()
+        if os.path.isfile(path):
+            with open(path, 'r') as steps:
+                self.done = set(line.rstrip('\n') for line in steps if line.strip())
+        self.steps = open(path, 'a')
+
+    def __contains__(self, step):
+        return step in self.done
+
+    def add(self, step):
+        with self.lock:
+            self.done.add(step)
+            self.steps.write(step + '\n')
+            self.steps.flush()
+        return
+
+    def close(self, remove=False):
+        self.steps.close()
+        if remove:
+            os.remove(self.path)
+        return
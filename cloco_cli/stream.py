@@ -0,0 +1,117 @@
+import codecs
+import gzip
+import json
+import re
+import shutil
+import sys
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+
+DATA_KEY = re.compile(r'"configurationData"\s*:\s*"')
+SPECIAL = re.compile(r'["\\]')
+ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class ConfigurationDataDecoder(object):
+    """Incrementally extracts the configurationData string from a response body.
+
+    Text is fed in arbitrary pieces and the decoded data is returned as soon
+    as it is available, so the payload is never held in memory whole."""
+
+    def __init__(self):
+        self.buffer = ''
+        self.found = False
+        self.done = False
+
+    def feed(self, text):
+        """Returns the data decoded from this piece of the response"""
+        if self.done:
+            return ''
+        self.buffer += text
+        if not self.found:
+            match = DATA_KEY.search(self.buffer)
+            if match is None:
+                return ''
+            self.found = True
+            self.buffer = self.buffer[match.end():]
+        return self._decode()
+
+    def close(self):
+        """Checks that the whole configurationData string was seen"""
+        if not self.done:
+            raise ValueError('The response does not contain complete configuration data')
+        return
+
+    def _decode(self):
+        text = self.buffer
+        out = []
+        i = 0
+        while True:
+            match = SPECIAL.search(text, i)
+            if match is None:
+                out.append(text[i:])
+                i = len(text)
+                break
+            out.append(text[i:match.start()])
+            i = match.start()
+            if match.group() == '"':
+                self.done = True
+                i = len(text)
+                break
+            if i + 1 >= len(text):
+                break
+            if text[i + 1] != 'u':
+                out.append(ESCAPES[text[i + 1]])
+                i += 2
+                continue
+            length = 6
+            if len(text) >= i + 6 and 0xd800 <= int(text[i + 2:i + 6], 16) < 0xdc00:
+                # a high surrogate is decoded together with the low surrogate that follows it
+                length = 12
+            if len(text) < i + length:
+                break
+            out.append(json.loads('"{0}"'.format(text[i:i + length])))
+            i += length
+        self.buffer = text[i:]
+        return ''.join(out)
+
+
+def iter_configuration_data(chunks):
+    """Decodes the configurationData from an iterable of response body bytes"""
+    text = codecs.getincrementaldecoder('utf-8')()
+    decoder = ConfigurationDataDecoder()
+    for chunk in chunks:
+        data = decoder.feed(text.decode(chunk))
+        if data:
+            yield data
+    data = decoder.feed(text.decode(b'', final=True))
+    if data:
+        yield data
+    decoder.close()
+
+
+def open_upload(filename, compress=False):
+    """Opens a request body to be streamed from a file, or from stdin for -.
+
+    A file on disk is sent as is, so requests sets its Content-Length from
+    the file size.  Stdin and gzip compressed bodies are first copied in
+    chunks to a temporary file so that their length is known too."""
+    if filename == '-':
+        source = getattr(sys.stdin, 'buffer', sys.stdin)
+    else:
+        source = open(filename, 'rb')
+        if not compress:
+            return source
+    spool = tempfile.TemporaryFile()
+    try:
+        if compress:
+            with gzip.GzipFile(fileobj=spool, mode='wb') as target:
+                shutil.copyfileobj(source, target, CHUNK_SIZE)
+        else:
+            shutil.copyfileobj(source, spool, CHUNK_SIZE)
+    finally:
+        if filename != '-':
+            source.close()
+    spool.seek(0)
+    return spool
@@ -0,0 +1,233 @@
+import click
+import json
+import os
+import sys
+import threading
+import time
+
+# the tracer of the process, None while tracing is off
+_tracer = None
+
+
+class NullSpan(object):
+    """The span returned while tracing is off, it records nothing"""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span(object):
+    """A named, timed phase, nested in the span that was open on the same thread when it started"""
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = self.end = None
+        self.depth = 0
+        self.thread = None
+
+    def __enter__(self):
+        stack = self.tracer.stack()
+        self.depth = len(stack)
+        self.thread = threading.current_thread()
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.end = time.perf_counter()
+        self.tracer.stack().pop()
+        self.tracer.record(self)
+        return False
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+
+class Tracer(object):
+    """Collects the spans of every thread"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    def record(self, span):
+        with self.lock:
+            self.spans.append(span)
+        return
+
+    def add_startup(self):
+        """Records the time from the process start to now as the startup span, where the start is known"""
+        elapsed = process_age()
+        if elapsed is not None:
+            startup = Span(self, 'startup', {})
+            startup.thread = threading.current_thread()
+            startup.start, startup.end = self.origin - elapsed, self.origin
+            self.record(startup)
+        return
+
+
+def span(name, **args):
+    """Returns a context manager timing a phase while tracing is on"""
+    if _tracer is None:
+        return NULL_SPAN
+    return Span(_tracer, name, args)
+
+
+def is_tracing():
+    return _tracer is not None
+
+
+def start_tracing():
+    """Starts collecting spans for the rest of the process, timing connections as well"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+        _tracer.add_startup()
+        trace_connections()
+    return _tracer
+
+
+def stop_tracing():
+    """Stops collecting spans, returning the tracer holding them"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def process_age():
+    """Returns the seconds since the process started, to the nearest clock tick, or None without /proc"""
+    try:
+        with open('/proc/self/stat', 'r') as stat:
+            # the fields after the command name, starttime is the 22nd field overall
+            started = float(stat.read().rsplit(')', 1)[1].split()[19]) / os.sysconf('SC_CLK_TCK')
+        with open('/proc/uptime', 'r') as uptime:
+            return max(0.0, float(uptime.read().split()[0]) - started)
+    except (EnvironmentError, IndexError, ValueError, AttributeError):
+        return None
+
+
+_connections_traced = False
+
+
+def trace_connections():
+    """Times new connections, the DNS lookup and TCP connect and then any TLS handshake, in urllib3"""
+    global _connections_traced
+    if _connections_traced:
+        return
+    try:
+        from urllib3 import connection
+    except ImportError:
+        return
+    _connections_traced = True
+
+    def wrap(cls, attribute, name):
+        original = getattr(cls, attribute)
+
+        def traced(self, *args, **kwargs):
+            with span(name, host='{0}:{1}'.format(self.host, self.port)):
+                return original(self, *args, **kwargs)
+        setattr(cls, attribute, traced)
+
+    wrap(connection.HTTPConnection, '_new_conn', 'dns+tcp')
+    for cls in (connection.HTTPConnection, connection.HTTPSConnection):
+        if 'connect' in cls.__dict__:
+            wrap(cls, 'connect', 'connect')
+    return
+
+
+def trace_command(ctx, summary, path):
+    """Traces the command of the click context, reporting on stderr and to path once it completes"""
+    tracer = start_tracing()
+
+    def report():
+        stop_tracing()
+        if summary:
+            click.echo(format_summary(tracer), err=True)
+        if path:
+            with open(path, 'w') as tracefile:
+                json.dump(chrome_trace(tracer), tracefile)
+        return
+
+    ctx.call_on_close(report)
+    ctx.with_resource(span('command', argv=' '.join(sys.argv[1:])))
+    return
+
+
+def profile_command(ctx, path):
+    """Runs the command of the click context under cProfile, writing the statistics to path, or stderr for -"""
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+
+    def report():
+        profiler.disable()
+        if path == '-':
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(25)
+        else:
+            profiler.dump_stats(path)
+        return
+
+    ctx.call_on_close(report)
+    profiler.enable()
+    return
+
+
+def format_summary(tracer):
+    """Formats the spans of the main thread as a tree and totals the spans of other threads by name"""
+    main = threading.main_thread()
+    spans = sorted(tracer.spans, key=lambda s: s.start)
+    lines = ['trace:']
+    for s in spans:
+        if s.thread is main:
+            lines.append('{0:>10.1f} ms  {1}{2}{3}'.format(
+                s.duration * 1000, '  ' * s.depth, s.name, format_args(s.args)))
+    totals = {}
+    for s in spans:
+        if s.thread is not main:
+            total = totals.setdefault(s.name, [0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += s.duration
+            total[2] = max(total[2], s.duration)
+    if totals:
+        lines.append('other threads:')
+        for name in sorted(totals, key=lambda n: -totals[n][1]):
+            count, total, longest = totals[name]
+            lines.append('{0:>10.1f} ms  {1} x{2}, longest {3:.1f} ms'.format(
+                total * 1000, name, count, longest * 1000))
+    return '\n'.join(lines)
+
+
+def format_args(args):
+    if not args:
+        return ''
+    return ' ({0})'.format(', '.join('{0}={1}'.format(key, args[key]) for key in sorted(args)))
+
+
+def chrome_trace(tracer):
+    """Returns the spans as a Chrome trace document, viewable in chrome://tracing or Perfetto"""
+    pid = os.getpid()
+    events = []
+    for s in sorted(tracer.spans, key=lambda s: s.start):
+        events.append({'name': s.name, 'cat': 'cloco', 'ph': 'X', 'pid': pid, 'tid': s.thread.ident,
+                       'ts': round((s.start - tracer.origin) * 1000000, 1), 'dur': round(s.duration * 1000000, 1),
+                       'args': dict((key, str(value)) for key, value in s.args.items())})
+    threads = set((s.thread.ident, s.thread.name) for s in tracer.spans)
+    events += [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': ident, 'args': {'name': name}}
+               for ident, name in threads]
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
@@ -0,0 +1,38 @@
+import random
+import time
+
+DEFAULT_MIN_INTERVAL = 10
+DEFAULT_MAX_INTERVAL = 300
+BACKOFF = 1.5
+JITTER = 0.1
+
+
+def next_interval(interval, changed, min_interval, max_interval):
+    """Resets the poll interval after a change, otherwise backs it off towards the maximum"""
+    if changed:
+        return min_interval
+    return min(max_interval, interval * BACKOFF)
+
+
+def jitter(interval):
+    """Spreads the interval by up to JITTER either way so many hosts do not poll in step"""
+    return interval * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+def watch(objects, check, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+          count=0, sleep=time.sleep):
+    """Polls the objects until count rounds have run, or forever when count is 0.
+
+    check is called with each object and returns True when it has changed."""
+    interval = min_interval
+    rounds = 0
+    while True:
+        changed = False
+        for item in objects:
+            if check(item):
+                changed = True
+        rounds += 1
+        if count and rounds >= count:
+            return
+        interval = next_interval(interval, changed, min_interval, max_interval)
+        sleep(jitter(interval))
@@ -21,7 +21,13 @@ setup(
     include_package_data=True,
     zip_safe=False,
     platforms='any',
+    python_requires='>=3.7',
     install_requires=dependencies,
+    extras_require={
+        'async': ['httpx'],
+        'jinja2': ['jinja2'],
+        'yaml': ['PyYAML'],
+    },
     entry_points={
         'console_scripts': [
             'cloco = cloco_cli.cli:main',
@@ -47,8 +53,8 @@ setup(
         'Operating System :: Unix',
         'Operating System :: Microsoft :: Windows',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2',
         'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
         'Topic :: Software Development :: Libraries :: Python Modules',
         'Topic :: Software Development :: Build Tools',
     ]
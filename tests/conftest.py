@@ -0,0 +1,88 @@
+import base64
+import json
+import time
+
+import pytest
+from click.testing import CliRunner
+from cloco_cli import api as cloco_api
+from cloco_cli import config as cloco_config
+from cloco_cli import session as cloco_session
+
+
+def make_token(claims):
+    def encode(document):
+        raw = json.dumps(document).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    return '{0}.{1}.signature'.format(encode({'alg': 'HS256'}), encode(claims))
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, document, headers=None):
+        self.status_code = status_code
+        self.text = document if isinstance(document, str) else json.dumps(document)
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size=1):
+        content = self.text.encode('utf-8')
+        for i in range(0, len(content), chunk_size):
+            yield content[i:i + chunk_size]
+
+
+class FakeSession(object):
+    """Serves canned responses keyed by (method, path) and records requests"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        path = url.replace('https://api.cloco.io', '')
+        if hasattr(kwargs.get('data'), 'read'):
+            kwargs['data'] = kwargs['data'].read()
+        self.requests.append((method, path, kwargs))
+        return FakeResponse(*self.responses.get((method, path), (404, 'Not found')))
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+
+@pytest.fixture
+def runner():
+    return CliRunner()
+
+
+@pytest.fixture
+def home(tmpdir, monkeypatch):
+    """Points HOME at a temporary directory holding an initialised configuration"""
+    monkeypatch.setenv('HOME', str(tmpdir))
+    monkeypatch.delenv('CLOCO_PROFILE', raising=False)
+    monkeypatch.setattr(cloco_config, '_profile', None)
+    monkeypatch.setattr(cloco_api, 'token_pool', cloco_api.TokenPool())
+    tmpdir.mkdir('.cloco')
+    config = cloco_config.create_config()
+    config['credentials']['cloco_client_key'] = 'key'
+    config['credentials']['cloco_client_secret'] = 'secret'
+    config['credentials']['cloco_access_token'] = make_token({'exp': time.time() + 3600})
+    config['preferences']['subscription'] = 'sub'
+    config['preferences']['application'] = 'app'
+    config['preferences']['environment'] = 'dev'
+    cloco_config.save_config(config, True)
+    return tmpdir
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Replaces the shared HTTP session with a FakeSession"""
+    session = FakeSession({})
+    monkeypatch.setattr(cloco_session, '_session', session)
+    return session
@@ -0,0 +1,67 @@
+import threading
+
+from cloco_cli import agent, fallback
+from cloco_cli.client import Client
+from cloco_cli.commands.agent import configuration_fetcher
+
+
+def serve(path, fetch):
+    server = agent.create_agent_server(path, fetch)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def test_agent_get_without_agent(tmpdir):
+    assert agent.agent_get(str(tmpdir.join('missing.sock')), {}) is None
+
+
+def test_agent_relays_requests(tmpdir):
+    path = str(tmpdir.join('agent.sock'))
+    server = serve(path, lambda request: agent.AgentResponse(200, request['cob']))
+    try:
+        r = agent.agent_get(path, {'cob': 'db'})
+        assert (r.status_code, r.text) == (200, 'db')
+        assert agent.agent_running(path)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_memory_cache_serves_within_ttl():
+    cache = agent.MemoryCache(ttl=60)
+    assert cache.get('key') is None
+    cache.put('key', '"v1"', 'data')
+    assert cache.get('key') == ('"v1"', 'data')
+    assert cache.fresh('key') == 'data'
+    assert agent.MemoryCache().fresh('key') is None
+
+
+def test_memory_cache_revalidates_after_a_put(home, api):
+    cache = agent.MemoryCache()
+    client = Client()
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': 'v1'}, {'ETag': '"1"'})
+    assert client.fetch_configuration('db', cache=cache).text == '{"configurationData": "v1"}'
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': 'v2'}, {'ETag': '"2"'})
+    assert client.fetch_configuration('db', cache=cache).text == '{"configurationData": "v2"}'
+    assert api.requests[-1][2]['headers']['If-None-Match'] == '"1"'
+
+
+def test_agent_rejects_invalid_profile_names(home, api):
+    fetch = configuration_fetcher(agent.MemoryCache())
+    r = fetch({'profile': '../../escaped', 'cob': 'db'})
+    assert r.status_code == 400
+    assert 'Invalid profile name' in r.text
+    assert not api.requests
+
+
+def test_revalidated_responses_skip_the_last_known_good_store(home, api, monkeypatch):
+    puts = []
+    monkeypatch.setattr(fallback.LastKnownGood, 'put', lambda self, key, text, fetched=None: puts.append(key))
+    fetch = configuration_fetcher(agent.MemoryCache())
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': 'v1'}, {'ETag': '"1"'})
+    assert fetch({'cob': 'db'}).status_code == 200
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (304, '')
+    assert fetch({'cob': 'db'}).status_code == 200
+    assert len(puts) == 1
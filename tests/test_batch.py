@@ -0,0 +1,72 @@
+import pytest
+import sys
+import threading
+
+from cloco_cli.batch import capturing_streams, parse_line, run_ordered
+from cloco_cli.bulk import run_parallel
+
+
+def test_parse_line():
+    assert parse_line('  # a comment\n') is None
+    assert parse_line('\n') is None
+    assert parse_line('cloco configuration get --cob "my db"\n') == (None, ['configuration', 'get', '--cob', 'my db'])
+    assert parse_line('["me"]') == (None, ['me'])
+    assert parse_line('{"id": "a", "args": ["application", "get", "--app", "x"]}') == \
+        ('a', ['application', 'get', '--app', 'x'])
+    with pytest.raises(ValueError):
+        parse_line('{"id": "a"}')
+    with pytest.raises(ValueError):
+        parse_line('me "unbalanced')
+
+
+def test_capture_takes_bytes_and_worker_output():
+    with capturing_streams() as (stdout, stderr):
+        with stdout.capture() as out:
+            sys.stdout.write('text ')
+            sys.stdout.buffer.write(b'bytes ')
+            run_parallel(lambda i: sys.stdout.write('worker{0} '.format(i)), range(3), 3)
+        outside = stdout.current.get()
+    assert out.getvalue().startswith('text bytes ')
+    assert sorted(out.getvalue().split()[2:]) == ['worker0', 'worker1', 'worker2']
+    assert outside is None
+
+
+def test_run_ordered_emits_in_order_while_reading():
+    emitted = []
+    first_emitted = threading.Event()
+
+    def items():
+        for i in range(20):
+            yield i
+            if i == 0:
+                # the first result is emitted before the next item is read
+                assert first_emitted.wait(5)
+
+    def emit(result):
+        emitted.append(result)
+        first_emitted.set()
+
+    run_ordered(lambda i: i * 2, items(), 2, emit)
+    assert emitted == [i * 2 for i in range(20)]
+
+
+def test_run_ordered_takes_a_bounded_window():
+    release = threading.Event()
+    taken = []
+
+    def items():
+        for i in range(50):
+            taken.append(i)
+            yield i
+
+    def func(i):
+        release.wait(5)
+        return i
+
+    thread = threading.Thread(target=run_ordered, args=(func, items(), 2, lambda result: None))
+    thread.start()
+    threading.Event().wait(0.2)
+    assert len(taken) <= 5
+    release.set()
+    thread.join(5)
+    assert len(taken) == 50
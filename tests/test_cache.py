@@ -0,0 +1,67 @@
+import os
+
+from cloco_cli import cache
+
+from tests.conftest import FakeSession
+
+
+def test_cache_round_trip(tmpdir):
+    store = cache.ResponseCache(str(tmpdir))
+    assert store.get('sub/app/cob/dev') is None
+    store.put('sub/app/cob/dev', '"v1"', 'payload')
+    assert store.get('sub/app/cob/dev') == ('"v1"', 'payload')
+
+
+def test_cache_shares_identical_bodies(tmpdir):
+    store = cache.ResponseCache(str(tmpdir))
+    store.put('sub/app/cob/dev', None, 'payload')
+    store.put('sub/app/cob/prod', None, 'payload')
+    assert len(tmpdir.join('blobs').listdir()) == 1
+
+
+def test_cache_evicts_least_recently_used(tmpdir):
+    store = cache.ResponseCache(str(tmpdir), max_size=10)
+    store.put('a', None, 'x' * 6)
+    entry = tmpdir.join('entries').listdir()[0]
+    entry.setmtime(entry.mtime() - 60)
+    store.put('b', None, 'y' * 6)
+    assert store.get('a') is None
+    assert store.get('b') == (None, 'y' * 6)
+
+
+def test_cache_reads_entries_only_over_budget(tmpdir, monkeypatch):
+    store = cache.ResponseCache(str(tmpdir), max_size=100)
+    store.put('a', None, 'x' * 10)
+    store.put('b', None, 'y' * 10)
+    store.put('a', None, 'z' * 10)
+    loads = []
+    monkeypatch.setattr(cache.json, 'load', lambda entryfile: loads.append(entryfile) or {})
+    store.put('c', None, 'w' * 10)
+    assert not loads
+    monkeypatch.undo()
+    # the body no entry refers to is removed once the cache is over budget
+    entry = store._entry_path('b')
+    os.utime(entry, (os.path.getmtime(entry) - 60,) * 2)
+    store.max_size = 30
+    store.put('d', None, 'v' * 10)
+    assert len(tmpdir.join('blobs').listdir()) == 3
+    assert store.get('b') is None
+    assert store.get('a') == (None, 'z' * 10)
+    assert store.get('d') == (None, 'v' * 10)
+
+
+def test_cached_get_revalidates_with_etag(tmpdir):
+    store = cache.ResponseCache(str(tmpdir))
+    store.put('key', '"v1"', 'cached')
+    session = FakeSession({('GET', '/url'): (304, '')})
+    r = cache.cached_get(session, 'https://api.cloco.io/url', {}, store, 'key')
+    assert r.text == 'cached'
+    assert session.requests[0][2]['headers']['If-None-Match'] == '"v1"'
+
+
+def test_cached_get_never_refetches_immutable(tmpdir):
+    store = cache.ResponseCache(str(tmpdir))
+    session = FakeSession({('GET', '/url'): (200, 'version')})
+    assert cache.cached_get(session, 'https://api.cloco.io/url', {}, store, 'key', True).text == 'version'
+    assert cache.cached_get(session, 'https://api.cloco.io/url', {}, store, 'key', True).text == 'version'
+    assert len(session.requests) == 1
@@ -1,11 +1,19 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
 import pytest
-from click.testing import CliRunner
-from cloco_cli import cli
 
+from cloco_cli import api as cloco_api
+from cloco_cli import cli
+from cloco_cli import config as cloco_config
+from cloco_cli.snapshot import SnapshotReader
 
-@pytest.fixture
-def runner():
-    return CliRunner()
+from tests.conftest import make_token
 
 
 def test_cli(runner):
@@ -27,3 +35,499 @@ def test_cli_with_arg(runner):
     assert result.exit_code == 0
     assert not result.exception
     assert result.output.strip() == 'Hello, 345.'
+
+
+def test_token_valid_before_expiry():
+    token = make_token({'exp': time.time() + 3600})
+    assert cloco_api.is_token_valid(token)
+
+
+def test_token_invalid_near_expiry():
+    token = make_token({'exp': time.time() + cloco_api.TOKEN_EXPIRY_MARGIN - 1})
+    assert not cloco_api.is_token_valid(token)
+
+
+def test_token_invalid_when_malformed():
+    assert not cloco_api.is_token_valid('')
+    assert not cloco_api.is_token_valid('not-a-jwt')
+    assert not cloco_api.is_token_valid(make_token({'sub': 'no-expiry'}))
+
+
+def test_configuration_pull_from_list(runner, home, api):
+    api.responses[('GET', '/sub/configuration/app')] = (200, [{'configObjectId': 'db', 'environmentId': 'dev'}],
+                                                        {'link': '</sub/configuration/app?page=2>; rel="next"'})
+    api.responses[('GET', '/sub/configuration/app?page=2')] = (200, [{'configObjectId': 'web', 'environmentId': 'dev'}])
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': 'db-data'})
+    api.responses[('GET', '/sub/configuration/app/web/dev')] = (200, {'configurationData': 'web-data'})
+    target = home.mkdir('out')
+    result = runner.invoke(cli.main, ['configuration', 'pull', '--target', str(target)])
+    assert result.exit_code == 0
+    assert target.join('app', 'db', 'dev').read() == 'db-data'
+    assert target.join('app', 'web', 'dev').read() == 'web-data'
+    assert '2 succeeded, 0 failed' in result.output
+
+
+def test_configuration_pull_from_manifest_reports_failures(runner, home, api):
+    api.responses[('GET', '/sub/configuration/app/db/prod')] = (200, {'configurationData': 'db-data'})
+    manifest = home.join('manifest')
+    manifest.write('db prod\n# comment\nmissing\n')
+    target = home.mkdir('out')
+    result = runner.invoke(cli.main, ['configuration', 'pull', '--manifest', str(manifest),
+                                      '--target', str(target)])
+    assert result.exit_code != 0
+    assert target.join('app', 'db', 'prod').read() == 'db-data'
+    assert 'missing/dev: 404' in result.output
+    assert '1 succeeded, 1 failed' in result.output
+
+
+def test_configuration_push_skips_unchanged(runner, home, api):
+    source = home.mkdir('src')
+    source.mkdir('app').mkdir('db').join('dev.json').write('{"a": 1}')
+    source.join('app').mkdir('web').join('dev').write('same')
+    api.responses[('GET', '/sub/configuration/app/web/dev')] = (200, {'configurationData': 'same'}, {'ETag': '"1"'})
+    api.responses[('PUT', '/sub/configuration/app/db/dev')] = (200, 'OK')
+    result = runner.invoke(cli.main, ['configuration', 'push', '--source', str(source)])
+    assert result.exit_code == 0
+    assert 'app/db/dev: uploaded' in result.output
+    assert 'app/web/dev: unchanged' in result.output
+    puts = [r for r in api.requests if r[0] == 'PUT']
+    assert len(puts) == 1
+    assert puts[0][2]['headers']['content-type'] == 'application/json'
+    assert puts[0][2]['data'] == b'{"a": 1}'
+
+    api.responses[('GET', '/sub/configuration/app/web/dev')] = (304, '')
+    result = runner.invoke(cli.main, ['configuration', 'push', '--source', str(source)])
+    assert 'app/web/dev: unchanged' in result.output
+    gets = [r for r in api.requests if r[1] == '/sub/configuration/app/web/dev']
+    assert gets[-1][2]['headers']['If-None-Match'] == '"1"'
+
+
+def test_configuration_push_rejects_two_files_for_one_environment(runner, home, api):
+    cob = home.mkdir('src').mkdir('app').mkdir('db')
+    cob.join('dev.json').write('{"a": 1}')
+    cob.join('dev.yaml').write('a: 1')
+    result = runner.invoke(cli.main, ['configuration', 'push', '--source', str(home.join('src'))])
+    assert result.exit_code == 1
+    assert 'are both configuration app/db/dev' in result.output
+    assert not [r for r in api.requests if r[0] == 'PUT']
+
+
+def test_configuration_get_falls_back_without_agent(runner, home, api):
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': 'db-data'})
+    result = runner.invoke(cli.main, ['configuration', 'get', '--cob', 'db'])
+    assert result.exit_code == 0
+    assert result.output.strip() == 'db-data'
+
+
+def test_configuration_watch_writes_changes_and_runs_hook(runner, home, api):
+    api.responses[('GET', '/sub/configuration/versions/app/db/dev')] = (200, [{'revision': 1}])
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': 'db-data'})
+    target = home.mkdir('out')
+    result = runner.invoke(cli.main, ['configuration', 'watch', '--cob', 'db', '--target', str(target),
+                                      '--exec', 'touch "$CLOCO_FILE.hook"', '--count', '1'])
+    assert result.exit_code == 0
+    assert 'db/dev: changed' in result.output
+    assert target.join('app', 'db', 'dev').read() == 'db-data'
+    assert target.join('app', 'db', 'dev.hook').check()
+
+
+def test_commands_report_missing_profile(runner, home):
+    result = runner.invoke(cli.main, ['--profile', 'nope', 'me'])
+    assert result.exit_code == 1
+    assert 'Run cloco init' in result.output
+
+
+def test_invalid_profile_from_environment_is_rejected(runner, home, monkeypatch):
+    monkeypatch.setenv('CLOCO_PROFILE', '../../escaped')
+    result = runner.invoke(cli.main, ['init', '--key', 'k'])
+    assert result.exit_code == 2
+    assert 'Invalid profile name' in result.output
+    assert not home.join('escaped').check()
+
+
+def test_help_does_not_import_commands():
+    script = ('import sys; from click.testing import CliRunner; from cloco_cli import cli; '
+              'CliRunner().invoke(cli.main, ["--help"]); '
+              'print("requests" in sys.modules, "cloco_cli.api" in sys.modules)')
+    output = subprocess.check_output([sys.executable, '-c', script], universal_newlines=True)
+    assert output.strip() == 'False False'
+
+
+@pytest.mark.parametrize('args', [
+    ['configuration', '--help'],
+    ['configuration', 'get', '--help'],
+    ['configuration', 'version', '--help'],
+    ['application', '--help'],
+    ['subscription', '--help'],
+])
+def test_subcommand_help_does_not_import_the_http_stack(args):
+    script = ('import sys; from click.testing import CliRunner; from cloco_cli import cli; '
+              'result = CliRunner().invoke(cli.main, sys.argv[1:]); '
+              'print(result.exit_code, "requests" in sys.modules)')
+    output = subprocess.check_output([sys.executable, '-c', script] + args, universal_newlines=True)
+    assert output.strip() == '0 False'
+
+
+def test_lazy_command_help_matches_command():
+    for name, (path, short_help) in cli.LAZY_COMMANDS.items():
+        command = cli.main.get_command(None, name)
+        assert command.get_short_help_str(1000) == short_help
+
+
+def test_configuration_get_streams_to_file(runner, home, api):
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': 'db\n"data"'})
+    path = home.join('db.conf')
+    result = runner.invoke(cli.main, ['configuration', 'get', '--cob', 'db', '--output', str(path)])
+    assert result.exit_code == 0
+    assert path.read() == 'db\n"data"'
+    result = runner.invoke(cli.main, ['configuration', 'get', '--cob', 'db', '--output', '-'])
+    assert result.output == 'db\n"data"'
+
+
+def test_application_put_streams_file(runner, home, api):
+    api.responses[('PUT', '/sub/applications/app')] = (200, 'OK')
+    path = home.join('app.json')
+    path.write_binary(b'{"name": "\xc3\xa9"}')
+    result = runner.invoke(cli.main, ['application', 'put', '--filename', str(path)])
+    assert result.exit_code == 0
+    assert api.requests[-1][2]['data'] == b'{"name": "\xc3\xa9"}'
+
+
+def test_configuration_put_compresses_stdin(runner, home, api):
+    api.responses[('PUT', '/sub/configuration/app/db/dev')] = (200, 'OK')
+    result = runner.invoke(cli.main, ['configuration', 'put', '--cob', 'db', '--filename', '-', '--gzip'],
+                           input=b'from stdin')
+    assert result.exit_code == 0
+    method, path, kwargs = api.requests[-1]
+    assert kwargs['headers']['content-encoding'] == 'gzip'
+    assert gzip.decompress(kwargs['data']) == b'from stdin'
+
+
+def test_init_with_profile(runner, home):
+    result = runner.invoke(cli.main, ['--profile', 'prod', 'init', '--key', 'k', '--sub', 'prod-sub'])
+    assert result.exit_code == 0
+    assert 'prod-sub' in home.join('.cloco', 'profiles', 'prod').read()
+    assert 'prod-sub' not in home.join('.cloco', 'configuration').read()
+    assert runner.invoke(cli.main, ['--profile', '../x', 'init']).exit_code == 2
+
+
+def test_token_pool_refreshes_once_per_profile(home, api):
+    config = cloco_config.load_config()
+    config['credentials']['cloco_access_token'] = ''
+    config['settings']['url'] = 'https://api.cloco.io/pool-test'
+    api.responses[('POST', '/pool-test/oauth/token')] = (200, {'access_token': make_token({'exp': time.time() + 3600})})
+    threads = [threading.Thread(target=cloco_api.authenticate, args=(config,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len([r for r in api.requests if r[0] == 'POST']) == 1
+
+
+def snapshot_responses(api, revision):
+    api.responses[('GET', '/sub')] = (200, {'subscriptionId': 'sub'})
+    api.responses[('GET', '/sub/applications')] = (200, [{'applicationId': 'app'}])
+    api.responses[('GET', '/sub/applications/app')] = (200, {'applicationId': 'app'})
+    api.responses[('GET', '/sub/configuration/app')] = (200, [
+        {'configObjectId': 'db', 'environmentId': 'dev', 'revision': revision},
+        {'configObjectId': 'web', 'environmentId': 'dev', 'revision': revision}])
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': 'db-data'})
+    api.responses[('GET', '/sub/configuration/app/web/dev')] = (200, {'configurationData': 'web-data'})
+    return
+
+
+def test_export_writes_snapshot(runner, home, api):
+    snapshot_responses(api, 1)
+    output = str(home.join('snapshot.tar.gz'))
+    result = runner.invoke(cli.main, ['export', '--output', output, '--no-permissions'])
+    assert result.exit_code == 0
+    assert '2 configuration objects (2 fetched, 0 reused), 0 errors' in result.output
+    reader = SnapshotReader(output)
+    assert reader.index['applications'] == ['app']
+    assert reader.read_json('configuration/app/web/dev.json') == {'configurationData': 'web-data'}
+    reader.close()
+
+
+def test_export_since_reuses_unchanged_objects(runner, home, api):
+    snapshot_responses(api, 1)
+    previous = str(home.join('previous.tar.gz'))
+    runner.invoke(cli.main, ['export', '--output', previous, '--no-permissions'])
+    api.responses[('GET', '/sub/configuration/app')] = (200, [
+        {'configObjectId': 'db', 'environmentId': 'dev', 'revision': 2},
+        {'configObjectId': 'web', 'environmentId': 'dev', 'revision': 1}])
+    del api.requests[:]
+    output = str(home.join('snapshot.tar.gz'))
+    result = runner.invoke(cli.main, ['export', '--output', output, '--since', previous, '--no-permissions'])
+    assert result.exit_code == 0
+    assert '(1 fetched, 1 reused)' in result.output
+    assert ('GET', '/sub/configuration/app/web/dev') not in [r[:2] for r in api.requests]
+    assert SnapshotReader(output).read_json('configuration/app/web/dev.json') == {'configurationData': 'web-data'}
+
+
+def test_export_records_failures(runner, home, api):
+    snapshot_responses(api, 1)
+    del api.responses[('GET', '/sub/configuration/app/web/dev')]
+    output = str(home.join('snapshot.tar.gz'))
+    result = runner.invoke(cli.main, ['export', '--output', output])
+    assert result.exit_code != 0
+    assert 'configuration/app/web/dev.json: 404' in result.output
+    assert SnapshotReader(output).index['errors']
+
+
+def test_import_restores_in_dependency_order(runner, home, api):
+    snapshot_responses(api, 1)
+    api.responses[('GET', '/sub/configuration/app/db/dev/permissions')] = (200, [
+        {'identity': 'alice', 'permissionLevel': 'read'}])
+    source = str(home.join('snapshot.tar.gz'))
+    runner.invoke(cli.main, ['export', '--output', source])
+    api.responses[('PUT', '/target/applications/app')] = (200, 'OK')
+    api.responses[('PUT', '/target/configuration/app/db/dev')] = (200, 'OK')
+    api.responses[('PUT', '/target/configuration/app/web/dev')] = (200, 'OK')
+    api.responses[('POST', '/target/configuration/app/db/dev/permissions')] = (200, 'OK')
+    del api.requests[:]
+    result = runner.invoke(cli.main, ['import', '--sub', 'target', '--source', source])
+    assert result.exit_code == 0
+    assert '7 restored, 0 already restored, 0 failed' in result.output
+    paths = [r[1] for r in api.requests]
+    assert paths[0] == '/target/applications/app'
+    assert paths[-1] == '/target/configuration/app/db/dev/permissions'
+    assert api.requests[-1][2]['data'] == '{"permissionLevel": "read", "identity": "alice"}'
+    assert not home.join('snapshot.tar.gz.checkpoint').check()
+
+
+def test_import_resumes_from_checkpoint(runner, home, api):
+    snapshot_responses(api, 1)
+    source = str(home.join('snapshot.tar.gz'))
+    runner.invoke(cli.main, ['export', '--output', source, '--no-permissions'])
+    api.responses[('PUT', '/target/applications/app')] = (200, 'OK')
+    api.responses[('PUT', '/target/configuration/app/db/dev')] = (200, 'OK')
+    result = runner.invoke(cli.main, ['import', '--sub', 'target', '--source', source, '--no-permissions'])
+    assert result.exit_code != 0
+    assert '2 restored, 0 already restored, 1 failed' in result.output
+    assert home.join('snapshot.tar.gz.checkpoint').check()
+    api.responses[('PUT', '/target/configuration/app/web/dev')] = (200, 'OK')
+    del api.requests[:]
+    result = runner.invoke(cli.main, ['import', '--sub', 'target', '--source', source, '--no-permissions'])
+    assert result.exit_code == 0
+    assert '1 restored, 2 already restored, 0 failed' in result.output
+    assert [r[1] for r in api.requests] == ['/target/configuration/app/web/dev']
+
+
+def test_import_does_not_resume_into_another_subscription(runner, home, api):
+    snapshot_responses(api, 1)
+    source = str(home.join('snapshot.tar.gz'))
+    runner.invoke(cli.main, ['export', '--output', source, '--no-permissions'])
+    api.responses[('PUT', '/a/applications/app')] = (200, 'OK')
+    api.responses[('PUT', '/a/configuration/app/db/dev')] = (200, 'OK')
+    result = runner.invoke(cli.main, ['import', '--sub', 'a', '--source', source, '--no-permissions'])
+    assert '2 restored, 0 already restored, 1 failed' in result.output
+    for path in ('/b/applications/app', '/b/configuration/app/db/dev', '/b/configuration/app/web/dev'):
+        api.responses[('PUT', path)] = (200, 'OK')
+    del api.requests[:]
+    result = runner.invoke(cli.main, ['import', '--sub', 'b', '--source', source, '--no-permissions'])
+    assert result.exit_code == 0
+    assert '3 restored, 0 already restored, 0 failed' in result.output
+    assert sorted(r[1] for r in api.requests if r[0] == 'PUT') == [
+        '/b/applications/app', '/b/configuration/app/db/dev', '/b/configuration/app/web/dev']
+
+
+def test_import_skips_dependents_of_failed_application(runner, home, api):
+    snapshot_responses(api, 1)
+    source = str(home.join('snapshot.tar.gz'))
+    runner.invoke(cli.main, ['export', '--output', source, '--no-permissions'])
+    result = runner.invoke(cli.main, ['import', '--sub', 'target', '--source', source, '--no-permissions'])
+    assert result.exit_code != 0
+    assert 'configuration/app/db/dev: skipped, a dependency failed' in result.output
+    assert len(api.requests) == len([r for r in api.requests if r[0] == 'GET']) + 1
+
+
+def test_configuration_diff_between_environments(runner, home, api):
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': '{"host": "dev", "port": 1}'})
+    api.responses[('GET', '/sub/configuration/app/db/prod')] = (
+        200, {'configurationData': '{"host": "prod", "port": 1}'})
+    result = runner.invoke(cli.main, ['configuration', 'diff', '--cob', 'db', '--to-env', 'prod'])
+    assert result.exit_code == 0
+    assert 'db: dev -> prod' in result.output
+    assert '~ .host: "dev" -> "prod"' in result.output
+    assert 'port' not in result.output
+
+
+def test_configuration_diff_all_against_version(runner, home, api):
+    api.responses[('GET', '/sub/configuration/app')] = (200, [
+        {'configObjectId': 'db', 'environmentId': 'dev'},
+        {'configObjectId': 'web', 'environmentId': 'dev'}])
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': 'a=1'})
+    api.responses[('GET', '/sub/configuration/app/web/dev')] = (200, {'configurationData': 'b=2'})
+    api.responses[('GET', '/sub/configuration/versions/app/db/dev/3')] = (200, {'configurationData': 'a=1'})
+    api.responses[('GET', '/sub/configuration/versions/app/web/dev/3')] = (200, {'configurationData': 'b=1'})
+    result = runner.invoke(cli.main, ['configuration', 'diff', '--all', '--to-version', '3'])
+    assert result.exit_code == 0
+    assert 'web: dev -> dev@3' in result.output
+    assert 'db:' not in result.output
+    assert '1 of 2 configuration objects differ, 0 failed' in result.output
+    result = runner.invoke(cli.main, ['configuration', 'diff', '--all', '--to-version', '3'])
+    versions = [r for r in api.requests if '/versions/' in r[1]]
+    assert len(versions) == 2
+
+
+def test_list_follows_next_links(runner, home, api):
+    api.responses[('GET', '/sub/configuration/versions/app/db/dev')] = (
+        200, [{'revision': 1}, {'revision': 2}],
+        {'link': '</sub/configuration/versions/app/db/dev?page=2>; rel="next"'})
+    api.responses[('GET', '/sub/configuration/versions/app/db/dev?page=2')] = (200, [{'revision': 3}])
+    result = runner.invoke(cli.main, ['configuration', 'version', 'list', '--cob', 'db', '--all', '--ndjson',
+                                      '--limit', '2', '--fields', 'revision'])
+    assert result.exit_code == 0
+    assert result.output == '{"revision": 1}\n{"revision": 2}\n{"revision": 3}\n'
+    assert api.requests[0][2]['params'] == {'limit': 2}
+    result = runner.invoke(cli.main, ['configuration', 'version', 'list', '--cob', 'db'])
+    assert json.loads(result.output) == [{'revision': 1}, {'revision': 2}]
+
+
+def test_output_modes_and_exit_codes(runner, home, api):
+    api.responses[('GET', '/sub/applications')] = (200, '[{"name": "a", "applicationId": "app"}]')
+    result = runner.invoke(cli.main, ['--output', 'json', 'application', 'list'])
+    assert result.output == '[{"name":"a","applicationId":"app"}]\n'
+    result = runner.invoke(cli.main, ['--output', 'table', 'application', 'list'])
+    assert result.output.splitlines() == ['name  applicationId', 'a     app']
+    result = runner.invoke(cli.main, ['--output', 'raw', 'configuration', 'version', 'get', '--cob', 'db',
+                                      '--version', '1', '--json', '--no-cache'])
+    assert result.exit_code == 4
+    assert 'Request failed.' in result.output
+    api.responses[('GET', '/sub/applications/app')] = (500, 'Server error')
+    result = runner.invoke(cli.main, ['application', 'get'])
+    assert result.exit_code == 6
+
+
+def test_exec_flattens_configuration_into_environment(runner, home, api, monkeypatch):
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': '{"host": "h", "port": 1}'})
+    api.responses[('GET', '/sub/configuration/app/web/dev')] = (200, {'configurationData': 'port=2\n'})
+    calls = []
+    monkeypatch.setattr('os.execvp', lambda file, args: calls.append((file, args, dict(os.environ))))
+    monkeypatch.setattr('os.environ', dict(os.environ))
+    result = runner.invoke(cli.main, ['exec', '--cob', 'db', '--cob', 'web', '--prefix', 'APP_', '--no-cache',
+                                      'server', '--port', '$APP_PORT'])
+    assert result.exit_code == 0
+    assert calls[0][:2] == ('server', ['server', '--port', '$APP_PORT'])
+    assert calls[0][2]['APP_HOST'] == 'h'
+    assert calls[0][2]['APP_PORT'] == '2'
+
+
+def test_render_template_to_file(runner, home, api):
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': '{"host": "h"}'})
+    template = home.join('app.conf.tpl')
+    template.write('host = $HOST\n')
+    output = home.join('app.conf')
+    result = runner.invoke(cli.main, ['render', '--cob', 'db', '--no-cache', '--output', str(output), str(template)])
+    assert result.exit_code == 0
+    assert output.read() == 'host = h\n'
+    template.write('host = $PORT\n')
+    result = runner.invoke(cli.main, ['render', '--cob', 'db', '--no-cache', str(template)])
+    assert result.exit_code != 0
+    assert "Cannot render" in result.output
+
+
+def test_configuration_get_falls_back_to_last_known_good(runner, home, api, monkeypatch):
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': 'db-data'})
+    result = runner.invoke(cli.main, ['configuration', 'get', '--cob', 'db', '--no-cache'])
+    assert result.output.strip() == 'db-data'
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (503, 'Unavailable')
+    result = runner.invoke(cli.main, ['configuration', 'get', '--cob', 'db', '--no-cache'])
+    assert result.exit_code == 6
+    result = runner.invoke(cli.main, ['configuration', 'get', '--cob', 'db', '--no-cache', '--fallback', 'on-error'])
+    assert result.exit_code == 0
+    assert 'The API failed, serving configuration stored 0s ago' in result.output
+    assert 'db-data' in result.output
+
+
+def test_response_caches_are_scoped_to_the_api_url(runner, home, api):
+    u = '/sub/configuration/versions/app/db/dev/1'
+    api.responses[('GET', u)] = (200, {'configurationData': 'main'})
+    api.responses[('GET', 'https://other.example' + u)] = (200, {'configurationData': 'other'})
+    assert runner.invoke(cli.main, ['configuration', 'version', 'get', '--cob', 'db', '--version', '1']).output == \
+        'main\n'
+    config = cloco_config.load_config()
+    config['settings']['url'] = 'https://other.example'
+    cloco_config.save_config(config, True)
+    assert runner.invoke(cli.main, ['configuration', 'version', 'get', '--cob', 'db', '--version', '1']).output == \
+        'other\n'
+
+
+def test_configuration_get_serves_stale_and_refreshes(runner, home, api, monkeypatch):
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': 'db-data'})
+    runner.invoke(cli.main, ['configuration', 'get', '--cob', 'db', '--no-cache'])
+    del api.requests[:]
+    refreshed = []
+    monkeypatch.setattr('subprocess.Popen', lambda args, **kwargs: refreshed.append((args, kwargs)))
+    monkeypatch.setenv('CLOCO_FALLBACK', 'stale')
+    result = runner.invoke(cli.main, ['configuration', 'get', '--cob', 'db'])
+    assert result.exit_code == 0
+    assert 'db-data' in result.output
+    assert not api.requests
+    args, kwargs = refreshed[0]
+    assert args[-13:] == ['get', '--sub', 'sub', '--app', 'app', '--cob', 'db', '--env', 'dev', '--json',
+                          '--fallback', 'none', '--no-refresh']
+    assert 'CLOCO_FALLBACK' not in kwargs['env']
+    assert kwargs['env']['HOME'] == os.environ['HOME']
+
+
+def test_batch_runs_lines_in_one_process(runner, home, api):
+    api.responses[('GET', '/me')] = (200, {'username': 'u'})
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': 'db-data'})
+    script = '\n'.join(['# setup', 'me', '{"id": "db", "args": ["configuration", "get", "--cob", "db", "--no-cache"]}',
+                        'configuration get --cob missing --no-cache', 'exec true', 'nonsense',
+                        'configuration get --cob db --output -'])
+    for parallel in ('1', '4'):
+        del api.requests[:]
+        result = runner.invoke(cli.main, ['--output', 'json', 'batch', '--parallel', parallel, '-'], input=script)
+        assert result.exit_code == 1
+        results = [json.loads(line) for line in result.stdout.splitlines()]
+        assert [r['line'] for r in results] == [2, 3, 4, 5, 6, 7]
+        assert [r['exit'] for r in results] == [0, 0, 4, 2, 2, 0]
+        assert json.loads(results[0]['stdout']) == {'username': 'u'}
+        assert results[1]['id'] == 'db'
+        assert results[1]['stdout'] == 'db-data\n'
+        assert 'Not found' in results[2]['stderr']
+        assert 'cannot run in a batch' in results[3]['stderr']
+        assert results[5]['stdout'] == 'db-data'
+        assert '3 line(s) failed.' in result.stderr
+        assert len([r for r in api.requests if r[1] == '/oauth/token']) <= 1
+
+
+def test_permissions_sync_applies_the_minimal_changes(runner, home, api):
+    manifest = home.join('manifest.json')
+    manifest.write(json.dumps({'permissions': [
+        {'identity': 'alice', 'role': 'admin'},
+        {'identity': 'team', 'role': 'read', 'app': 'app', 'cob': '*', 'env': 'dev'}]}))
+    api.responses[('GET', '/sub/permissions')] = (200, [{'identity': 'alice', 'permissionLevel': 'admin'},
+                                                        {'identity': 'old', 'permissionLevel': 'user'}])
+    api.responses[('GET', '/sub/configuration/app')] = (200, [{'configObjectId': 'db', 'environmentId': 'dev'},
+                                                              {'configObjectId': 'db', 'environmentId': 'prod'}])
+    api.responses[('GET', '/sub/configuration/app/db/dev/permissions')] = (200, [])
+    api.responses[('POST', '/sub/configuration/app/db/dev/permissions')] = (200, '')
+    api.responses[('DELETE', '/sub/permissions/old')] = (200, '')
+    result = runner.invoke(cli.main, ['--output', 'json', 'permissions', 'sync', '--plan', str(manifest)])
+    assert result.exit_code == 0
+    assert [(c['action'], c['identity']) for c in json.loads(result.output)] == [('remove', 'old'), ('add', 'team')]
+    assert not [r for r in api.requests if r[0] != 'GET']
+    result = runner.invoke(cli.main, ['--output', 'pretty', 'permissions', 'sync', str(manifest)])
+    assert result.exit_code == 0
+    assert '+ team read on app/db/dev' in result.output
+    writes = sorted(r[:2] for r in api.requests if r[0] != 'GET')
+    assert writes == [('DELETE', '/sub/permissions/old'), ('POST', '/sub/configuration/app/db/dev/permissions')]
+
+
+def test_trace_and_cprofile(runner, home, api):
+    api.responses[('GET', '/me')] = (200, {'username': 'u'})
+    trace_file = home.join('trace.json')
+    profile_file = home.join('profile.out')
+    result = runner.invoke(cli.main, ['--trace', '--trace-file', str(trace_file), '--cprofile', str(profile_file),
+                                      'me'])
+    assert result.exit_code == 0
+    assert 'trace:' in result.stderr
+    assert 'load_config' in result.stderr
+    names = [event['name'] for event in json.loads(trace_file.read())['traceEvents']]
+    assert 'command' in names and 'decode' in names
+    assert profile_file.size() > 0
+    result = runner.invoke(cli.main, ['me'])
+    assert 'trace:' not in result.stderr
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+
+from cloco_cli import aio
+from cloco_cli.api import AuthenticationFailed, RequestFailed
+from cloco_cli.client import Client
+from cloco_cli.config import ConfigurationMissing
+
+from tests.conftest import make_token
+
+
+def test_client_defaults_to_preferences(home):
+    client = Client()
+    assert client.configuration_url('db') == 'https://api.cloco.io/sub/configuration/app/db/dev'
+    assert client.configuration_url('db', 'prod', 'other', 'sub2') == \
+        'https://api.cloco.io/sub2/configuration/other/db/prod'
+    assert client.version_url('db') == 'https://api.cloco.io/sub/configuration/versions/app/db/dev'
+
+
+def test_client_raises_configuration_missing(home):
+    with pytest.raises(ConfigurationMissing) as e:
+        Client(profile='nope')
+    assert e.value.profile == 'nope'
+
+
+def test_client_decodes_json(home, api):
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': 'db-data'})
+    assert Client().get_configuration('db') == {'configurationData': 'db-data'}
+    assert api.requests[0][2]['headers']['authorization'].startswith('Bearer ')
+
+
+def test_client_raises_request_failed(home, api):
+    with pytest.raises(RequestFailed) as e:
+        Client().get_application('missing')
+    assert e.value.response.status_code == 404
+
+
+def test_client_raises_authentication_failed(home, api):
+    client = Client()
+    client.config['credentials']['cloco_access_token'] = ''
+    api.responses[('POST', '/oauth/token')] = (401, 'Unauthorized')
+    with pytest.raises(AuthenticationFailed):
+        client.me()
+
+
+def test_async_client_without_httpx(home, api, monkeypatch):
+    monkeypatch.setattr(aio, 'httpx', None)
+    for cob in range(50):
+        api.responses[('GET', '/sub/configuration/app/{0}/dev'.format(cob))] = (200, {'configurationData': str(cob)})
+
+    async def fetch_all():
+        async with aio.AsyncClient(concurrency=10) as client:
+            return await asyncio.gather(*[client.get_configuration(cob) for cob in range(50)])
+
+    documents = asyncio.run(fetch_all())
+    assert [d['configurationData'] for d in documents] == [str(cob) for cob in range(50)]
+
+
+def test_async_client_refreshes_token_once(home, api, monkeypatch):
+    monkeypatch.setattr(aio, 'httpx', None)
+    api.responses[('POST', '/oauth/token')] = (200, {'access_token': make_token({'exp': time.time() + 3600})})
+    api.responses[('GET', '/me')] = (200, {'username': 'me'})
+
+    async def fetch_all():
+        async with aio.AsyncClient(profile='default') as client:
+            client.config['credentials']['cloco_access_token'] = ''
+            return await asyncio.gather(*[client.me() for i in range(20)])
+
+    assert len(asyncio.run(fetch_all())) == 20
+    assert len([r for r in api.requests if r[1] == '/oauth/token']) == 1
+
+
+def test_async_client_revalidates_configuration(home, api, monkeypatch):
+    monkeypatch.setattr(aio, 'httpx', None)
+    api.responses[('GET', '/sub/configuration/app/db/dev')] = (200, {'configurationData': 'v1'}, {'ETag': '"1"'})
+
+    async def fetch_twice():
+        async with aio.AsyncClient() as client:
+            first = await client.fetch_configuration('db')
+            api.responses[('GET', '/sub/configuration/app/db/dev')] = (304, '')
+            return first, await client.fetch_configuration('db')
+
+    first, second = asyncio.run(fetch_twice())
+    assert first.status_code == second.status_code == 200
+    assert second.text == first.text
+    assert api.requests[-1][2]['headers']['If-None-Match'] == '"1"'
+
+
+def test_async_client_serves_configuration_versions_from_the_cache(home, api, monkeypatch):
+    monkeypatch.setattr(aio, 'httpx', None)
+    api.responses[('GET', '/sub/configuration/versions/app/db/dev/3')] = (200, {'configurationData': 'v3'})
+
+    async def fetch_twice():
+        async with aio.AsyncClient() as client:
+            return [(await client.fetch_configuration_version('db', 3)).text for i in range(2)]
+
+    first, second = asyncio.run(fetch_twice())
+    assert 'v3' in first and second == first
+    assert len([r for r in api.requests if r[1] == '/sub/configuration/versions/app/db/dev/3']) == 1
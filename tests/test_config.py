@@ -0,0 +1,55 @@
+import pytest
+
+from cloco_cli import config as cloco_config
+
+
+def test_load_config_reuses_parse_until_file_changes(home, monkeypatch):
+    parses = []
+    parse_config = cloco_config.parse_config
+
+    def counting_parse(path):
+        parses.append(path)
+        return parse_config(path)
+
+    monkeypatch.setattr(cloco_config, 'parse_config', counting_parse)
+    config = cloco_config.load_config()
+    assert cloco_config.load_config()['preferences']['subscription'] == 'sub'
+    assert len(parses) <= 1
+    config['preferences']['subscription'] = 'other'
+    cloco_config.save_config(config, True)
+    assert cloco_config.load_config()['preferences']['subscription'] == 'other'
+
+
+def test_loaded_config_is_a_copy(home):
+    config = cloco_config.load_config()
+    config['preferences']['subscription'] = 'changed'
+    assert cloco_config.load_config()['preferences']['subscription'] == 'sub'
+
+
+def test_save_config_skips_unchanged(home):
+    path = home.join('.cloco', 'configuration')
+    before = path.stat()
+    cloco_config.save_config(cloco_config.load_config(), True)
+    after = path.stat()
+    assert (before.ino, before.mtime) == (after.ino, after.mtime)
+    assert not [p for p in home.join('.cloco').listdir() if p.basename.startswith('.cloco-')]
+
+
+def test_profiles_use_separate_files(home, monkeypatch):
+    monkeypatch.setenv('CLOCO_PROFILE', 'prod')
+    assert cloco_config.get_config_path().endswith('/.cloco/profiles/prod')
+    assert cloco_config.get_config_path('default').endswith('/.cloco/configuration')
+    assert not cloco_config.config_exists()
+    cloco_config.save_config(cloco_config.create_config(), True)
+    assert home.join('.cloco', 'profiles', 'prod').check()
+    assert home.join('.cloco', 'profiles', 'prod').stat().mode & 0o777 == 0o600
+    assert cloco_config.load_config().profile == 'prod'
+
+
+def test_profile_names_are_checked_from_every_source(home, monkeypatch):
+    monkeypatch.setenv('CLOCO_PROFILE', '../../escaped')
+    with pytest.raises(ValueError):
+        cloco_config.get_config_path()
+    with pytest.raises(ValueError):
+        cloco_config.get_config_path('.hidden')
+    assert not home.join('escaped').check()
@@ -0,0 +1,32 @@
+from cloco_cli import diff
+
+
+def test_decode_payload_only_accepts_objects_and_arrays():
+    assert diff.decode_payload('{"a": 1}') == {'a': 1}
+    assert diff.decode_payload('[1]') == [1]
+    assert diff.decode_payload('1') is None
+    assert diff.decode_payload('key=value') is None
+
+
+def test_diff_documents_recurses_into_objects():
+    left = {'db': {'host': 'dev', 'port': 5432}, 'debug': True}
+    right = {'db': {'host': 'prod', 'port': 5432}, 'replicas': 3}
+    assert diff.diff_documents(left, right) == [
+        ('.db.host', 'dev', 'prod'),
+        ('.debug', True, diff.MISSING),
+        ('.replicas', diff.MISSING, 3)]
+
+
+def test_diff_payloads_structural():
+    lines = diff.diff_payloads('{"a": 1, "b": 2}', '{"a": 1, "b": 3, "c": [1]}', 'dev', 'prod')
+    assert lines == ['~ .b: 2 -> 3', '+ .c: [1]']
+
+
+def test_diff_payloads_text():
+    lines = diff.diff_payloads('a=1\nb=2\n', 'a=1\nb=3\n', 'dev', 'prod')
+    assert '-b=2' in lines and '+b=3' in lines
+
+
+def test_diff_payloads_missing_side():
+    assert diff.diff_payloads(None, 'x', 'dev', 'prod') == ['only in prod']
+    assert diff.diff_payloads('x', 'x', 'dev', 'prod') == []
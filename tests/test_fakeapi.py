@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+from benchmarks.fakeapi import FakeApi, FakeApiServer
+from cloco_cli import cli
+from cloco_cli import config as cloco_config
+from cloco_cli import session as cloco_session
+
+
+@pytest.fixture
+def server(home, monkeypatch):
+    """Serves a fake API holding subscription sub and points the profile at it"""
+    monkeypatch.setattr(cloco_session, '_session', None)
+    api = FakeApi(credentials={'key': 'secret'})
+    api.populate('sub', cobs=3)
+    api.subscriptions['sub']['applications']['app'] = {'applicationId': 'app'}
+    with FakeApiServer(api) as fake:
+        config = cloco_config.load_config()
+        config['settings']['url'] = fake.url
+        config['settings']['retries'] = '0'
+        config['credentials']['cloco_access_token'] = ''
+        cloco_config.save_config(config, True)
+        yield fake
+    monkeypatch.setattr(cloco_session, '_session', None)
+
+
+def test_configuration_round_trip(runner, server):
+    result = runner.invoke(cli.main, ['configuration', 'put', '--cob', 'db', '--data', '{"a": 1}'])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(cli.main, ['--output', 'raw', 'configuration', 'get', '--cob', 'db'])
+    assert result.output.strip() == '{"a": 1}'
+    result = runner.invoke(cli.main, ['--output', 'json', 'configuration', 'version', 'list', '--cob', 'db'])
+    assert json.loads(result.output) == [{'revision': 1}]
+
+
+def test_lists_follow_pages(runner, server):
+    result = runner.invoke(cli.main, ['--output', 'json', 'configuration', 'list', '--app', 'app0',
+                                      '--limit', '2', '--all'])
+    assert result.exit_code == 0, result.output
+    assert [item['configObjectId'] for item in json.loads(result.output)] == ['cob0', 'cob1', 'cob2']
+
+
+def test_rejected_credentials_and_injected_errors(runner, server):
+    server.api.error_rate = 1.0
+    result = runner.invoke(cli.main, ['configuration', 'get', '--cob', 'cob0', '--app', 'app0', '--no-cache'])
+    assert result.exit_code == 6
+    server.api.error_rate = 0.0
+    server.api.credentials['key'] = 'rotated'
+    result = runner.invoke(cli.main, ['configuration', 'get', '--cob', 'cob0', '--app', 'app0', '--no-cache'])
+    assert result.exit_code == 3
+    assert 'Invalid credentials' in result.output
+
+
+def test_rotate_client_credentials(runner, server, home):
+    api = server.api
+    clients = api.subscriptions['sub']['clients']
+    for name in ('ci-build', 'ci-deploy', 'web'):
+        clients[name] = {}
+        api.issue(clients[name])
+    old_keys = dict((name, list(clients[name])) for name in clients)
+    sink = home.join('credentials.jsonl')
+    # an earlier run created the key of ci-build and stopped before deleting the old one
+    resumed = api.issue(clients['ci-build'])
+    sink.write(json.dumps(dict(resumed, client='ci-build')) + '\n')
+    home.join('credentials.jsonl.state').write('created sub ci-build {0}\n'.format(resumed['clientKey']))
+
+    result = runner.invoke(cli.main, ['--output', 'json', 'subscription', 'client', 'credentials', 'rotate',
+                                      '--match', 'ci-*', '--sink', str(sink), '--workers', '4'])
+    assert result.exit_code == 0, result.output
+    rotated = dict((r['client'], r) for r in json.loads(result.stdout))
+    assert sorted(rotated) == ['ci-build', 'ci-deploy']
+    assert rotated['ci-build']['clientKey'] == resumed['clientKey']
+    for name in rotated:
+        assert list(clients[name]) == [rotated[name]['clientKey']]
+        assert rotated[name]['deleted'] == old_keys[name]
+        assert old_keys[name][0] not in api.credentials
+    assert list(clients['web']) == old_keys['web']
+    records = [json.loads(line) for line in sink.read().splitlines()]
+    assert sorted(r['clientKey'] for r in records) == sorted(r['clientKey'] for r in rotated.values())
+    assert not home.join('credentials.jsonl.state').exists()
+
+
+def test_rotation_keeps_old_credentials_when_verification_fails(runner, server, home, monkeypatch):
+    api = server.api
+    clients = api.subscriptions['sub']['clients']
+    clients['ci'] = {}
+    old = api.issue(clients['ci'])['clientKey']
+    monkeypatch.setattr(api, 'issue', lambda owner: dict(FakeApi.issue(api, owner), clientSecret='wrong'))
+    sink = home.join('credentials.jsonl')
+    result = runner.invoke(cli.main, ['subscription', 'client', 'credentials', 'rotate', '--sink', str(sink)])
+    assert result.exit_code == 1
+    assert 'Invalid credentials' in result.stderr
+    assert old in clients['ci']
+    assert home.join('credentials.jsonl.state').exists()
+
+
+def test_rotation_ignores_the_state_of_another_subscription(runner, server, home):
+    clients = server.api.subscriptions['sub']['clients']
+    clients['ci'] = {}
+    old = server.api.issue(clients['ci'])['clientKey']
+    sink = home.join('credentials.jsonl')
+    home.join('credentials.jsonl.state').write('created other ci key\nverified other ci\ndone other ci\n')
+    result = runner.invoke(cli.main, ['--output', 'json', 'subscription', 'client', 'credentials', 'rotate',
+                                      '--sink', str(sink)])
+    assert result.exit_code == 0, result.output
+    assert [r['status'] for r in json.loads(result.stdout)] == ['rotated']
+    assert old not in clients['ci']
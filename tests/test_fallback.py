@@ -0,0 +1,28 @@
+from cloco_cli import fallback
+
+
+def test_last_known_good_round_trip(tmpdir):
+    store = fallback.LastKnownGood(str(tmpdir))
+    assert store.get('sub/app/db/dev') is None
+    store.put('sub/app/db/dev', '{"configurationData": "x"}', fetched=100)
+    path = tmpdir.listdir()[0]
+    path.setmtime(100)
+    assert store.get('sub/app/db/dev') == (100, '{"configurationData": "x"}')
+
+
+def test_last_known_good_skips_unchanged_writes(tmpdir):
+    store = fallback.LastKnownGood(str(tmpdir))
+    store.put('key', 'text', fetched=100)
+    inode = tmpdir.listdir()[0].stat().ino
+    store.put('key', 'text', fetched=200)
+    assert tmpdir.listdir()[0].stat().ino == inode
+    assert store.get('key') == (200, 'text')
+    store.put('key', 'changed', fetched=300)
+    assert store.get('key')[1] == 'changed'
+
+
+def test_format_age():
+    assert fallback.format_age(5) == '5s'
+    assert fallback.format_age(62) == '1m02s'
+    assert fallback.format_age(3 * 3600 + 60) == '3h01m'
+    assert fallback.format_age(2 * 86400) == '2d00h'
@@ -0,0 +1,29 @@
+import os
+import stat
+
+from cloco_cli import files
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(str(path)).st_mode)
+
+
+def test_write_atomic_follows_the_umask(tmpdir):
+    umask = os.umask(0o022)
+    try:
+        files.write_atomic(str(tmpdir.join('out', 'new')), b'data')
+    finally:
+        os.umask(umask)
+    assert tmpdir.join('out', 'new').read_binary() == b'data'
+    assert mode(tmpdir.join('out', 'new')) == 0o644
+
+
+def test_write_atomic_keeps_the_mode_it_replaces(tmpdir):
+    path = tmpdir.join('existing')
+    path.write('old')
+    path.chmod(0o640)
+    files.write_atomic(str(path), b'new')
+    assert path.read() == 'new'
+    assert mode(path) == 0o640
+    files.write_atomic(str(path), b'secret', 0o600)
+    assert mode(path) == 0o600
@@ -0,0 +1,42 @@
+import json
+
+from cloco_cli import client, listing, output
+
+
+def test_project_selects_nested_fields():
+    item = {'id': 'db', 'meta': {'revision': 3}, 'data': 'x'}
+    assert listing.project(item, ['id', 'meta.revision', 'missing']) == {'id': 'db', 'meta.revision': 3}
+    assert listing.project(item, []) is item
+
+
+def test_print_items_matches_indented_json(capsys, monkeypatch):
+    monkeypatch.setattr(output, '_mode', 'pretty')
+    items = [{'b': 1, 'a': [1, 2]}, {'c': None}]
+    listing.print_items(iter(items))
+    assert capsys.readouterr().out == json.dumps(items, sort_keys=True, indent=4, separators=(',', ': ')) + '\n'
+    listing.print_items(iter([]))
+    assert capsys.readouterr().out == '[]\n'
+
+
+def test_print_items_ndjson(capsys):
+    listing.print_items(iter([{'id': 1, 'x': 2}, {'id': 2}]), ndjson=True, fields='id')
+    assert capsys.readouterr().out == '{"id": 1}\n{"id": 2}\n'
+
+
+def test_next_link():
+    header = '<https://api.cloco.io/sub/applications?page=1>; rel="prev", </sub/applications?page=3>; rel="next"'
+    assert client.next_link('https://api.cloco.io/sub/applications?page=2', header) == \
+        'https://api.cloco.io/sub/applications?page=3'
+    assert client.next_link('https://api.cloco.io/sub/applications', '') is None
+
+
+def test_page_items():
+    assert client.page_items([1, 2]) == [1, 2]
+    assert client.page_items({'items': [1], 'next': None}) == [1]
+    assert client.page_items({'id': 1}) == [{'id': 1}]
+
+
+def test_print_items_compact_json(capsys, monkeypatch):
+    monkeypatch.setattr(output, '_mode', 'json')
+    listing.print_items(iter([{'b': 1, 'a': 2}, 3]))
+    assert capsys.readouterr().out == '[{"b":1,"a":2},3]\n'
@@ -0,0 +1,36 @@
+import pytest
+
+from cloco_cli import output
+
+
+def test_output_mode_detection(monkeypatch):
+    monkeypatch.setattr(output, '_mode', None)
+    monkeypatch.delenv('CLOCO_OUTPUT', raising=False)
+    assert output.get_output_mode() == 'json'
+    monkeypatch.setenv('CLOCO_OUTPUT', 'table')
+    assert output.get_output_mode() == 'table'
+    output.set_output_mode('raw')
+    assert output.get_output_mode() == 'raw'
+    with pytest.raises(ValueError):
+        output.set_output_mode('yaml')
+
+
+def test_exit_codes():
+    assert output.exit_code(401) == output.EXIT_AUTHENTICATION
+    assert output.exit_code(404) == output.EXIT_NOT_FOUND
+    assert output.exit_code(409) == output.EXIT_CLIENT_ERROR
+    assert output.exit_code(503) == output.EXIT_SERVER_ERROR
+
+
+def test_format_table():
+    table = output.format_table([{'id': 'db', 'revision': 3}, {'id': 'web', 'tags': ['a']}])
+    assert table.splitlines() == [
+        'id   revision  tags',
+        'db   3',
+        'web            ["a"]']
+
+
+def test_format_document_modes():
+    assert output.format_document({'b': 1, 'a': 2}, 'json') == '{"b":1,"a":2}'
+    assert output.format_document([1, 2], 'ndjson') == '1\n2'
+    assert output.format_document({'b': 1, 'a': 2}, 'pretty') == '{\n    "a": 2,\n    "b": 1\n}'
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from cloco_cli import permissions
+
+
+def test_load_manifest_reads_json_and_yaml(tmpdir):
+    manifest = tmpdir.join('manifest.json')
+    manifest.write('{"permissions": []}')
+    assert permissions.load_manifest(str(manifest)) == {'permissions': []}
+    manifest = tmpdir.join('manifest.yaml')
+    manifest.write('subscription: acme\npermissions:\n  - identity: alice\n    role: admin\n')
+    assert permissions.load_manifest(str(manifest)) == {'subscription': 'acme',
+                                                        'permissions': [{'identity': 'alice', 'role': 'admin'}]}
+
+
+def test_manifest_grants_validates_levels():
+    with pytest.raises(ValueError):
+        permissions.manifest_grants({'permissions': [{'identity': 'alice'}]})
+    with pytest.raises(ValueError):
+        permissions.manifest_grants({'permissions': [{'identity': 'alice', 'role': 'read', 'cob': 'db'}]})
+
+
+def test_desired_permissions_expands_wildcards():
+    grants = permissions.manifest_grants({'permissions': [
+        {'identity': 'alice', 'role': 'admin'},
+        {'identity': ['bob', 'carol'], 'role': 'write', 'app': 'web'},
+        {'identity': 'team', 'role': 'read', 'app': 'web', 'cob': '*', 'env': ['dev']},
+    ]})
+    assert permissions.wildcard_apps(grants) == ['web']
+    desired = permissions.desired_permissions(grants, {'web': [('db', 'dev'), ('db', 'prod'), ('cache', 'dev')]})
+    assert desired == {(): {'alice': 'admin'},
+                       ('web',): {'bob': 'write', 'carol': 'write'},
+                       ('web', 'cache', 'dev'): {'team': 'read'},
+                       ('web', 'db', 'dev'): {'team': 'read'}}
+    with pytest.raises(ValueError):
+        permissions.desired_permissions(grants + grants[:1] + [dict(grants[0], role='user')], {})
+
+
+def test_plan_changes_is_minimal():
+    desired = {('web',): {'bob': 'write', 'carol': 'read', 'dave': 'read'}}
+    current = {('web',): {'bob': 'write', 'carol': 'write', 'eve': 'read'}, (): {'zed': 'admin'}}
+    changes = permissions.plan_changes(desired, current)
+    assert [(c['action'], c['identity']) for c in changes] == [('update', 'carol'), ('add', 'dave'), ('remove', 'eve')]
+    assert changes[0] == {'action': 'update', 'identity': 'carol', 'role': 'read', 'previous': 'write', 'app': 'web'}
+    assert permissions.describe_change(changes[0]) == '~ carol write -> read on web'
+    assert len(permissions.plan_changes(desired, current, prune=False)) == 2
+    assert json.dumps(changes)
@@ -0,0 +1,26 @@
+import pytest
+
+from cloco_cli import render
+
+
+def test_parse_payload_json_and_ini():
+    assert render.parse_payload('{"db": {"host": "h"}}') == {'db': {'host': 'h'}}
+    assert render.parse_payload('debug=true\n[db]\nhost = h\n') == {'debug': 'true', 'db': {'host': 'h'}}
+
+
+def test_parse_payload_rejects_other_data():
+    with pytest.raises(ValueError):
+        render.parse_payload('not ini')
+
+
+def test_flatten():
+    document = {'db': {'host': 'h', 'port': 5432, 'replicas': ['a', 'b']}, 'debug': True, 'log-level': None}
+    assert render.flatten(document, 'APP_') == {
+        'APP_DB_HOST': 'h', 'APP_DB_PORT': '5432', 'APP_DB_REPLICAS_0': 'a', 'APP_DB_REPLICAS_1': 'b',
+        'APP_DEBUG': 'true', 'APP_LOG_LEVEL': ''}
+
+
+def test_render_template():
+    assert render.render_template('host=${DB_HOST}:$DB_PORT', {'DB_HOST': 'h', 'DB_PORT': '1'}) == 'host=h:1'
+    with pytest.raises(KeyError):
+        render.render_template('$MISSING', {})
@@ -0,0 +1,24 @@
+import os
+import stat
+
+from cloco_cli.rotation import CredentialSink, created_key
+from cloco_cli.snapshot import Checkpoint
+
+
+def test_sink_appends_private_json_lines(tmpdir):
+    path = str(tmpdir.join('credentials.jsonl'))
+    sink = CredentialSink(path)
+    sink.write({'client': 'a', 'clientKey': 'k1', 'clientSecret': 's1'})
+    sink.write({'client': 'b', 'clientKey': 'k2', 'clientSecret': 's2'})
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert sink.find('k2') == 's2'
+    assert sink.find('k3') is None
+
+
+def test_created_key_reads_the_checkpoint(tmpdir):
+    checkpoint = Checkpoint(str(tmpdir.join('state')))
+    checkpoint.add('created sub ci-build abc')
+    assert created_key(checkpoint, 'sub', 'ci-build') == 'abc'
+    assert created_key(checkpoint, 'sub', 'ci') is None
+    assert created_key(checkpoint, 'other', 'ci-build') is None
+    checkpoint.close()
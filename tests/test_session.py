@@ -0,0 +1,39 @@
+import configparser
+
+from cloco_cli import session
+
+
+def test_session_settings_default_without_config():
+    assert session.get_session_settings(None) == (
+        session.DEFAULT_POOL_SIZE, session.DEFAULT_RETRIES, session.DEFAULT_BACKOFF_FACTOR)
+
+
+def test_session_settings_read_from_config():
+    config = configparser.ConfigParser()
+    config['settings'] = {'url': '', 'pool_size': '4', 'retries': '1', 'backoff_factor': '0.1'}
+    assert session.get_session_settings(config) == (4, 1, 0.1)
+
+
+def test_create_session_mounts_pooled_adapter():
+    s = session.create_session(4, 2, 0.1)
+    adapter = s.get_adapter('https://api.cloco.io')
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.total == 2
+    assert 503 in adapter.max_retries.status_forcelist
+
+
+def test_get_session_is_shared():
+    session.close_session()
+    try:
+        assert session.get_session() is session.get_session()
+    finally:
+        session.close_session()
+
+
+def test_session_applies_default_timeouts():
+    config = configparser.ConfigParser()
+    config['settings'] = {'url': '', 'connect_timeout': '1.5', 'read_timeout': '10'}
+    assert session.get_timeouts(config) == (1.5, 10)
+    assert session.get_timeouts(None) == (session.DEFAULT_CONNECT_TIMEOUT, session.DEFAULT_READ_TIMEOUT)
+    s = session.create_session(4, 2, 0.1, timeout=(1.5, 10))
+    assert s.get_adapter('https://api.cloco.io').timeout == (1.5, 10)
@@ -0,0 +1,61 @@
+import tarfile
+
+from cloco_cli import snapshot
+
+
+def write_snapshot(path):
+    with open(path, 'wb') as archive:
+        writer = snapshot.SnapshotWriter(archive, 'sub')
+        writer.add(snapshot.SUBSCRIPTION, {'name': 'sub'})
+        writer.add(snapshot.configuration_name('app', 'db', 'dev'), {'configurationData': 'db-data'})
+        writer.add_object('app', 'db', 'dev', 3)
+        writer.close()
+    return
+
+
+def test_snapshot_round_trip(tmpdir):
+    path = str(tmpdir.join('snapshot.tar.gz'))
+    write_snapshot(path)
+    reader = snapshot.SnapshotReader(path)
+    assert reader.index['subscription'] == 'sub'
+    assert reader.index['objects'] == [{'app': 'app', 'cob': 'db', 'env': 'dev', 'revision': 3}]
+    assert reader.read_json('configuration/app/db/dev.json') == {'configurationData': 'db-data'}
+    assert reader.read('missing.json') is None
+    reader.close()
+
+
+def test_snapshot_index_is_written_last(tmpdir):
+    path = str(tmpdir.join('snapshot.tar.gz'))
+    write_snapshot(path)
+    with tarfile.open(path) as tar:
+        assert tar.getnames()[-1] == snapshot.INDEX
+
+
+def test_snapshot_reads_extracted_directory(tmpdir):
+    path = str(tmpdir.join('snapshot.tar.gz'))
+    write_snapshot(path)
+    with tarfile.open(path) as tar:
+        tar.extractall(str(tmpdir.join('extracted')))
+    reader = snapshot.SnapshotReader(str(tmpdir.join('extracted')))
+    members = dict(reader.members([snapshot.SUBSCRIPTION, 'missing.json']))
+    assert members == {snapshot.SUBSCRIPTION: b'{"name": "sub"}'}
+
+
+def test_snapshot_members_in_one_pass(tmpdir):
+    path = str(tmpdir.join('snapshot.tar.gz'))
+    write_snapshot(path)
+    reader = snapshot.SnapshotReader(path)
+    names = [name for name, data in reader.members(['configuration/app/db/dev.json', snapshot.SUBSCRIPTION])]
+    assert names == [snapshot.SUBSCRIPTION, 'configuration/app/db/dev.json']
+
+
+def test_checkpoint_resumes(tmpdir):
+    path = str(tmpdir.join('checkpoint'))
+    checkpoint = snapshot.Checkpoint(path)
+    checkpoint.add('applications/app')
+    checkpoint.close()
+    checkpoint = snapshot.Checkpoint(path)
+    assert 'applications/app' in checkpoint
+    assert 'applications/other' not in checkpoint
+    checkpoint.close(remove=True)
+    assert not tmpdir.join('checkpoint').check()
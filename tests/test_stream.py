@@ -0,0 +1,21 @@
+import json
+
+import pytest
+from cloco_cli import stream
+
+
+def decode(document, chunk_size):
+    body = json.dumps(document).encode('utf-8')
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    return ''.join(stream.iter_configuration_data(chunks))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 1024])
+def test_decodes_escapes_across_chunks(chunk_size):
+    data = 'line "one"\n\ttab \\ café \U0001f600'
+    assert decode({'revision': 3, 'configurationData': data, 'tail': 'x'}, chunk_size) == data
+
+
+def test_missing_data_raises():
+    with pytest.raises(ValueError):
+        decode({'revision': 3}, 4)
@@ -0,0 +1,38 @@
+import threading
+
+from cloco_cli import trace
+
+
+def test_span_is_free_while_tracing_is_off():
+    assert trace.span('anything') is trace.NULL_SPAN
+    with trace.span('anything') as span:
+        assert span is None
+
+
+def work():
+    with trace.span('worker'):
+        pass
+
+
+def test_spans_nest_per_thread():
+    tracer = trace.start_tracing()
+    try:
+        with trace.span('outer', key='value'):
+            with trace.span('inner'):
+                pass
+            worker = threading.Thread(target=work)
+            worker.start()
+            worker.join()
+    finally:
+        trace.stop_tracing()
+    spans = dict((s.name, s) for s in tracer.spans)
+    assert (spans['outer'].depth, spans['inner'].depth, spans['worker'].depth) == (0, 1, 0)
+    summary = trace.format_summary(tracer)
+    assert 'outer (key=value)' in summary
+    assert '    inner' in summary
+    assert 'worker x1' in summary.split('other threads:')[1]
+    document = trace.chrome_trace(tracer)
+    events = [e for e in document['traceEvents'] if e['ph'] == 'X' and e['name'] != 'startup']
+    assert [e['name'] for e in events] == ['outer', 'inner', 'worker']
+    assert events[0]['args'] == {'key': 'value'}
+    assert events[0]['dur'] >= events[1]['dur']
@@ -0,0 +1,20 @@
+from cloco_cli import watch
+
+
+def test_interval_backs_off_until_maximum():
+    assert watch.next_interval(10, False, 10, 20) == 15
+    assert watch.next_interval(15, False, 10, 20) == 20
+    assert watch.next_interval(20, True, 10, 20) == 10
+
+
+def test_jitter_stays_within_bounds():
+    for _ in range(100):
+        assert 90 <= watch.jitter(100) <= 110
+
+
+def test_watch_runs_count_rounds():
+    checked = []
+    sleeps = []
+    watch.watch(['a', 'b'], lambda item: checked.append(item), 10, 100, count=2, sleep=sleeps.append)
+    assert checked == ['a', 'b', 'a', 'b']
+    assert len(sleeps) == 1